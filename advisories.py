@@ -0,0 +1,312 @@
+"""Offline matching of installed packages against an OSV advisory database
+
+The database is an OSV dump on disk: a zip archive such as PyPI/all.zip from
+the OSV bucket, a folder of advisory JSON files, or a single JSON file. It is
+compiled once into an index keyed by normalized package name, with version
+ranges parsed into comparable keys, and the compiled form is cached until
+the dump changes.
+"""
+import os
+import json
+import gzip
+import time
+import hashlib
+import zipfile
+import threading
+
+from distributions import normalize_name
+from http_cache import write_json_atomic
+from progress_bus import OperationCancelled
+from tracing import tracer
+from versions import sort_key
+
+ECOSYSTEM = "PyPI"
+INDEX_FORMAT = 1
+REPORT_FILE = "audit.json"
+
+
+def json_files(folder):
+    """Every .json file below folder"""
+    for directory, dirs, files in os.walk(folder):
+        for filename in sorted(files):
+            if filename.endswith(".json"):
+                yield os.path.join(directory, filename)
+
+
+def dump_stamp(path):
+    """Changes whenever the dump at path does
+
+    A folder's own size and time do not change when a file in it is edited
+    (e.g. by a git pull of the OSV repository), so for folders the stamp
+    is the count, total size and latest modification time of its files.
+    """
+    if not os.path.isdir(path):
+        stat = os.stat(path)
+        return [stat.st_size, stat.st_mtime_ns]
+    count, size, latest = 0, 0, 0
+    for file_path in json_files(path):
+        stat = os.stat(file_path)
+        count += 1
+        size += stat.st_size
+        latest = max(latest, stat.st_mtime_ns)
+    return [count, size, latest]
+
+
+def read_osv_documents(path):
+    """Yield every advisory in an OSV dump (zip, folder or JSON file)"""
+    def parse(data):
+        document = json.loads(data)
+        if isinstance(document, list):
+            yield from document
+        else:
+            yield document
+
+    if os.path.isdir(path):
+        for file_path in json_files(path):
+            with open(file_path, "rb") as f:
+                yield from parse(f.read())
+    elif zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as archive:
+            for member in archive.namelist():
+                if member.endswith(".json"):
+                    yield from parse(archive.read(member))
+    else:
+        with open(path, "rb") as f:
+            yield from parse(f.read())
+
+
+def range_intervals(events):
+    """[introduced, fixed, last_affected] intervals from an OSV range's events
+
+    Missing bounds are None; an introduced version of "0" means all earlier
+    versions are affected.
+    """
+    intervals = []
+    current = None
+    for event in events:
+        if "introduced" in event:
+            introduced = event["introduced"]
+            current = [None if introduced == "0" else introduced, None, None]
+            intervals.append(current)
+        elif current is not None and "fixed" in event:
+            current[1] = event["fixed"]
+            current = None
+        elif current is not None and "last_affected" in event:
+            current[2] = event["last_affected"]
+            current = None
+    return intervals
+
+
+def compile_advisory(document):
+    """(id, info, {package: entry}) for the PyPI packages an advisory affects
+
+    entry is [intervals, explicit versions].
+    """
+    if document.get("withdrawn"):
+        return None
+    packages = {}
+    for affected in document.get("affected", []):
+        package = affected.get("package", {})
+        if package.get("ecosystem") != ECOSYSTEM or not package.get("name"):
+            continue
+        intervals = []
+        for version_range in affected.get("ranges", []):
+            # Git ranges refer to commits; such advisories also list versions
+            if version_range.get("type") in ("ECOSYSTEM", "SEMVER"):
+                intervals.extend(range_intervals(version_range.get("events", [])))
+        entry = packages.setdefault(normalize_name(package["name"]), [[], []])
+        entry[0].extend(intervals)
+        entry[1].extend(affected.get("versions", []))
+    if not packages:
+        return None
+    info = {
+        "summary": document.get("summary") or (document.get("details") or "").split("\n", 1)[0][:200],
+        "aliases": document.get("aliases", []),
+    }
+    return document["id"], info, packages
+
+
+class AdvisoryDatabase:
+    """Advisories by normalized package name, with pre-parsed version ranges"""
+
+    def __init__(self, advisories, packages):
+        self.advisories = advisories  # id -> {"summary", "aliases"}
+        # name -> [(id, [(introduced key, fixed key, last affected key, fixed)], {version keys})]
+        self._index = {}
+        for name, entries in packages.items():
+            compiled = []
+            for advisory_id, intervals, versions in entries:
+                keyed = [(None if introduced is None else sort_key(introduced),
+                          None if fixed is None else sort_key(fixed),
+                          None if last is None else sort_key(last),
+                          fixed)
+                         for introduced, fixed, last in intervals]
+                compiled.append((advisory_id, keyed, {sort_key(version) for version in versions}))
+            self._index[name] = compiled
+
+    @classmethod
+    def from_dump(cls, path):
+        advisories, packages = {}, {}
+        for document in read_osv_documents(path):
+            compiled = compile_advisory(document)
+            if compiled is None:
+                continue
+            advisory_id, info, affected = compiled
+            advisories[advisory_id] = info
+            for name, (intervals, versions) in affected.items():
+                packages.setdefault(name, []).append([advisory_id, intervals, versions])
+        return cls(advisories, packages), packages
+
+    @classmethod
+    def load(cls, path, cache_dir):
+        """Compile the dump at path, reusing the cached index while the dump is unchanged"""
+        path = os.path.abspath(path)
+        stamp = dump_stamp(path)
+        key = hashlib.sha1(path.encode("utf-8")).hexdigest()[:16]
+        cache_path = os.path.join(str(cache_dir), "advisories", f"{key}.json.gz")
+
+        try:
+            with gzip.open(cache_path, "rt", encoding="utf-8") as f:
+                cached = json.load(f)
+            if cached["format"] == INDEX_FORMAT and cached["source"] == path and cached["stamp"] == stamp:
+                with tracer.span("load advisory index", "io", packages=len(cached["packages"])):
+                    return cls(cached["advisories"], cached["packages"])
+        except (OSError, EOFError, ValueError, KeyError):
+            pass
+
+        with tracer.span("compile advisory database", "io", source=path) as attrs:
+            database, packages = cls.from_dump(path)
+            attrs["advisories"] = len(database.advisories)
+            attrs["packages"] = len(packages)
+        try:
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            tmp_path = cache_path + ".tmp"
+            with gzip.open(tmp_path, "wt", encoding="utf-8", compresslevel=6) as f:
+                json.dump({"format": INDEX_FORMAT, "source": path, "stamp": stamp,
+                           "advisories": database.advisories, "packages": packages}, f, separators=(",", ":"))
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            print(f"Could not cache advisory index: {str(e)}")
+        return database
+
+    def __len__(self):
+        return len(self.advisories)
+
+    def match(self, name, version):
+        """[(advisory id, fixed version or None)] for the advisories affecting name at version"""
+        entries = self._index.get(normalize_name(name))
+        if not entries:
+            return []
+        key = sort_key(version)
+        matches = []
+        for advisory_id, intervals, versions in entries:
+            for introduced, fixed, last, fixed_version in intervals:
+                if introduced is not None and key < introduced:
+                    continue
+                if (fixed is not None and key >= fixed) or (last is not None and key > last):
+                    continue
+                matches.append((advisory_id, fixed_version))
+                break
+            else:
+                if key in versions:
+                    matches.append((advisory_id, None))
+        return matches
+
+    def describe(self, advisory_id):
+        """Advisory id with its aliases, e.g. "GHSA-... (CVE-...)", and its summary"""
+        info = self.advisories.get(advisory_id, {})
+        aliases = [alias for alias in info.get("aliases", []) if alias != advisory_id]
+        label = f"{advisory_id} ({', '.join(aliases)})" if aliases else advisory_id
+        return label, info.get("summary", "")
+
+
+class AdvisoryStore:
+    """The configured advisory database, loaded once in the background and shared"""
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        self.path = None
+        self.database = None
+        self._lock = threading.Lock()
+
+    def load(self, path):
+        with self._lock:
+            if self.database is not None and self.path == path:
+                return self.database
+            database = AdvisoryDatabase.load(path, self.cache_dir)
+            self.path, self.database = path, database
+            return database
+
+
+def audit_fleet(environments, inventory_cache, database, cancelled=None):
+    """Match every environment's packages against the database; returns a report dict
+
+    Each distinct (package, version) pair is matched once, however many
+    environments have it. The report maps environment paths to their name,
+    package count, findings as [package, version, advisory, summary, fixed]
+    rows and an error message if the packages could not be read.
+    """
+    with tracer.span("audit environments", "app", environments=len(environments)) as attrs:
+        inventories = []
+        for env in environments:
+            if cancelled and cancelled():
+                raise OperationCancelled()
+            try:
+                if not os.path.isdir(env["path"]):
+                    raise OSError("Environment not found")
+                inventories.append((env, inventory_cache.get(env["path"]), None))
+            except Exception as e:
+                inventories.append((env, [], str(e)))
+
+        matches = {}
+        for env, rows, error in inventories:
+            for row in rows:
+                pair = (normalize_name(row[0]), row[1])
+                if pair not in matches:
+                    matches[pair] = database.match(*pair)
+        attrs["distinct_packages"] = len(matches)
+
+        report = {"audited_at": time.time(), "advisories": len(database), "environments": {}}
+        findings_total = 0
+        for env, rows, error in inventories:
+            entry = audit_entry(env, rows, database, error, match=lambda name, version: matches[(name, version)])
+            findings_total += len(entry["findings"])
+            report["environments"][env["path"]] = entry
+        attrs["findings"] = findings_total
+    return report
+
+
+def audit_entry(env, rows, database, error=None, match=None):
+    """An environment's report entry for its (name, version, ...) rows
+
+    match(normalized name, version) defaults to database.match.
+    """
+    match = match or database.match
+    findings = []
+    for row in rows:
+        for advisory_id, fixed in match(normalize_name(row[0]), row[1]):
+            label, summary = database.describe(advisory_id)
+            findings.append([row[0], row[1], label, summary, fixed or ""])
+    return {
+        "name": env["name"],
+        "packages": len(rows),
+        "findings": sorted(findings, key=lambda finding: finding[0].lower()),
+        "error": error,
+    }
+
+
+def report_path(cache_dir):
+    return os.path.join(str(cache_dir), REPORT_FILE)
+
+
+def load_report(cache_dir):
+    """The last saved audit report, or None"""
+    try:
+        with open(report_path(cache_dir), "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_report(cache_dir, report):
+    write_json_atomic(report_path(cache_dir), report)
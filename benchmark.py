@@ -0,0 +1,419 @@
+"""Offline benchmarks for the environment manager
+
+Generates synthetic virtual environments with fake distributions (dist-info
+with METADATA, RECORD and dependency edges) plus a local PEP 503 file index,
+then times the operations the application performs on environments. Nothing
+touches the network.
+
+    python benchmark.py run --sizes 50 500 -o results.json
+    python benchmark.py compare baseline.json results.json --threshold 0.1
+
+The synthetic environments have no pip of their own; pip from the Python
+running the benchmark is exposed to them through a .pth file, so
+"env/bin/python -m pip" behaves as it would in a real environment.
+"""
+import os
+import sys
+import json
+import time
+import base64
+import random
+import shutil
+import hashlib
+import argparse
+import platform
+import tempfile
+import subprocess
+import statistics
+
+DEFAULT_SIZES = [50, 500, 5000]
+DEFAULT_REPEAT = 3
+DEFAULT_THRESHOLD = 0.10
+GENERATOR_VERSION = 1
+
+# Fraction of fake projects that have a newer release in the local index
+OUTDATED_FRACTION = 0.2
+MAX_DEPENDENCIES = 3
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def env_python(env_path):
+    if sys.platform == "win32":
+        return os.path.join(env_path, "Scripts", "python.exe")
+    return os.path.join(env_path, "bin", "python")
+
+
+def env_site_packages(env_path):
+    if sys.platform == "win32":
+        return os.path.join(env_path, "Lib", "site-packages")
+    version = f"python{sys.version_info[0]}.{sys.version_info[1]}"
+    return os.path.join(env_path, "lib", version, "site-packages")
+
+
+def record_hash(data):
+    digest = hashlib.sha256(data).digest()
+    return "sha256=" + base64.urlsafe_b64encode(digest).rstrip(b"=").decode("ascii")
+
+
+def project_name(index):
+    return f"benchpkg-{index:05d}"
+
+
+def write_distribution(site, index, rng):
+    """Write one fake distribution into a site-packages directory"""
+    name = project_name(index)
+    module = name.replace("-", "_")
+    dist_info = f"{module}-1.0.0.dist-info"
+
+    requires = []
+    if index > 0:
+        for dep in rng.sample(range(index), min(index, rng.randint(0, MAX_DEPENDENCIES))):
+            requires.append(f"Requires-Dist: {project_name(dep)}>=1.0")
+
+    files = {
+        f"{module}/__init__.py": f"VALUE = {index}\n".encode(),
+        f"{module}/core.py": f"def run():\n    return {index}\n".encode(),
+        f"{dist_info}/METADATA": (
+            "Metadata-Version: 2.1\n"
+            f"Name: {name}\n"
+            "Version: 1.0.0\n"
+            f"Summary: Synthetic benchmark package {index}\n"
+            + "".join(line + "\n" for line in requires)
+        ).encode(),
+        f"{dist_info}/WHEEL": b"Wheel-Version: 1.0\nGenerator: benchmark\nRoot-Is-Purelib: true\nTag: py3-none-any\n",
+        f"{dist_info}/INSTALLER": b"pip\n",
+        f"{dist_info}/top_level.txt": f"{module}\n".encode(),
+    }
+
+    record_lines = []
+    for rel_path, data in files.items():
+        full_path = os.path.join(site, rel_path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        with open(full_path, "wb") as f:
+            f.write(data)
+        record_lines.append(f"{rel_path},{record_hash(data)},{len(data)}")
+    record_lines.append(f"{dist_info}/RECORD,,")
+    with open(os.path.join(site, dist_info, "RECORD"), "w") as f:
+        f.write("\n".join(record_lines) + "\n")
+
+
+def write_index(index_root, count, rng):
+    """Write a PEP 503 simple index describing the fake projects"""
+    simple = os.path.join(index_root, "simple")
+    os.makedirs(simple, exist_ok=True)
+    names = [project_name(i) for i in range(count)]
+    with open(os.path.join(simple, "index.html"), "w") as f:
+        f.write("<!DOCTYPE html><html><body>\n")
+        for name in names:
+            f.write(f'<a href="{name}/">{name}</a>\n')
+        f.write("</body></html>\n")
+
+    for name in names:
+        versions = ["1.0.0"]
+        if rng.random() < OUTDATED_FRACTION:
+            versions.append("1.1.0")
+        module = name.replace("-", "_")
+        project_dir = os.path.join(simple, name)
+        os.makedirs(project_dir, exist_ok=True)
+        with open(os.path.join(project_dir, "index.html"), "w") as f:
+            f.write("<!DOCTYPE html><html><body>\n")
+            for version in versions:
+                filename = f"{module}-{version}-py3-none-any.whl"
+                f.write(f'<a href="../../files/{filename}">{filename}</a>\n')
+            f.write("</body></html>\n")
+
+
+def generate_environment(workdir, count, seed=0):
+    """Create (or reuse) a synthetic environment with count distributions"""
+    root = os.path.join(workdir, f"env_{count}")
+    marker = os.path.join(root, "benchmark.json")
+    expected = {"generator": GENERATOR_VERSION, "count": count, "seed": seed,
+                "python": sys.version.split()[0]}
+    try:
+        with open(marker, "r") as f:
+            if json.load(f) == expected:
+                return root
+    except (OSError, ValueError):
+        pass
+
+    shutil.rmtree(root, ignore_errors=True)
+    env_path = os.path.join(root, "venv")
+    subprocess.run([sys.executable, "-m", "venv", "--without-pip", env_path], check=True)
+
+    # Expose the host's pip without its dist-info, so it is not listed as installed
+    site = env_site_packages(env_path)
+    host_pip = os.path.dirname(os.path.dirname(__import__("pip").__file__))
+    shim = os.path.join(root, "host_pip")
+    os.makedirs(shim, exist_ok=True)
+    for package in ("pip",):
+        link = os.path.join(shim, package)
+        try:
+            os.symlink(os.path.join(host_pip, package), link, target_is_directory=True)
+        except (OSError, NotImplementedError):
+            shutil.copytree(os.path.join(host_pip, package), link)
+    with open(os.path.join(site, "_benchmark_host_pip.pth"), "w") as f:
+        f.write(shim + "\n")
+
+    rng = random.Random(seed)
+    for index in range(count):
+        write_distribution(site, index, rng)
+    write_index(os.path.join(root, "index"), count, rng)
+
+    with open(marker, "w") as f:
+        json.dump(expected, f)
+    return root
+
+
+class BenchmarkContext:
+    """What a benchmark case gets to work with"""
+
+    def __init__(self, root, count, scratch):
+        self.root = root
+        self.count = count
+        self.scratch = scratch
+        self.env_path = os.path.join(root, "venv")
+        self.python = env_python(self.env_path)
+        self.site_packages = env_site_packages(self.env_path)
+        self.index_url = "file://" + os.path.join(root, "index", "simple").replace(os.sep, "/")
+        self._helper = None
+
+    def helper(self):
+        """A running environment helper, shared by all cases for this size"""
+        if self._helper is None:
+            from helper_client import EnvironmentHelper
+            self._helper = EnvironmentHelper(self.python, "benchmark")
+        self._helper.request("ping")
+        return self._helper
+
+    def close(self):
+        if self._helper:
+            self._helper.close()
+
+    def pip(self, *args):
+        # --isolated keeps user pip configuration (extra indexes etc.) out of the timings
+        cmd = [self.python, "-m", "pip", "--isolated", "--disable-pip-version-check", "--no-input"] + list(args)
+        env = {key: value for key, value in os.environ.items() if not key.startswith("PIP_")}
+        return subprocess.run(cmd, capture_output=True, text=True, check=True, env=env)
+
+
+def bench_cold_startup(ctx):
+    # Import the application in a fresh interpreter, with an empty home so no
+    # user configuration is loaded
+    env = dict(os.environ, HOME=ctx.scratch, USERPROFILE=ctx.scratch)
+    subprocess.run([sys.executable, "-c", "import pyenv_manager"], cwd=APP_DIR, env=env,
+                   check=True, capture_output=True)
+
+
+def bench_inventory_load(ctx):
+    packages = json.loads(ctx.pip("list", "--format=json").stdout)
+    assert len(packages) >= ctx.count
+
+
+def bench_dependency_query(ctx):
+    # Through pip: pip show for a package and each requirement
+    output = ctx.pip("show", project_name(ctx.count - 1)).stdout
+    for line in output.splitlines():
+        if line.startswith("Requires:"):
+            for dep in filter(None, (d.strip() for d in line[len("Requires:"):].split(","))):
+                ctx.pip("show", dep)
+
+
+def bench_helper_inventory(ctx):
+    helper = ctx.helper()
+    start = time.perf_counter()
+    packages = helper.request("inventory")
+    assert len(packages) >= ctx.count
+    return time.perf_counter() - start
+
+
+def bench_dist_info_dependencies(ctx):
+    # What the Dependencies tab does: read the package and its requirements from dist-info
+    from distributions import find_distributions, normalize_name
+    by_name = {dist.normalized_name: dist for dist in find_distributions(ctx.env_path)}
+    for dep in by_name[normalize_name(project_name(ctx.count - 1))].requires:
+        by_name.get(normalize_name(dep))
+
+
+def bench_outdated_check(ctx):
+    ctx.pip("list", "--outdated", "--format=json", "--index-url", ctx.index_url)
+
+
+def bench_tree_refresh(ctx):
+    import tkinter as tk
+    from tkinter import ttk
+    packages = json.loads(ctx.pip("list", "--format=json").stdout)
+    root = tk.Tk()
+    root.withdraw()
+    try:
+        tree = ttk.Treeview(root, columns=("name", "version", "latest_version"), show="headings")
+        start = time.perf_counter()
+        for pkg in packages:
+            tree.insert("", tk.END, values=(pkg["name"], pkg["version"], "Checking..."))
+        root.update_idletasks()
+        return time.perf_counter() - start
+    finally:
+        root.destroy()
+
+
+def bench_backup(ctx):
+    target = os.path.join(ctx.scratch, "backup")
+    shutil.rmtree(target, ignore_errors=True)
+    shutil.copytree(ctx.env_path, target, symlinks=True)
+    shutil.rmtree(target, ignore_errors=True)
+
+
+def bench_integrity_verify(ctx):
+    from integrity import IntegrityChecker
+    cache = os.path.join(ctx.scratch, "integrity_cold")
+    shutil.rmtree(cache, ignore_errors=True)
+    IntegrityChecker(cache).verify(ctx.env_path)
+
+
+def bench_integrity_reverify(ctx):
+    # Nothing changed since the last run, so every digest comes from the cache
+    from integrity import IntegrityChecker
+    checker = IntegrityChecker(os.path.join(ctx.scratch, "integrity_warm"))
+    checker.verify(ctx.env_path)
+    start = time.perf_counter()
+    checker.verify(ctx.env_path)
+    return time.perf_counter() - start
+
+
+def bench_validation(ctx):
+    # What opening an environment does to check it
+    subprocess.run([ctx.python, "--version"], capture_output=True, text=True, check=True)
+
+
+# name -> function(ctx). A function may return its own measured duration in
+# seconds, e.g. to leave setup out of the timing.
+BENCHMARKS = {
+    "cold_startup": bench_cold_startup,
+    "inventory_load": bench_inventory_load,
+    "dependency_query": bench_dependency_query,
+    "helper_inventory": bench_helper_inventory,
+    "dist_info_dependencies": bench_dist_info_dependencies,
+    "outdated_check": bench_outdated_check,
+    "tree_refresh": bench_tree_refresh,
+    "backup": bench_backup,
+    "integrity_verify": bench_integrity_verify,
+    "integrity_reverify": bench_integrity_reverify,
+    "validation": bench_validation,
+}
+
+
+def time_case(function, ctx, repeat):
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        measured = function(ctx)
+        elapsed = time.perf_counter() - start
+        runs.append(measured if isinstance(measured, float) else elapsed)
+    return {"median_s": statistics.median(runs), "min_s": min(runs), "runs": runs}
+
+
+def run_benchmarks(sizes, repeat, workdir, only=None, seed=0):
+    results = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "repeat": repeat,
+            "seed": seed,
+        },
+        "results": {},
+    }
+
+    for count in sizes:
+        print(f"Preparing synthetic environment with {count} distributions...", file=sys.stderr)
+        root = generate_environment(workdir, count, seed)
+        scratch = tempfile.mkdtemp(prefix="pyenv_bench_")
+        ctx = BenchmarkContext(root, count, scratch)
+        size_results = results["results"].setdefault(str(count), {})
+        try:
+            for name, function in BENCHMARKS.items():
+                if only and name not in only:
+                    continue
+                try:
+                    size_results[name] = time_case(function, ctx, repeat)
+                    print(f"  {name:<24} {size_results[name]['median_s'] * 1000:10.1f} ms", file=sys.stderr)
+                except Exception as e:
+                    size_results[name] = {"skipped": f"{type(e).__name__}: {str(e)}"}
+                    print(f"  {name:<24}    skipped ({type(e).__name__})", file=sys.stderr)
+        finally:
+            ctx.close()
+            shutil.rmtree(scratch, ignore_errors=True)
+    return results
+
+
+def compare_results(baseline, current, threshold):
+    """Return (rows, regressions) comparing two result documents"""
+    rows = []
+    regressions = []
+    for size, cases in sorted(current["results"].items(), key=lambda item: int(item[0])):
+        base_cases = baseline["results"].get(size, {})
+        for name, result in cases.items():
+            base = base_cases.get(name)
+            if not base or "median_s" not in base or "median_s" not in result:
+                continue
+            ratio = result["median_s"] / base["median_s"] if base["median_s"] else float("inf")
+            row = (size, name, base["median_s"], result["median_s"], ratio)
+            rows.append(row)
+            if ratio > 1 + threshold:
+                regressions.append(row)
+    return rows, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmarks for the environment manager")
+    subparsers = parser.add_subparsers(dest="command")
+
+    run_parser = subparsers.add_parser("run", help="Run the benchmarks")
+    run_parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES,
+                            help="Number of distributions per synthetic environment")
+    run_parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    run_parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), help="Run only these cases")
+    run_parser.add_argument("--workdir", help="Keep generated environments here and reuse them")
+    run_parser.add_argument("--seed", type=int, default=0)
+    run_parser.add_argument("-o", "--output", help="Write results JSON here instead of stdout")
+
+    compare_parser = subparsers.add_parser("compare", help="Compare two result files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                                help="Relative slowdown that counts as a regression")
+
+    args = parser.parse_args()
+
+    if args.command == "run":
+        workdir = args.workdir or tempfile.mkdtemp(prefix="pyenv_bench_envs_")
+        try:
+            results = run_benchmarks(args.sizes, args.repeat, workdir, args.only, args.seed)
+        finally:
+            if not args.workdir:
+                shutil.rmtree(workdir, ignore_errors=True)
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(results, f, indent=2)
+        else:
+            json.dump(results, sys.stdout, indent=2)
+            sys.stdout.write("\n")
+    elif args.command == "compare":
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+        with open(args.current, "r") as f:
+            current = json.load(f)
+        rows, regressions = compare_results(baseline, current, args.threshold)
+        print(f"{'size':>6}  {'benchmark':<24} {'baseline':>12} {'current':>12} {'change':>8}")
+        for size, name, base, new, ratio in rows:
+            flag = "  REGRESSION" if ratio > 1 + args.threshold else ""
+            print(f"{size:>6}  {name:<24} {base * 1000:10.1f}ms {new * 1000:10.1f}ms {(ratio - 1) * 100:+7.1f}%{flag}")
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) above {args.threshold * 100:.0f}%")
+            sys.exit(1)
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
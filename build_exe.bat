@@ -1,5 +1,5 @@
 @echo off
 echo Building Python Environment Manager executable...
-pyinstaller --clean --onefile --windowed --icon=icon.ico --name="Python Environment Manager" pyenv_manager.py
+pyinstaller --clean --onefile --windowed --icon=icon.ico --name="Python Environment Manager" --add-data "env_helper.py;." pyenv_manager.py
 echo Build process completed.
 pause
@@ -0,0 +1,354 @@
+"""Hash-manifest based delta updates for the application
+
+A release carries a manifest.json asset listing every application file with
+its SHA-256 and size. The updater compares that manifest with the files on
+disk, downloads only the files whose hash changed, verifies them in a staging
+directory and then swaps them into place, backing up only what it replaces.
+
+Run this module directly to generate the manifest for a release:
+
+    python delta_update.py <release dir> --version 1.1.0 [--base-url URL]
+"""
+import os
+import sys
+import json
+import shutil
+import hashlib
+import fnmatch
+import zipfile
+import argparse
+import datetime
+import urllib.request
+
+from http_cache import USER_AGENT, read_body
+from tracing import tracer
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_FORMAT = 1
+# Inside app_dir, so applying an update only renames files on the same volume
+STAGING_DIR_NAME = ".update_staging"
+
+# Files that belong to the local installation rather than to a release
+EXCLUDE_PATTERNS = [
+    ".git", ".git/*", "__pycache__", "*/__pycache__/*", "*.pyc",
+    "backup_*", "build", "build/*", "dist", "dist/*", MANIFEST_NAME,
+    STAGING_DIR_NAME, STAGING_DIR_NAME + "/*",
+]
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def sha256_file(path):
+    """Return the hex SHA-256 of a file"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def is_excluded(rel_path):
+    """Whether a manifest-relative path is excluded from releases"""
+    return any(fnmatch.fnmatch(rel_path, pattern) for pattern in EXCLUDE_PATTERNS)
+
+
+def build_manifest(root, version, base_url=None):
+    """Build the manifest describing every file below root"""
+    files = {}
+    for dirpath, dirnames, filenames in os.walk(root):
+        rel_dir = os.path.relpath(dirpath, root).replace(os.sep, "/")
+        rel_dir = "" if rel_dir == "." else rel_dir + "/"
+        dirnames[:] = [d for d in dirnames if not is_excluded(rel_dir + d)]
+        for filename in filenames:
+            rel_path = rel_dir + filename
+            if is_excluded(rel_path):
+                continue
+            full_path = os.path.join(dirpath, filename)
+            files[rel_path] = {
+                "sha256": sha256_file(full_path),
+                "size": os.path.getsize(full_path),
+            }
+
+    manifest = {"format": MANIFEST_FORMAT, "version": version, "files": files}
+    if base_url:
+        manifest["base_url"] = base_url
+    return manifest
+
+
+def zip_prefix(zip_ref):
+    """Return the single top-level folder releases are usually zipped in"""
+    names = [n for n in zip_ref.namelist() if not n.startswith("__MACOSX/")]
+    top_levels = {n.split("/", 1)[0] for n in names}
+    if len(top_levels) == 1 and all("/" in n for n in names):
+        return top_levels.pop() + "/"
+    return ""
+
+
+def manifest_from_zip(zip_path, version):
+    """Build a manifest for a full release zip without extracting it"""
+    files = {}
+    with zipfile.ZipFile(zip_path, "r") as zip_ref:
+        prefix = zip_prefix(zip_ref)
+        for member in zip_ref.infolist():
+            if member.is_dir() or not member.filename.startswith(prefix):
+                continue
+            rel_path = member.filename[len(prefix):]
+            if rel_path.startswith("__MACOSX/") or is_excluded(rel_path):
+                continue
+            digest = hashlib.sha256()
+            with zip_ref.open(member) as f:
+                for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                    digest.update(chunk)
+            files[rel_path] = {"sha256": digest.hexdigest(), "size": member.file_size}
+    return {"format": MANIFEST_FORMAT, "version": version, "files": files}
+
+
+def fetch_manifest(url, timeout=30):
+    """Download and parse a release manifest"""
+    req = urllib.request.Request(url, headers={"User-Agent": USER_AGENT})
+    with tracer.span("http GET", "http", url=url), urllib.request.urlopen(req, timeout=timeout) as response:
+        manifest = json.loads(read_body(response).decode("utf-8"))
+    if "files" not in manifest:
+        raise ValueError("Release manifest does not list any files")
+    return manifest
+
+
+def safe_join(root, rel_path):
+    """Join a manifest path onto root, refusing paths that escape it"""
+    full_path = os.path.normpath(os.path.join(root, *rel_path.split("/")))
+    root = os.path.normpath(root)
+    if os.path.commonpath([root, full_path]) != root:
+        raise ValueError(f"Unsafe path in release manifest: {rel_path}")
+    return full_path
+
+
+class UpdatePlan:
+    """The set of file operations needed to move to a release"""
+
+    def __init__(self, version, changed, removed, download_size):
+        self.version = version
+        self.changed = changed
+        self.removed = removed
+        self.download_size = download_size
+
+    @property
+    def is_empty(self):
+        return not self.changed and not self.removed
+
+    def to_dict(self):
+        return {
+            "version": self.version,
+            "changed": self.changed,
+            "removed": self.removed,
+            "download_size": self.download_size,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["version"], data["changed"], data["removed"], data["download_size"])
+
+
+class DeltaUpdater:
+    """Plans, stages and applies manifest based updates of app_dir"""
+
+    def __init__(self, app_dir, staging_root=None):
+        self.app_dir = str(app_dir)
+        self.staging_root = str(staging_root or os.path.join(self.app_dir, STAGING_DIR_NAME))
+
+    def staging_dir(self, version):
+        return os.path.join(self.staging_root, version)
+
+    def installed_manifest(self):
+        """Return the manifest of the currently installed release, if recorded"""
+        try:
+            with open(os.path.join(self.app_dir, MANIFEST_NAME), "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def plan(self, manifest):
+        """Compare a manifest with the files on disk"""
+        changed = []
+        download_size = 0
+        for rel_path, info in sorted(manifest["files"].items()):
+            local_path = safe_join(self.app_dir, rel_path)
+            try:
+                if os.path.getsize(local_path) == info["size"] and sha256_file(local_path) == info["sha256"]:
+                    continue
+            except OSError:
+                pass  # Missing locally
+            changed.append(rel_path)
+            download_size += info["size"]
+
+        # Files shipped by the installed release that the new one dropped
+        removed = []
+        installed = self.installed_manifest()
+        if installed:
+            for rel_path in sorted(installed.get("files", {})):
+                if rel_path not in manifest["files"] and os.path.exists(safe_join(self.app_dir, rel_path)):
+                    removed.append(rel_path)
+
+        return UpdatePlan(manifest.get("version", "unknown"), changed, removed, download_size)
+
+    def _verify_staged(self, staged_path, info):
+        return os.path.getsize(staged_path) == info["size"] and sha256_file(staged_path) == info["sha256"]
+
+    def download(self, plan, manifest, base_url=None, progress=None, cancelled=None):
+        """Download the changed files of a plan into the staging directory
+
+        progress is called with (bytes_done, bytes_total). Each file is
+        verified against the manifest hash before it is accepted.
+        """
+        base_url = base_url or manifest.get("base_url")
+        if not base_url:
+            raise ValueError("Release manifest does not say where to download files from")
+        if not base_url.endswith("/"):
+            base_url += "/"
+
+        staging = self.staging_dir(plan.version)
+        done = 0
+        for rel_path in plan.changed:
+            if cancelled and cancelled():
+                raise InterruptedError("Update download cancelled")
+            info = manifest["files"][rel_path]
+            staged_path = safe_join(staging, rel_path)
+
+            # Reuse files staged by an earlier, interrupted download
+            if not (os.path.exists(staged_path) and self._verify_staged(staged_path, info)):
+                os.makedirs(os.path.dirname(staged_path), exist_ok=True)
+                url = base_url + urllib.request.quote(rel_path)
+                req = urllib.request.Request(url, headers={"User-Agent": USER_AGENT})
+                with tracer.span("http download", "http", url=url), \
+                        urllib.request.urlopen(req, timeout=60) as response:
+                    with open(staged_path + ".part", "wb") as f:
+                        while True:
+                            chunk = response.read(64 * 1024)
+                            if not chunk:
+                                break
+                            f.write(chunk)
+                            if progress:
+                                progress(done + f.tell(), plan.download_size)
+                os.replace(staged_path + ".part", staged_path)
+                if not self._verify_staged(staged_path, info):
+                    os.remove(staged_path)
+                    raise ValueError(f"Hash mismatch for downloaded file: {rel_path}")
+
+            done += info["size"]
+            if progress:
+                progress(done, plan.download_size)
+
+        self._mark_staged(plan, manifest)
+
+    def stage_from_zip(self, plan, manifest, zip_path, progress=None):
+        """Stage the changed files of a plan from a full release zip
+
+        Used for releases without per-file downloads. Only the members that
+        changed are extracted.
+        """
+        staging = self.staging_dir(plan.version)
+        with zipfile.ZipFile(zip_path, "r") as zip_ref:
+            prefix = zip_prefix(zip_ref)
+            for index, rel_path in enumerate(plan.changed):
+                info = manifest["files"][rel_path]
+                staged_path = safe_join(staging, rel_path)
+                os.makedirs(os.path.dirname(staged_path), exist_ok=True)
+                with zip_ref.open(prefix + rel_path) as src, open(staged_path, "wb") as dst:
+                    shutil.copyfileobj(src, dst, CHUNK_SIZE)
+                if not self._verify_staged(staged_path, info):
+                    raise ValueError(f"Hash mismatch for file in release archive: {rel_path}")
+                if progress:
+                    progress(index + 1, len(plan.changed))
+
+        self._mark_staged(plan, manifest)
+
+    def _mark_staged(self, plan, manifest):
+        staging = self.staging_dir(plan.version)
+        os.makedirs(staging, exist_ok=True)
+        with open(os.path.join(staging, MANIFEST_NAME), "w") as f:
+            json.dump(manifest, f)
+        with open(os.path.join(staging, "plan.json"), "w") as f:
+            json.dump(plan.to_dict(), f)
+
+    def staged_update(self, version):
+        """Return (plan, manifest) for a fully staged version, or None"""
+        staging = self.staging_dir(version)
+        try:
+            with open(os.path.join(staging, "plan.json"), "r") as f:
+                plan = UpdatePlan.from_dict(json.load(f))
+            with open(os.path.join(staging, MANIFEST_NAME), "r") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError, KeyError):
+            return None
+        for rel_path in plan.changed:
+            if not os.path.exists(safe_join(staging, rel_path)):
+                return None
+        return plan, manifest
+
+    def apply(self, plan, manifest, progress=None):
+        """Swap staged files into app_dir and return the backup directory
+
+        Only files that are replaced or removed are backed up. If anything
+        fails part way, the files already swapped are restored.
+        """
+        staging = self.staging_dir(plan.version)
+        backup_dir = os.path.join(
+            self.app_dir, f"backup_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        )
+        touched = []  # (target path, backup path or None if the file was new)
+        total = len(plan.changed) + len(plan.removed)
+
+        try:
+            for index, rel_path in enumerate(plan.changed + plan.removed):
+                target = safe_join(self.app_dir, rel_path)
+                backup_path = None
+                if os.path.exists(target):
+                    backup_path = safe_join(backup_dir, rel_path)
+                    os.makedirs(os.path.dirname(backup_path), exist_ok=True)
+                    shutil.copy2(target, backup_path)
+                touched.append((target, backup_path))
+
+                if rel_path in plan.removed:
+                    os.remove(target)
+                else:
+                    os.makedirs(os.path.dirname(target), exist_ok=True)
+                    os.replace(safe_join(staging, rel_path), target)
+
+                if progress:
+                    progress(index + 1, total)
+        except Exception:
+            for target, backup_path in reversed(touched):
+                try:
+                    if backup_path:
+                        shutil.copy2(backup_path, target)
+                    elif os.path.exists(target):
+                        os.remove(target)
+                except OSError:
+                    pass
+            raise
+
+        # Record what is installed so the next update can detect removed files
+        with open(os.path.join(self.app_dir, MANIFEST_NAME), "w") as f:
+            json.dump(manifest, f)
+        shutil.rmtree(staging, ignore_errors=True)
+        return backup_dir if os.path.isdir(backup_dir) else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a release manifest for delta updates")
+    parser.add_argument("root", help="Directory containing the release files")
+    parser.add_argument("--version", required=True, help="Release version, e.g. 1.1.0")
+    parser.add_argument("--base-url", help="URL the individual release files are served from")
+    parser.add_argument("-o", "--output", help="Write the manifest here instead of stdout")
+    args = parser.parse_args()
+
+    manifest = build_manifest(args.root, args.version, args.base_url)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+    else:
+        json.dump(manifest, sys.stdout, indent=2, sort_keys=True)
+        sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+"""Read installed distributions straight from an environment's site-packages
+
+Parsing dist-info directories directly is much cheaper than asking pip, and
+works without starting the environment's interpreter.
+"""
+import os
+import re
+import csv
+import sys
+import glob
+from email.parser import HeaderParser
+
+REQUIREMENT_NAME = re.compile(r"^\s*([A-Za-z0-9][A-Za-z0-9._-]*)")
+EXTRA_MARKER = re.compile(r"extra\s*==")
+
+
+def normalize_name(name):
+    """PEP 503 normalized project name"""
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+
+def project_from_info_dir(info_dir):
+    """Normalized project name of a foo_bar-1.0.dist-info or .egg-info directory name"""
+    return normalize_name(os.path.splitext(info_dir)[0].split("-")[0])
+
+
+def env_python(env_path):
+    if sys.platform == "win32":
+        return os.path.join(env_path, "Scripts", "python.exe")
+    return os.path.join(env_path, "bin", "python")
+
+
+def env_scripts_dir(env_path):
+    return os.path.join(env_path, "Scripts" if sys.platform == "win32" else "bin")
+
+
+def env_site_packages(env_path):
+    """site-packages directories of a virtual environment"""
+    if sys.platform == "win32":
+        candidates = [os.path.join(env_path, "Lib", "site-packages")]
+    else:
+        candidates = sorted(glob.glob(os.path.join(env_path, "lib", "python*", "site-packages")))
+    return [path for path in candidates if os.path.isdir(path)]
+
+
+def read_venv_config(env_path):
+    """Keys and values of an environment's pyvenv.cfg; empty if it has none"""
+    config = {}
+    try:
+        with open(os.path.join(env_path, "pyvenv.cfg"), "r", encoding="utf-8") as f:
+            for line in f:
+                key, separator, value = line.partition("=")
+                if separator:
+                    config[key.strip()] = value.strip()
+    except OSError:
+        pass
+    return config
+
+
+def parse_record(text):
+    """Parse a RECORD file into (path, algorithm, digest, size) tuples
+
+    algorithm and digest are None for entries without a hash (RECORD itself,
+    and sometimes compiled files).
+    """
+    entries = []
+    for row in csv.reader(text.splitlines()):
+        if not row or not row[0]:
+            continue
+        path = row[0]
+        algorithm = digest = None
+        if len(row) > 1 and "=" in row[1]:
+            algorithm, digest = row[1].split("=", 1)
+        size = int(row[2]) if len(row) > 2 and row[2].isdigit() else None
+        entries.append((path, algorithm, digest, size))
+    return entries
+
+
+def requirement_names(requirements):
+    """Names of the unconditional requirements in Requires-Dist values"""
+    names = []
+    for requirement in requirements:
+        if ";" in requirement and EXTRA_MARKER.search(requirement.split(";", 1)[1]):
+            continue
+        match = REQUIREMENT_NAME.match(requirement)
+        if match:
+            names.append(match.group(1))
+    return names
+
+
+class Distribution:
+    """One installed distribution (a .dist-info or .egg-info directory)"""
+
+    def __init__(self, site_dir, info_dir):
+        self.site_dir = site_dir
+        self.info_dir = info_dir
+        self._metadata = None
+
+    @property
+    def path(self):
+        return os.path.join(self.site_dir, self.info_dir)
+
+    @property
+    def is_dist_info(self):
+        return self.info_dir.endswith(".dist-info")
+
+    @property
+    def metadata(self):
+        if self._metadata is None:
+            name = "METADATA" if self.is_dist_info else "PKG-INFO"
+            try:
+                with open(os.path.join(self.path, name), "r", encoding="utf-8", errors="replace") as f:
+                    text = f.read()
+                # Only the headers are needed; parsing the long description is slow
+                self._metadata = HeaderParser().parsestr(text.split("\n\n", 1)[0])
+            except OSError:
+                self._metadata = HeaderParser().parsestr("")
+        return self._metadata
+
+    @property
+    def name(self):
+        name = self.metadata.get("Name")
+        if name:
+            return name
+        # Fall back to the directory name, e.g. foo_bar-1.0.dist-info
+        return os.path.splitext(self.info_dir)[0].split("-")[0]
+
+    @property
+    def normalized_name(self):
+        return normalize_name(self.name)
+
+    @property
+    def version(self):
+        version = self.metadata.get("Version")
+        if version:
+            return version
+        parts = os.path.splitext(self.info_dir)[0].split("-")
+        return parts[1] if len(parts) > 1 else ""
+
+    @property
+    def requires(self):
+        """Names of the distributions this one unconditionally requires"""
+        if self.is_dist_info:
+            return requirement_names(self.metadata.get_all("Requires-Dist") or [])
+        try:
+            with open(os.path.join(self.path, "requires.txt"), "r", encoding="utf-8") as f:
+                lines = f.read().split("\n[", 1)[0].splitlines()  # Skip [extra] sections
+        except OSError:
+            return []
+        return requirement_names(line for line in lines if line.strip())
+
+    @property
+    def requires_dist(self):
+        """Every requirement as a Requires-Dist value, including those of extras and with markers"""
+        if self.is_dist_info:
+            return self.metadata.get_all("Requires-Dist") or []
+        # requires.txt lists extras and markers as [extra:marker] sections
+        requirements = []
+        marker = None
+        for line in (self.read_text("requires.txt") or "").splitlines():
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if line.startswith("[") and line.endswith("]"):
+                extra, _, condition = line[1:-1].partition(":")
+                parts = ([f'extra == "{extra}"'] if extra else []) + ([f"({condition})"] if condition else [])
+                marker = " and ".join(parts) or None
+                continue
+            requirements.append(f"{line}; {marker}" if marker else line)
+        return requirements
+
+    @property
+    def requested(self):
+        """Whether the installer recorded this distribution as explicitly requested"""
+        return os.path.exists(os.path.join(self.path, "REQUESTED"))
+
+    def read_text(self, name):
+        try:
+            with open(os.path.join(self.path, name), "r", encoding="utf-8") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def record(self):
+        """RECORD entries, or None if the distribution has no RECORD"""
+        text = self.read_text("RECORD")
+        return parse_record(text) if text is not None else None
+
+    def owned_files(self):
+        """Absolute paths of the files this distribution installed, if known"""
+        if self.is_dist_info:
+            entries = self.record()
+            if entries is None:
+                return None
+            return [os.path.normpath(os.path.join(self.site_dir, entry[0])) for entry in entries]
+        text = self.read_text("installed-files.txt")
+        if text is None:
+            return None
+        return [os.path.normpath(os.path.join(self.path, line)) for line in text.splitlines() if line]
+
+
+def find_distributions(env_path):
+    """All distributions installed in an environment's site-packages"""
+    distributions = []
+    for site_dir in env_site_packages(env_path):
+        try:
+            names = sorted(os.listdir(site_dir))
+        except OSError:
+            continue
+        for name in names:
+            if name.endswith((".dist-info", ".egg-info")) and os.path.isdir(os.path.join(site_dir, name)):
+                distributions.append(Distribution(site_dir, name))
+    return distributions
+
+
+# Installer tooling is never offered for removal as an orphan
+PROTECTED_PACKAGES = {"pip", "setuptools", "wheel"}
+
+
+def dependency_graph(distributions):
+    """Map each normalized name to the normalized names it requires (installed ones only)"""
+    installed = {dist.normalized_name for dist in distributions}
+    graph = {}
+    for dist in distributions:
+        requires = {normalize_name(name) for name in dist.requires}
+        graph.setdefault(dist.normalized_name, set()).update(requires & installed)
+    return graph
+
+
+def reachable(graph, start):
+    """All names reachable from start through requirements, including start"""
+    seen = set()
+    stack = list(start)
+    while stack:
+        name = stack.pop()
+        if name in seen:
+            continue
+        seen.add(name)
+        stack.extend(graph.get(name, ()))
+    return seen
+
+
+def find_orphans(graph, removing, keep=(), protected=PROTECTED_PACKAGES):
+    """Dependencies that nothing else needs once removing is uninstalled
+
+    A distribution is an orphan if it is (transitively) required by something
+    being removed, and is not required by anything that stays. Names in keep
+    (e.g. packages the user installed explicitly) are never orphans.
+    """
+    removing = set(removing)
+    remaining = {name: deps - removing for name, deps in graph.items() if name not in removing}
+    dependencies = set()
+    for name in removing:
+        dependencies |= graph.get(name, set())
+    candidates = reachable(remaining, dependencies & set(remaining)) - set(keep) - set(protected)
+    roots = set(remaining) - candidates
+    return candidates - reachable(remaining, roots)
+
+
+def required_by(graph, name):
+    """Names of the distributions that require name"""
+    return {other for other, deps in graph.items() if name in deps}
@@ -0,0 +1,110 @@
+"""Helper process that answers package inventory queries for one environment
+
+This script is run by the environment's own interpreter and must only use
+the standard library. It reads JSON-RPC 2.0 requests from stdin, one per
+line, and writes one response line per request to stdout.
+"""
+import re
+import sys
+import json
+import importlib
+import traceback
+
+try:
+    import importlib.metadata as importlib_metadata
+except ImportError:  # Python < 3.8
+    importlib_metadata = None
+
+REQUIREMENT_NAME = re.compile(r"^\s*([A-Za-z0-9][A-Za-z0-9._-]*)")
+EXTRA_MARKER = re.compile(r"extra\s*==")
+
+
+def normalize(name):
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+
+def requirement_names(requirements):
+    """Names of the unconditional requirements of a distribution"""
+    names = []
+    for requirement in requirements or []:
+        if ";" in requirement and EXTRA_MARKER.search(requirement.split(";", 1)[1]):
+            continue
+        match = REQUIREMENT_NAME.match(requirement)
+        if match:
+            names.append(match.group(1))
+    return names
+
+
+def iter_distributions():
+    """Yield (name, version, location, installer, requires) for each distribution"""
+    importlib.invalidate_caches()
+    if importlib_metadata is not None:
+        seen = set()
+        for dist in importlib_metadata.distributions():
+            name = dist.metadata["Name"]
+            if not name or normalize(name) in seen:
+                continue  # Shadowed by an earlier sys.path entry
+            seen.add(normalize(name))
+            installer = (dist.read_text("INSTALLER") or "").strip()
+            location = str(getattr(dist, "_path", "") or "")
+            yield name, dist.version, location, installer, requirement_names(dist.requires)
+    else:
+        import pkg_resources
+        for dist in pkg_resources.WorkingSet():
+            installer = ""
+            if dist.has_metadata("INSTALLER"):
+                installer = dist.get_metadata("INSTALLER").strip()
+            yield (dist.project_name, dist.version, dist.location, installer,
+                   [str(req.project_name) for req in dist.requires()])
+
+
+def handle_ping(params):
+    return {"python": sys.version.split()[0], "executable": sys.executable}
+
+
+def handle_inventory(params):
+    return [
+        {"name": name, "version": version, "location": location,
+         "installer": installer, "requires": requires}
+        for name, version, location, installer, requires in iter_distributions()
+    ]
+
+
+HANDLERS = {
+    "ping": handle_ping,
+    "inventory": handle_inventory,
+}
+
+
+def main():
+    # Anything a handler prints must not end up in the protocol stream
+    protocol = sys.stdout
+    sys.stdout = sys.stderr
+
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get("id")
+            method = request["method"]
+            if method == "shutdown":
+                response = {"jsonrpc": "2.0", "id": request_id, "result": None}
+                protocol.write(json.dumps(response) + "\n")
+                protocol.flush()
+                break
+            if method not in HANDLERS:
+                raise NotImplementedError(f"Unknown method: {method}")
+            response = {"jsonrpc": "2.0", "id": request_id,
+                        "result": HANDLERS[method](request.get("params") or {})}
+        except Exception as e:
+            response = {"jsonrpc": "2.0", "id": request_id,
+                        "error": {"code": -32000, "message": f"{type(e).__name__}: {e}",
+                                  "data": traceback.format_exc()}}
+        protocol.write(json.dumps(response) + "\n")
+        protocol.flush()
+
+
+if __name__ == "__main__":
+    main()
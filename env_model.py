@@ -0,0 +1,322 @@
+"""Shared, observable state of the environments open in the application
+
+Every window showing an environment subscribes to the same
+EnvironmentModel. Package lists and outdated checks are loaded once on
+worker threads and every change is pushed to all subscribers, so an
+install in one window shows up in all of them. State is only modified on
+the UI thread, through the progress bus.
+
+Outdated packages are found by comparing installed versions with the
+latest releases on the package index, which are cached and shared with the
+fleet-wide outdated check, rather than by running pip each time.
+"""
+import os
+import sys
+import json
+
+from distributions import find_distributions, env_site_packages, normalize_name, project_from_info_dir, dependency_graph
+from fs_watch import watch_directories
+from helper_client import HelperError
+from tracing import tracer
+import scheduler
+from scheduler import PRIORITY_INTERACTIVE
+from versions import is_newer
+
+# Events passed to subscribers
+PACKAGES_CHANGED = "packages"
+OUTDATED_CHANGED = "outdated"
+LOAD_FAILED = "error"
+
+
+class EnvironmentModel:
+    """Installed packages, outdated packages and the dependency graph of one environment
+
+    Subscribers are called on the UI thread as callback(event, names):
+    PACKAGES_CHANGED with the changed normalized names (None when the whole
+    list was reloaded), OUTDATED_CHANGED with None, and LOAD_FAILED with an
+    error message. on_change(model, event, names) is called after them, for
+    views of every environment such as the main list.
+    """
+
+    def __init__(self, env, bus, latest_versions, get_helper=None, watch=True, on_change=None):
+        self.env = env
+        self.bus = bus
+        self.latest_versions = latest_versions  # Returns the shared fleet.LatestVersions
+        self.get_helper = get_helper or (lambda: None)
+        self.watch = watch
+        self.on_change = on_change
+        self.packages = None  # normalized name -> {"name", "version"}
+        self.outdated = None  # normalized name -> {"name", "version", "latest_version"}
+        self._unchecked = set()  # Changed since the last outdated check, or not found by it
+        self._distributions = None
+        self._subscribers = []
+        self._tasks = {}
+        self._rerun = set()
+        self._watcher = None
+        self._operations = 0
+        self.stale = False  # Showing a saved package list until the first load
+
+    @property
+    def path(self):
+        return self.env["path"]
+
+    @property
+    def name(self):
+        return self.env["name"]
+
+    @property
+    def pip_exe(self):
+        if sys.platform == "win32":
+            return os.path.join(self.path, "Scripts", "pip.exe")
+        return os.path.join(self.path, "bin", "pip")
+
+    # Subscriptions
+
+    def subscribe(self, callback):
+        """Register callback(event, names); returns a function that unsubscribes"""
+        self._subscribers.append(callback)
+        if self.watch and self._watcher is None:
+            site_dirs = env_site_packages(self.path)
+            if site_dirs:
+                self._watcher = watch_directories(
+                    site_dirs, lambda names: self.bus.post(lambda: self.apply_changes(names))
+                )
+
+        def unsubscribe():
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+            if not self._subscribers and self._watcher:
+                self._watcher.stop()
+                self._watcher = None
+        return unsubscribe
+
+    @property
+    def in_use(self):
+        """Whether a window is showing the environment or an operation is running in it"""
+        return bool(self._subscribers or self._operations or self._tasks)
+
+    def _notify(self, event, names=None):
+        callbacks = list(self._subscribers)
+        if self.on_change:
+            callbacks.append(lambda event, names: self.on_change(self, event, names))
+        for callback in callbacks:
+            try:
+                callback(event, names)
+            except Exception as e:
+                print(f"Environment model subscriber error: {str(e)}")
+
+    def _run(self, key, title, work, done, force=False, report_errors=True):
+        """Run work() on a worker thread and pass its result to done() on the UI thread
+
+        A load that is already running is not started twice; when force is
+        set it runs once more after the current one, whose data may be stale.
+        """
+        if key in self._tasks:
+            if force:
+                self._rerun.add(key)
+            return
+
+        def runner(task):
+            result = work()
+            self.bus.post(lambda: done(result))
+
+        def on_progress(state):
+            if not state.finished:
+                return
+            self._tasks.pop(key, None)
+            if state.error:
+                if report_errors:
+                    self._notify(LOAD_FAILED, state.error)
+                else:
+                    print(f"{title} failed: {state.error}")
+            if key in self._rerun:
+                self._rerun.discard(key)
+                self._run(key, title, work, done, report_errors=report_errors)
+
+        task = self.bus.run_in_thread(title, runner)
+        self.bus.subscribe(task, on_progress)
+        self._tasks[key] = task
+
+    # Installed packages
+
+    def seed(self, packages, outdated=None):
+        """Show saved (name, version) pairs and [name, version, latest] outdated rows until the first load"""
+        if self.packages is not None:
+            return
+        self.packages = {normalize_name(name): {"name": name, "version": version} for name, version in packages}
+        if outdated is not None:
+            self.outdated = {normalize_name(row[0]): {"name": row[0], "version": row[1], "latest_version": row[2]}
+                             for row in outdated}
+        self.stale = True
+
+    def load(self, force=False):
+        """Load the package list unless it is loaded; an outdated check follows"""
+        if self.packages is not None and not self.stale and not force:
+            return
+        self._run("packages", f"List packages in {self.name}", self._read_packages, self._set_packages, force)
+
+    def _read_packages(self):
+        helper = self.get_helper()
+        if helper:
+            try:
+                return helper.request("inventory")
+            except HelperError as e:
+                print(f"Environment helper failed, using pip: {str(e)}")
+        result = scheduler.run([self.pip_exe, "list", "--format=json"], env_name=self.name,
+                               priority=PRIORITY_INTERACTIVE, capture_output=True, text=True, check=True)
+        return json.loads(result.stdout)
+
+    def _set_packages(self, rows):
+        self.packages = {normalize_name(row["name"]): {"name": row["name"], "version": row["version"]}
+                         for row in rows}
+        self._distributions = None
+        self.stale = False
+        self._notify(PACKAGES_CHANGED, None)
+        self.check_outdated(force=True)
+
+    def sorted_packages(self):
+        """(normalized name, row) pairs sorted by display name"""
+        return sorted((self.packages or {}).items(), key=lambda item: item[1]["name"].lower())
+
+    # Outdated packages
+
+    def check_outdated(self, force=False):
+        """Find the outdated packages unless that is known; needs the package list"""
+        if self.packages is None or (self.outdated is not None and not force):
+            return
+        packages = [dict(row) for row in self.packages.values()]
+        self._run("outdated", f"Check {self.name} for updates", lambda: self._read_outdated(packages),
+                  self._set_outdated, force, report_errors=False)
+
+    def _read_outdated(self, packages):
+        """(outdated rows, names whose latest release could not be looked up)"""
+        latest = self.latest_versions().lookup(normalize_name(row["name"]) for row in packages)
+        rows = [dict(row, latest_version=latest[normalize_name(row["name"])])
+                for row in packages if is_newer(latest.get(normalize_name(row["name"])), row["version"])]
+        unknown = {normalize_name(row["name"]) for row in packages} - latest.keys()
+        return rows, unknown
+
+    def _set_outdated(self, result):
+        rows, unknown = result
+        self.outdated = {normalize_name(row["name"]): row for row in rows}
+        self._unchecked = set(unknown)
+        self._notify(OUTDATED_CHANGED)
+
+    @property
+    def unknown(self):
+        """Packages whose latest release is not known, having changed since the check or not been found"""
+        return set(self._unchecked)
+
+    def latest_version(self, name):
+        """Latest version of an installed package, "Up to date", "Unknown", or None before the first check"""
+        if self.outdated is None:
+            return None
+        name = normalize_name(name)
+        if name in self._unchecked:
+            return "Unknown"
+        row = self.outdated.get(name)
+        return row["latest_version"] if row else "Up to date"
+
+    # Dependencies
+
+    def distributions(self):
+        """Installed distributions, read once per package list change"""
+        if self._distributions is None:
+            self._distributions = find_distributions(self.path)
+        return self._distributions
+
+    def dependency_graph(self):
+        return dependency_graph(self.distributions())
+
+    def requirements(self, name):
+        """(name, installed version or None) for each requirement of a package"""
+        by_name = {}
+        for dist in self.distributions():
+            by_name.setdefault(dist.normalized_name, dist)
+        dist = by_name.get(normalize_name(name))
+        if dist is None:
+            return []
+        result = []
+        for requirement in dict.fromkeys(dist.requires):
+            installed = by_name.get(normalize_name(requirement))
+            result.append((requirement, installed.version if installed else None))
+        return result
+
+    # Changes
+
+    def begin_operation(self):
+        """Note that pip is changing the environment; watcher events are ignored meanwhile"""
+        self._operations += 1
+
+    def end_operation(self):
+        """Reload everything once the last running operation has finished"""
+        self._operations = max(self._operations - 1, 0)
+        if not self._operations:
+            self.load(force=True)
+
+    def apply_changes(self, names):
+        """Apply site-packages changes reported by the watcher, touching only the affected packages"""
+        if self._operations or self.packages is None:
+            return
+        if names is None:
+            self.load(force=True)
+            return
+
+        projects = {project_from_info_dir(name) for name in names if name.endswith((".dist-info", ".egg-info"))}
+        if not projects:
+            return
+
+        with tracer.span("apply inventory changes", "app", environment=self.name, projects=len(projects)):
+            self._distributions = None
+            installed = {}
+            for dist in self.distributions():
+                project = project_from_info_dir(dist.info_dir)
+                if project in projects and project not in installed:
+                    installed[project] = dist
+
+            for project in projects:
+                dist = installed.get(project)
+                if dist is None:
+                    self.packages.pop(project, None)
+                    self._unchecked.discard(project)
+                    if self.outdated is not None:
+                        self.outdated.pop(project, None)
+                    continue
+                self.packages[project] = {"name": dist.name, "version": dist.version}
+                if self.outdated is None:
+                    continue
+                row = self.outdated.get(project)
+                if row is None:
+                    # Was current or is new; unknown until the next check
+                    self._unchecked.add(project)
+                elif not is_newer(row["latest_version"], dist.version):
+                    del self.outdated[project]
+                else:
+                    row["version"] = dist.version
+        self._notify(PACKAGES_CHANGED, projects)
+
+
+class ModelRegistry:
+    """One EnvironmentModel per environment path"""
+
+    def __init__(self, factory):
+        self.factory = factory
+        self._models = {}
+
+    def get(self, env):
+        key = os.path.normcase(os.path.abspath(env["path"]))
+        model = self._models.get(key)
+        if model is None:
+            model = self._models[key] = self.factory(env)
+        return model
+
+    def models(self):
+        return list(self._models.values())
+
+    def find(self, env):
+        """The environment's model if one exists, without creating it"""
+        return self._models.get(os.path.normcase(os.path.abspath(env["path"])))
+
+    def discard(self, env):
+        """Forget an environment's model, e.g. after the environment moved"""
+        self._models.pop(os.path.normcase(os.path.abspath(env["path"])), None)
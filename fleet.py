@@ -0,0 +1,212 @@
+"""Outdated packages across every registered environment
+
+Inventories come from the inventory cache, so unchanged environments are
+not rescanned, and each project's latest release is looked up once per scan
+no matter how many environments contain it. Both steps run concurrently.
+"""
+import os
+import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from distributions import normalize_name
+from http_cache import write_json_atomic
+from package_index import PROJECT_TTL
+from progress_bus import OperationCancelled
+from tracing import tracer
+from versions import latest as latest_release, is_newer
+
+REPORT_FILE = "fleet.json"
+INVENTORY_WORKERS = 4
+LOOKUP_WORKERS = 16
+
+
+class LatestVersions:
+    """Latest release of each project on a package index, shared by every environment
+
+    Lookups go through PackageIndex.versions, which keeps project pages on
+    disk; results are also kept in memory for the same TTL.
+    """
+
+    def __init__(self, package_index, ttl=PROJECT_TTL):
+        self.package_index = package_index
+        self.ttl = ttl
+        self._latest = {}  # project -> (latest version or None, looked up at)
+        self._lock = threading.Lock()
+
+    def get(self, project):
+        """Latest release of project, or None if the index does not have it"""
+        project = normalize_name(project)
+        with self._lock:
+            entry = self._latest.get(project)
+        if entry and time.time() - entry[1] < self.ttl:
+            return entry[0]
+        latest = latest_release(self.package_index.versions(project))
+        with self._lock:
+            self._latest[project] = (latest, time.time())
+        return latest
+
+    def lookup(self, projects, progress=None, cancelled=None):
+        """Latest releases of many projects at once
+
+        Returns {project: latest or None}. Projects that could not be looked
+        up, e.g. because the index is unreachable, are left out.
+        """
+        projects = sorted(set(projects))
+        results = {}
+
+        def get(project):
+            if cancelled and cancelled():
+                return project, None, False
+            try:
+                return project, self.get(project), True
+            except Exception as e:
+                print(f"Could not look up {project}: {str(e)}")
+                return project, None, False
+
+        with tracer.span("look up latest versions", "http", projects=len(projects)):
+            with ThreadPoolExecutor(max_workers=LOOKUP_WORKERS) as pool:
+                for done, (project, latest, found) in enumerate(pool.map(get, projects), 1):
+                    if found:
+                        results[project] = latest
+                    if progress:
+                        progress(done, len(projects))
+        if cancelled and cancelled():
+            raise OperationCancelled()
+        return results
+
+
+def scan_fleet(environments, inventory_cache, latest_versions, progress=None, cancelled=None):
+    """Outdated packages of every environment; returns a report dict
+
+    The report maps each environment path to its name, package count,
+    the number of packages whose latest release is unknown, the outdated
+    packages as [name, installed, latest] rows, the same rows for packages
+    that are current there but outdated elsewhere, and an error message if
+    its packages could not be read.
+    """
+    progress = progress or (lambda done, total, message: None)
+
+    def read(env):
+        if cancelled and cancelled():
+            return env, None, None
+        if not os.path.isdir(env["path"]):
+            return env, None, "Environment not found"
+        try:
+            return env, inventory_cache.get(env["path"]), None
+        except Exception as e:
+            return env, None, str(e)
+
+    with tracer.span("scan fleet", "app", environments=len(environments)) as attrs:
+        progress(0, None, "Reading package lists...")
+        with ThreadPoolExecutor(max_workers=INVENTORY_WORKERS) as pool:
+            inventories = list(pool.map(read, environments))
+        if cancelled and cancelled():
+            raise OperationCancelled()
+
+        projects = {normalize_name(row[0]) for env, rows, error in inventories for row in rows or []}
+        attrs["projects"] = len(projects)
+        latest = latest_versions.lookup(
+            projects,
+            progress=lambda done, total: progress(done, total, f"Looked up {done} of {total} projects"),
+            cancelled=cancelled
+        )
+
+        report = {"scanned_at": time.time(), "index_url": latest_versions.package_index.index_url,
+                  "environments": {}}
+        stale = set()  # Outdated in at least one environment
+        for env, rows, error in inventories:
+            for row in rows or []:
+                project = normalize_name(row[0])
+                if is_newer(latest.get(project), row[1]):
+                    stale.add(project)
+        for env, rows, error in inventories:
+            outdated, current, unknown = [], [], 0
+            for name, version in ((row[0], row[1]) for row in rows or []):
+                project = normalize_name(name)
+                if latest.get(project) is None:
+                    unknown += 1
+                elif is_newer(latest[project], version):
+                    outdated.append([name, version, latest[project]])
+                elif project in stale:
+                    # Up to date here but outdated elsewhere, shown in the matrix
+                    current.append([name, version, latest[project]])
+            report["environments"][env["path"]] = {
+                "name": env["name"],
+                "packages": len(rows or []),
+                "unknown": unknown,
+                "outdated": sorted(outdated, key=lambda row: row[0].lower()),
+                "current": current,
+                "error": error,
+            }
+    return report
+
+
+def update_entry(report, env, installed, outdated, unknown):
+    """Bring one environment's entry in a report up to date, e.g. after an install
+
+    installed holds the (name, version) pairs now in the environment,
+    outdated its [name, installed, latest] rows and unknown the number of
+    packages whose latest release is unknown. Packages that are no longer
+    outdated stay in the matrix as current rows.
+    """
+    environments = report.setdefault("environments", {})
+    previous = environments.get(env["path"]) or {"outdated": [], "current": []}
+    latest = {normalize_name(row[0]): row[2] for row in previous["outdated"] + previous["current"]}
+    versions = {normalize_name(name): (name, version) for name, version in installed}
+    outdated_projects = {normalize_name(row[0]) for row in outdated}
+    current = []
+    for project, latest_version in sorted(latest.items()):
+        if project in versions and project not in outdated_projects:
+            name, version = versions[project]
+            if not is_newer(latest_version, version):
+                current.append([name, version, latest_version])
+    environments[env["path"]] = {
+        "name": env["name"],
+        "packages": len(versions),
+        "unknown": unknown,
+        "outdated": sorted(([row[0], row[1], row[2]] for row in outdated), key=lambda row: row[0].lower()),
+        "current": current,
+        "error": None,
+    }
+
+
+def outdated_matrix(report, paths=None):
+    """Package x environment view of a report
+
+    Returns (environment names, rows) where each row is (package name,
+    latest, {environment name: (installed, outdated)}) for the packages
+    outdated in at least one of the environments in paths (all when None).
+    """
+    environments = report.get("environments", {})
+    paths = [path for path in (environments if paths is None else paths) if path in environments]
+    matrix = {}
+    for path in paths:
+        for name, installed, latest in environments[path]["outdated"]:
+            matrix.setdefault(normalize_name(name), (name, latest, {}))
+    for path in paths:
+        entry = environments[path]
+        for rows, outdated in ((entry["outdated"], True), (entry.get("current", []), False)):
+            for name, installed, latest in rows:
+                row = matrix.get(normalize_name(name))
+                if row:
+                    row[2][entry["name"]] = (installed, outdated)
+    return [environments[path]["name"] for path in paths], [matrix[key] for key in sorted(matrix)]
+
+
+def report_path(cache_dir):
+    return os.path.join(str(cache_dir), REPORT_FILE)
+
+
+def load_report(cache_dir):
+    """The last saved report, or None"""
+    try:
+        with open(report_path(cache_dir), "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_report(cache_dir, report):
+    write_json_atomic(report_path(cache_dir), report)
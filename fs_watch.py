@@ -0,0 +1,174 @@
+import os
+import sys
+import select
+import struct
+import threading
+
+# Quiet period before a burst of changes is reported
+DEFAULT_DEBOUNCE = 0.5
+# How often the polling fallback rescans
+DEFAULT_POLL_INTERVAL = 2.0
+
+# inotify constants from <sys/inotify.h>
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO | IN_CLOSE_WRITE | IN_ATTRIB | IN_DELETE_SELF
+EVENT_HEADER = struct.Struct("iIII")
+
+
+def load_inotify():
+    """Return libc if it provides inotify, else None"""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        import ctypes
+        import ctypes.util
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1
+        libc.inotify_add_watch
+        return libc
+    except (OSError, AttributeError):
+        return None
+
+
+class Debouncer:
+    """Collects changed names and reports them once things have been quiet
+
+    callback(names) receives a set of entry names, or None when the watcher
+    lost track of changes and everything should be rescanned.
+    """
+
+    def __init__(self, callback, delay=DEFAULT_DEBOUNCE):
+        self.callback = callback
+        self.delay = delay
+        self._names = set()
+        self._everything = False
+        self._timer = None
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def add(self, name=None):
+        with self._lock:
+            if self._closed:
+                return
+            if name is None:
+                self._everything = True
+            else:
+                self._names.add(name)
+            if self._timer:
+                self._timer.cancel()
+            self._timer = threading.Timer(self.delay, self._flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _flush(self):
+        with self._lock:
+            names = None if self._everything else self._names
+            self._names = set()
+            self._everything = False
+            self._timer = None
+        try:
+            self.callback(names)
+        except Exception as e:
+            print(f"Watch callback error: {str(e)}")
+
+    def cancel(self):
+        """Drop pending changes and ignore any that arrive later"""
+        with self._lock:
+            self._closed = True
+            if self._timer:
+                self._timer.cancel()
+                self._timer = None
+
+
+class DirectoryWatcher:
+    """Watches the top level of some directories for added, removed or changed entries
+
+    Uses inotify where available and otherwise compares directory listings
+    every poll_interval seconds. Changes are debounced and reported on a
+    background thread as the set of changed entry names.
+    """
+
+    def __init__(self, paths, callback, debounce=DEFAULT_DEBOUNCE, poll_interval=DEFAULT_POLL_INTERVAL):
+        self.paths = [os.path.abspath(path) for path in paths]
+        self.poll_interval = poll_interval
+        self._debouncer = Debouncer(callback, debounce)
+        self._stop = threading.Event()
+        self._thread = None
+        self._libc = load_inotify()
+        self.backend = "inotify" if self._libc else "polling"
+
+    def start(self):
+        target = self._run_inotify if self._libc else self._run_polling
+        self._thread = threading.Thread(target=target, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._debouncer.cancel()
+
+    def _run_inotify(self):
+        fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            self.backend = "polling"
+            return self._run_polling()
+        try:
+            for path in self.paths:
+                self._libc.inotify_add_watch(fd, os.fsencode(path), WATCH_MASK)
+            while not self._stop.is_set():
+                ready, _, _ = select.select([fd], [], [], 0.5)
+                if not ready:
+                    continue
+                try:
+                    data = os.read(fd, 64 * 1024)
+                except BlockingIOError:
+                    continue
+                offset = 0
+                while offset + EVENT_HEADER.size <= len(data):
+                    wd, mask, cookie, length = EVENT_HEADER.unpack_from(data, offset)
+                    offset += EVENT_HEADER.size
+                    name = data[offset:offset + length].rstrip(b"\0")
+                    offset += length
+                    if mask & (IN_Q_OVERFLOW | IN_DELETE_SELF):
+                        self._debouncer.add(None)
+                    elif name:
+                        self._debouncer.add(os.fsdecode(name))
+        finally:
+            os.close(fd)
+
+    def _snapshot(self):
+        entries = {}
+        for path in self.paths:
+            try:
+                with os.scandir(path) as it:
+                    for entry in it:
+                        try:
+                            entries[entry.name] = entry.stat(follow_symlinks=False).st_mtime_ns
+                        except OSError:
+                            pass
+            except OSError:
+                pass
+        return entries
+
+    def _run_polling(self):
+        previous = self._snapshot()
+        while not self._stop.wait(self.poll_interval):
+            current = self._snapshot()
+            for name in set(previous) | set(current):
+                if previous.get(name) != current.get(name):
+                    self._debouncer.add(name)
+            previous = current
+
+
+def watch_directories(paths, callback, **kwargs):
+    """Start watching paths; returns the DirectoryWatcher (call stop() when done)"""
+    return DirectoryWatcher(paths, callback, **kwargs).start()
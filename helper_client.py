@@ -0,0 +1,195 @@
+import os
+import sys
+import json
+import time
+import itertools
+import threading
+import subprocess
+
+from tracing import tracer
+import scheduler
+from scheduler import PRIORITY_INTERACTIVE
+from progress_bus import OperationCancelled
+
+# Helpers with no requests for this long are shut down
+DEFAULT_IDLE_TIMEOUT = 5 * 60
+# A helper that takes longer than this to answer is considered hung and killed
+DEFAULT_REQUEST_TIMEOUT = 60
+
+
+def helper_script_path():
+    """Location of env_helper.py, also when running from a PyInstaller bundle"""
+    base = getattr(sys, "_MEIPASS", os.path.dirname(os.path.abspath(__file__)))
+    return os.path.join(base, "env_helper.py")
+
+
+class HelperError(Exception):
+    """The helper could not be started or returned an error"""
+
+
+class EnvironmentHelper:
+    """A long-lived helper process running in one environment's interpreter
+
+    The process is started on the first request and stopped after
+    idle_timeout seconds without requests, so it costs nothing while an
+    environment is not being looked at.
+    """
+
+    def __init__(self, python_exe, env_name="", idle_timeout=DEFAULT_IDLE_TIMEOUT):
+        self.python_exe = python_exe
+        self.env_name = env_name
+        self.idle_timeout = idle_timeout
+        self._process = None
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._idle_timer = None
+
+    def _start(self):
+        with tracer.span("helper start", "subprocess", environment=self.env_name,
+                         command=f"{self.python_exe} env_helper.py"):
+            self._process = subprocess.Popen(
+                [self.python_exe, "-u", helper_script_path()],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                universal_newlines=True,
+                bufsize=1
+            )
+
+    def _reset_idle_timer(self):
+        if self._idle_timer:
+            self._idle_timer.cancel()
+        self._idle_timer = threading.Timer(self.idle_timeout, self.close)
+        self._idle_timer.daemon = True
+        self._idle_timer.start()
+
+    def _watch(self, cancelled, timeout):
+        """Kill the helper when cancelled or past timeout, so a blocked read returns
+
+        Returns (done event, outcome dict); the reason is set if it was killed.
+        """
+        process = self._process
+        outcome = {"reason": None}
+        done = threading.Event()
+        deadline = time.perf_counter() + timeout
+
+        def watch():
+            while not done.wait(scheduler.POLL_INTERVAL):
+                if cancelled and cancelled():
+                    outcome["reason"] = "cancelled"
+                elif time.perf_counter() > deadline:
+                    outcome["reason"] = "timeout"
+                else:
+                    continue
+                try:
+                    process.kill()
+                except OSError:
+                    pass
+                return
+
+        threading.Thread(target=watch, daemon=True).start()
+        return done, outcome
+
+    def request(self, method, priority=PRIORITY_INTERACTIVE, cancelled=None, timeout=DEFAULT_REQUEST_TIMEOUT,
+                **params):
+        """Send a request and return its result
+
+        The request counts against the process scheduler's limit like any
+        other subprocess call. Raises OperationCancelled if cancelled()
+        becomes true and HelperError if the helper does not answer within
+        timeout seconds; both kill the helper, which restarts on the next
+        request.
+        """
+        with scheduler.slot(priority, cancelled), self._lock:
+            with tracer.span(f"helper {method}", "helper", environment=self.env_name):
+                for attempt in range(2):
+                    if self._process is None or self._process.poll() is not None:
+                        try:
+                            self._start()
+                        except OSError as e:
+                            raise HelperError(f"Could not start helper: {str(e)}")
+                    done, outcome = self._watch(cancelled, timeout)
+                    try:
+                        request = {"jsonrpc": "2.0", "id": next(self._ids), "method": method, "params": params}
+                        self._process.stdin.write(json.dumps(request) + "\n")
+                        self._process.stdin.flush()
+                        line = self._process.stdout.readline()
+                    except (OSError, ValueError):
+                        line = ""
+                    finally:
+                        done.set()
+                    if outcome["reason"] == "cancelled":
+                        self._kill()
+                        raise OperationCancelled()
+                    if outcome["reason"] == "timeout":
+                        self._kill()
+                        raise HelperError(f"Helper did not answer '{method}' within {timeout} seconds")
+                    if line:
+                        break
+                    # The helper died (e.g. the environment changed under it); start a new one
+                    self._kill()
+                else:
+                    raise HelperError("Helper process exited unexpectedly")
+
+            self._reset_idle_timer()
+
+        response = json.loads(line)
+        if "error" in response:
+            raise HelperError(response["error"]["message"])
+        return response["result"]
+
+    def _kill(self):
+        if self._process:
+            try:
+                self._process.kill()
+                self._process.wait(timeout=5)
+            except Exception:
+                pass
+        self._process = None
+
+    def close(self):
+        """Stop the helper process; it restarts on the next request"""
+        with self._lock:
+            if self._idle_timer:
+                self._idle_timer.cancel()
+                self._idle_timer = None
+            if self._process and self._process.poll() is None:
+                try:
+                    self._process.stdin.write(json.dumps({"jsonrpc": "2.0", "id": 0, "method": "shutdown"}) + "\n")
+                    self._process.stdin.flush()
+                    self._process.wait(timeout=2)
+                except Exception:
+                    pass
+            self._kill()
+
+
+class HelperPool:
+    """One EnvironmentHelper per environment interpreter"""
+
+    def __init__(self, idle_timeout=DEFAULT_IDLE_TIMEOUT):
+        self.idle_timeout = idle_timeout
+        self._helpers = {}
+        self._lock = threading.Lock()
+
+    def get(self, python_exe, env_name=""):
+        key = os.path.normcase(os.path.abspath(python_exe))
+        with self._lock:
+            helper = self._helpers.get(key)
+            if helper is None:
+                helper = EnvironmentHelper(python_exe, env_name, self.idle_timeout)
+                self._helpers[key] = helper
+            return helper
+
+    def discard(self, python_exe):
+        """Stop and forget the helper of one interpreter, e.g. before its environment moves"""
+        with self._lock:
+            helper = self._helpers.pop(os.path.normcase(os.path.abspath(python_exe)), None)
+        if helper:
+            helper.close()
+
+    def shutdown(self):
+        with self._lock:
+            helpers = list(self._helpers.values())
+            self._helpers.clear()
+        for helper in helpers:
+            helper.close()
@@ -0,0 +1,128 @@
+import os
+import json
+import time
+import gzip
+import zlib
+import tempfile
+import urllib.request
+import urllib.error
+
+from tracing import tracer
+
+USER_AGENT = "Python Environment Manager"
+
+
+def read_body(response):
+    """Read a response body, undoing gzip/deflate content encoding"""
+    body = response.read()
+    encoding = (response.headers.get("Content-Encoding") or "").lower()
+    if encoding == "gzip":
+        body = gzip.decompress(body)
+    elif encoding == "deflate":
+        body = zlib.decompress(body)
+    return body
+
+
+def write_json_atomic(path, data):
+    """Write JSON to a file without leaving a half-written file behind"""
+    path = str(path)
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(json.dumps(data))
+        os.replace(tmp_path, path)
+    except Exception:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class CachedResource:
+    """A remote resource whose parsed form is persisted on disk
+
+    The parsed data is kept together with the validators (ETag and
+    Last-Modified) of the response it came from, so that once the TTL
+    expires the resource can be revalidated with a conditional request
+    instead of being downloaded again.
+    """
+
+    def __init__(self, url, cache_path, ttl, parse, headers=None):
+        self.url = url
+        self.cache_path = str(cache_path)
+        self.ttl = ttl
+        self.parse = parse
+        self.headers = dict(headers or {})
+        self.last_headers = {}
+
+    def load(self):
+        """Return the cached entry, or None if there is no usable cache"""
+        try:
+            with open(self.cache_path, "r") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry.get("url") != self.url or "data" not in entry:
+            return None
+        return entry
+
+    def is_fresh(self, entry):
+        """Whether a cached entry is still within its TTL"""
+        return entry is not None and time.time() - entry.get("fetched_at", 0) < self.ttl
+
+    def save(self, entry):
+        """Persist a cache entry"""
+        write_json_atomic(self.cache_path, entry)
+
+    def fetch(self, force=False, timeout=15):
+        """Return (data, status) for the resource
+
+        status is "fresh" when served from cache within the TTL,
+        "not-modified" when the server confirmed the cached copy,
+        "updated" when a new copy was downloaded and "offline" when the
+        server could not be reached and the cached copy was used instead.
+        """
+        entry = self.load()
+        if not force and self.is_fresh(entry):
+            return entry["data"], "fresh"
+
+        headers = {"User-Agent": USER_AGENT, "Accept-Encoding": "gzip, deflate"}
+        headers.update(self.headers)
+        if entry:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        req = urllib.request.Request(self.url, headers=headers)
+        try:
+            with tracer.span("http GET", "http", url=self.url, conditional=bool(entry)) as attrs, \
+                    urllib.request.urlopen(req, timeout=timeout) as response:
+                attrs["status"] = response.status
+                self.last_headers = response.headers
+                data = self.parse(read_body(response))
+                entry = {
+                    "url": self.url,
+                    "etag": response.headers.get("ETag"),
+                    "last_modified": response.headers.get("Last-Modified"),
+                    "fetched_at": time.time(),
+                    "data": data,
+                }
+                self.save(entry)
+                return data, "updated"
+        except urllib.error.HTTPError as e:
+            self.last_headers = e.headers or {}
+            if e.code == 304 and entry:
+                entry["fetched_at"] = time.time()
+                self.save(entry)
+                return entry["data"], "not-modified"
+            if entry and e.code >= 500:
+                return entry["data"], "offline"
+            raise
+        except (urllib.error.URLError, OSError):
+            if entry:
+                return entry["data"], "offline"
+            raise
@@ -0,0 +1,194 @@
+import os
+import re
+import json
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+from distributions import find_distributions, env_site_packages, env_python
+from tracing import tracer
+import scheduler
+
+IMPORT_TIMEOUT = 60
+# Modules listed as the heaviest imports under each package
+HEAVIEST_COUNT = 10
+# sys.path directories with more entries than this slow down every import lookup
+LARGE_PATH_ENTRY = 1000
+# .pth files with more path lines than this are flagged
+MANY_PTH_PATHS = 10
+
+IMPORTTIME_LINE = re.compile(r"^import time:\s*(\d+)\s*\|\s*(\d+)\s*\|( *)(.+?)\s*$")
+IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+def parse_importtime(output):
+    """Parse -X importtime output into dicts with module, self_us, cumulative_us and depth"""
+    entries = []
+    for line in output.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            entries.append({
+                "module": module,
+                "self_us": int(self_us),
+                "cumulative_us": int(cumulative_us),
+                "depth": max(len(indent) - 1, 0) // 2,
+            })
+    return entries
+
+
+def run_importtime(python, code, extra_args=(), cancelled=None):
+    """Run code under -X importtime; returns (wall seconds, entries, error)"""
+    command = [python, "-X", "importtime", *extra_args, "-c", code]
+    try:
+        result = scheduler.run(command, capture_output=True, text=True, timeout=IMPORT_TIMEOUT, cancelled=cancelled)
+    except subprocess.TimeoutExpired:
+        return None, [], f"Timed out after {IMPORT_TIMEOUT}s"
+    # Time spent waiting for a scheduler slot is not part of startup
+    wall = result.elapsed
+    if result.returncode != 0:
+        lines = [line for line in result.stderr.splitlines() if not line.startswith("import time:")]
+        return wall, [], lines[-1] if lines else f"Exited with code {result.returncode}"
+    return wall, parse_importtime(result.stderr), None
+
+
+def top_level_modules(env_path):
+    """Map importable top-level module names to the distribution providing them"""
+    modules = {}
+    for dist in find_distributions(env_path):
+        names = dist.read_text("top_level.txt")
+        if names is not None:
+            candidates = names.split()
+        else:
+            candidates = set()
+            for entry in dist.record() or []:
+                first = entry[0].split("/")[0]
+                if first.endswith(".py"):
+                    candidates.add(first[:-3])
+                elif "/" in entry[0] and not first.endswith((".dist-info", ".data")) and first not in ("..", "__pycache__"):
+                    candidates.add(first)
+        for name in candidates:
+            if IDENTIFIER.match(name) and not name.startswith("_"):
+                modules.setdefault(name, dist.name)
+    return modules
+
+
+def inspect_pth_files(env_path):
+    """.pth files in site-packages; lines starting with 'import' run on every startup"""
+    results = []
+    for site_dir in env_site_packages(env_path):
+        for name in sorted(os.listdir(site_dir)):
+            if not name.endswith(".pth"):
+                continue
+            try:
+                with open(os.path.join(site_dir, name), "r", encoding="utf-8", errors="replace") as f:
+                    lines = [line.strip() for line in f if line.strip() and not line.startswith("#")]
+            except OSError:
+                continue
+            import_lines = [line for line in lines if line.startswith(("import ", "import\t"))]
+            flags = []
+            if import_lines:
+                flags.append("Runs code at startup")
+            if len(lines) - len(import_lines) > MANY_PTH_PATHS:
+                flags.append(f"Adds {len(lines) - len(import_lines)} sys.path entries")
+            results.append({
+                "path": os.path.join(site_dir, name),
+                "import_lines": import_lines,
+                "path_lines": len(lines) - len(import_lines),
+                "flags": flags,
+            })
+    return results
+
+
+def inspect_sys_path(python):
+    """sys.path of an interpreter with the size of each entry"""
+    result = scheduler.run([python, "-c", "import sys, json; print(json.dumps(sys.path))"],
+                           capture_output=True, text=True, timeout=IMPORT_TIMEOUT, check=True)
+    entries = []
+    for path in json.loads(result.stdout):
+        if not path:
+            continue
+        flags = []
+        try:
+            count = len(os.listdir(path)) if os.path.isdir(path) else None
+        except OSError:
+            count = None
+        if count is None and os.path.exists(path):
+            flags.append("Not a directory (zip or file)")
+        elif count is not None and count > LARGE_PATH_ENTRY:
+            flags.append(f"{count} entries searched on every import")
+        entries.append({"path": path, "entries": count, "flags": flags})
+    return entries
+
+
+class ImportProfiler:
+    """Profiles interpreter startup and the import time of each top-level package"""
+
+    def __init__(self, env_path, workers=None):
+        self.env_path = env_path
+        self.python = env_python(env_path)
+        self.workers = workers or min(os.cpu_count() or 1, 8)
+        self.cancelled = None
+
+    def profile_startup(self):
+        wall, entries, error = run_importtime(self.python, "pass", cancelled=self.cancelled)
+        if not error and not entries:
+            # Older interpreters ignore the option instead of failing
+            error = "This interpreter does not support -X importtime (Python 3.7+ is required)"
+        # Without the site module, to show what site-packages and .pth files cost
+        no_site_wall, _, _ = run_importtime(self.python, "pass", ["-S"], cancelled=self.cancelled)
+        return {
+            "wall_s": wall,
+            "no_site_wall_s": no_site_wall,
+            "imports": entries,
+            "error": error,
+        }
+
+    def profile_module(self, module, startup_modules):
+        wall, entries, error = run_importtime(self.python, f"import {module}", cancelled=self.cancelled)
+        own = [entry for entry in entries if entry["module"].strip() not in startup_modules]
+        top = next((entry for entry in reversed(entries) if entry["module"] == module), None)
+        return {
+            "module": module,
+            "wall_s": wall,
+            "self_us": top["self_us"] if top else 0,
+            "cumulative_us": top["cumulative_us"] if top else sum(entry["self_us"] for entry in own),
+            "modules": len(own),
+            "heaviest": sorted(own, key=lambda entry: entry["self_us"], reverse=True)[:HEAVIEST_COUNT],
+            "error": error,
+        }
+
+    def run(self, progress=None, cancelled=None):
+        """Profile everything; progress(done, total) is called per module
+
+        Returns a dict with startup, packages, pth_files and sys_path.
+        """
+        self.cancelled = cancelled
+        with tracer.span("profile imports", "app", environment=self.env_path) as attrs:
+            startup = self.profile_startup()
+            startup_modules = {entry["module"].strip() for entry in startup["imports"]}
+            modules = top_level_modules(self.env_path)
+            attrs["modules"] = len(modules)
+
+            packages = []
+            if progress:
+                progress(0, len(modules))
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                futures = {pool.submit(self.profile_module, module, startup_modules): module
+                           for module in sorted(modules)}
+                for done, future in enumerate(futures, 1):
+                    if cancelled and cancelled():
+                        for pending in futures:
+                            pending.cancel()
+                        break
+                    result = future.result()
+                    result["distribution"] = modules[result["module"]]
+                    packages.append(result)
+                    if progress:
+                        progress(done, len(modules))
+
+            return {
+                "startup": startup,
+                "packages": packages,
+                "pth_files": inspect_pth_files(self.env_path),
+                "sys_path": inspect_sys_path(self.python),
+            }
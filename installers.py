@@ -0,0 +1,299 @@
+"""Installer backends for installing, syncing and uninstalling packages
+
+pip is always available and the default. uv resolves and installs the same
+requirements much faster, but does not read pip's configuration, so it is
+only used when chosen, or on "auto" when pip has no index settings to lose.
+Which backends exist is detected once at startup and cached on disk until
+the uv executable changes. Every operation is timed per backend, and recent
+timings are kept so backends can be compared on real environments.
+"""
+import os
+import re
+import sys
+import json
+import time
+import shutil
+import threading
+import statistics
+
+from distributions import env_python, env_scripts_dir, find_distributions, normalize_name, PROTECTED_PACKAGES
+from http_cache import write_json_atomic
+from mirror import parse_requirements_file, requirements_file_lines
+from package_index import ARCHIVE_SUFFIXES
+from package_index import pip_index_args
+from progress_bus import OperationCancelled
+from tracing import tracer
+from wheel_installer import evaluate_marker, marker_environment, python_version
+import scheduler
+from scheduler import PRIORITY_BACKGROUND
+
+STATE_FILE = "installers.json"
+STATE_FORMAT = 1
+# Timings kept per backend and operation
+TIMINGS_KEPT = 50
+
+PREFERENCES = ("auto", "pip", "uv")
+# pip settings uv ignores; installing with uv would silently bypass them
+PIP_ENVIRONMENT_SETTINGS = ("PIP_CONFIG_FILE", "PIP_INDEX_URL", "PIP_EXTRA_INDEX_URL", "PIP_FIND_LINKS",
+                            "PIP_TRUSTED_HOST", "PIP_CERT", "PIP_CLIENT_CERT", "PIP_NO_INDEX")
+NAMED_REQUIREMENT = re.compile(r"^\s*([A-Za-z0-9][A-Za-z0-9._-]*)\s*(?:\[([^\]]*)\])?\s*(?=$|[;<>=!~(@,])")
+# Colour codes and cursor movement, which uv emits even without a terminal on some platforms
+ANSI_ESCAPE = re.compile(r"\x1b\[[0-9;?]*[ -/]*[@-~]")
+
+
+def named_requirement(requirement):
+    """(normalized name, extras) of a requirement, or None for a path, URL or archive"""
+    match = NAMED_REQUIREMENT.match(requirement)
+    if not match or match.group(1).lower().endswith(ARCHIVE_SUFFIXES):
+        return None
+    extras = {normalize_name(extra) for extra in (match.group(2) or "").split(",") if extra.strip()}
+    return normalize_name(match.group(1)), extras
+
+
+def marker_holds(marker, extras, environment):
+    """Whether a requirement's marker holds without extras or for one of extras
+
+    A marker that cannot be evaluated counts as holding, so its requirement is kept.
+    """
+    if not marker:
+        return True
+    for extra in [""] + sorted(extras):
+        try:
+            if evaluate_marker(marker, dict(environment, extra=extra)):
+                return True
+        except ValueError:
+            return True
+    return False
+
+
+def needed_distributions(distributions, requirements, environment):
+    """Normalized names of the installed distributions that requirements need, following extras"""
+    by_name = {}
+    for dist in distributions:
+        by_name.setdefault(dist.normalized_name, dist)
+    stack = [named_requirement(requirement.split(";", 1)[0]) for requirement in requirements]
+    followed = {}  # name -> extras whose requirements were followed
+    while stack:
+        name, extras = stack.pop()
+        if name in followed and extras <= followed[name]:
+            continue
+        followed[name] = followed.get(name, set()) | extras
+        dist = by_name.get(name)
+        if dist is None:
+            continue
+        for requirement in dist.requires_dist:
+            text, _, marker = requirement.partition(";")
+            required = named_requirement(text)
+            if required and marker_holds(marker.strip(), followed[name], environment):
+                stack.append(required)
+    return set(followed) & set(by_name)
+
+
+def clean_lines(on_line):
+    """Wrap on_line so it gets plain text lines, one per progress update"""
+    def receive(line):
+        for part in ANSI_ESCAPE.sub("", line).replace("\r\n", "\n").replace("\r", "\n").split("\n"):
+            if part.strip():
+                on_line(part.rstrip())
+    return receive
+
+
+class Installer:
+    """Base of the backends, which run install, sync and uninstall
+
+    Each of those methods streams the backend's output to log, line by
+    line, and returns the exit code. cancelled() stops the backend and
+    raises OperationCancelled. sync makes the environment match a
+    requirements file exactly.
+    """
+
+    name = None
+    # Environment variables that keep the output plain
+    environ = {}
+
+    def __init__(self, version=None):
+        self.version = version
+
+    @property
+    def label(self):
+        return f"{self.name} {self.version}" if self.version else self.name
+
+    def _stream(self, command, log, env_name, cancelled):
+        env = dict(os.environ, **self.environ) if self.environ else None
+        try:
+            return scheduler.stream(command, clean_lines(log), env_name=env_name, cancelled=cancelled, env=env)
+        except OSError as e:
+            raise RuntimeError(f"Error: {str(e)}")
+
+
+class PipInstaller(Installer):
+    name = "pip"
+    environ = {"PIP_NO_COLOR": "1", "PIP_PROGRESS_BAR": "off"}
+
+    def _pip(self, env):
+        return [os.path.join(env_scripts_dir(env["path"]), "pip.exe" if sys.platform == "win32" else "pip")]
+
+    def install(self, env, packages, log, cancelled=None, upgrade=False, index_url=None):
+        command = self._pip(env) + ["install"] + (["--upgrade"] if upgrade else [])
+        command += pip_index_args(index_url) + list(packages)
+        return self._stream(command, log, env["name"], cancelled)
+
+    def uninstall(self, env, names, log, cancelled=None):
+        return self._stream(self._pip(env) + ["uninstall", "-y"] + list(names), log, env["name"], cancelled)
+
+    def sync(self, env, requirements_file, log, cancelled=None, index_url=None):
+        # pip has no sync: install the file, then remove what it does not need
+        command = self._pip(env) + ["install"] + pip_index_args(index_url) + ["-r", requirements_file]
+        returncode = self._stream(command, log, env["name"], cancelled)
+        if returncode != 0:
+            return returncode
+        if cancelled and cancelled():
+            raise OperationCancelled()
+        # Editable, path and URL lines install packages whose names only pip knows
+        unnamed = [line for line in requirements_file_lines(requirements_file) if line.startswith(("-e", "--editable"))]
+        requirements = parse_requirements_file(requirements_file)
+        unnamed += [requirement for requirement in requirements if named_requirement(requirement) is None]
+        if unnamed:
+            log(f"Not removing any packages: cannot tell which packages these lines install: {', '.join(unnamed)}")
+            return 0
+        distributions = find_distributions(env["path"])
+        environment = marker_environment(python_version(env["path"]))
+        needed = needed_distributions(distributions, requirements, environment) | PROTECTED_PACKAGES
+        extra = sorted({dist.name for dist in distributions if dist.normalized_name not in needed})
+        if not extra:
+            return 0
+        log(f"Removing {len(extra)} package(s) not in the requirements: {', '.join(extra)}")
+        return self.uninstall(env, extra, log, cancelled)
+
+
+class UvInstaller(Installer):
+    name = "uv"
+    environ = {"NO_COLOR": "1", "UV_NO_PROGRESS": "1"}
+
+    def __init__(self, exe, version=None):
+        super().__init__(version)
+        self.exe = exe
+
+    def _uv(self, subcommand, env):
+        return [self.exe, "pip", subcommand, "--python", env_python(env["path"])]
+
+    def install(self, env, packages, log, cancelled=None, upgrade=False, index_url=None):
+        command = self._uv("install", env) + (["--upgrade"] if upgrade else [])
+        command += pip_index_args(index_url) + list(packages)
+        return self._stream(command, log, env["name"], cancelled)
+
+    def uninstall(self, env, names, log, cancelled=None):
+        return self._stream(self._uv("uninstall", env) + list(names), log, env["name"], cancelled)
+
+    def sync(self, env, requirements_file, log, cancelled=None, index_url=None):
+        command = self._uv("sync", env) + pip_index_args(index_url) + [requirements_file]
+        return self._stream(command, log, env["name"], cancelled)
+
+
+def file_stamp(path):
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+class InstallerRegistry:
+    """The installer backends found on this machine, and how long they took"""
+
+    def __init__(self, cache_dir):
+        self.path = os.path.join(str(cache_dir), STATE_FILE)
+        self.backends = {"pip": PipInstaller()}
+        self._lock = threading.Lock()
+        self._state = {"format": STATE_FORMAT, "backends": {}, "timings": {}}
+        try:
+            with open(self.path, "r") as f:
+                state = json.load(f)
+            if state.get("format") == STATE_FORMAT:
+                self._state = state
+        except (OSError, ValueError):
+            pass
+
+    def detect(self):
+        """Look for uv on PATH; its version is only queried again when the executable changes"""
+        with tracer.span("detect installers", "app") as attrs:
+            exe = shutil.which("uv")
+            cached = self._state["backends"].get("uv")
+            if exe is None:
+                self._state["backends"].pop("uv", None)
+                self.backends.pop("uv", None)
+            else:
+                stamp = file_stamp(exe)
+                if cached and cached["path"] == exe and cached["stamp"] == stamp:
+                    version = cached["version"]
+                else:
+                    try:
+                        result = scheduler.run([exe, "--version"], priority=PRIORITY_BACKGROUND,
+                                               capture_output=True, text=True, check=True, timeout=30)
+                        version = result.stdout.split()[1] if len(result.stdout.split()) > 1 else None
+                    except Exception as e:
+                        print(f"Could not run {exe}: {str(e)}")
+                        return self.available()
+                    self._state["backends"]["uv"] = {"path": exe, "stamp": stamp, "version": version}
+                self.backends["uv"] = UvInstaller(exe, version)
+                attrs["cached"] = bool(cached and cached["path"] == exe and cached["stamp"] == stamp)
+            attrs["backends"] = ",".join(self.backends)
+        self._save()
+        return self.available()
+
+    def available(self):
+        return list(self.backends.values())
+
+    def select(self, preference="pip"):
+        """The backend to use: the one asked for if it is available, else pip
+
+        "auto" picks uv when it is found and pip is not configured, since uv
+        would install from PyPI regardless of pip's index settings.
+        """
+        if preference in self.backends:
+            return self.backends[preference]
+        if preference == "auto":
+            return self.backends["pip"] if pip_configured() else self.backends.get("uv") or self.backends["pip"]
+        if preference is not None:
+            print(f"Installer '{preference}' is not available, using pip")
+        return self.backends["pip"]
+
+    def run(self, installer, operation, env, log, *args, **kwargs):
+        """Run installer.<operation>(env, log, ...) timed; returns the exit code"""
+        return self.timed(installer.name, installer.label, operation, env, log,
+                          lambda: getattr(installer, operation)(env, *args, log=log, **kwargs))
+
+    def timed(self, backend, label, operation, env, log, function):
+        """Run function(), which returns an exit code, recording its time under backend and operation"""
+        started = time.perf_counter()
+        with tracer.span(f"{operation} ({backend})", "installer", environment=env["name"], backend=label) as attrs:
+            returncode = function()
+            attrs["returncode"] = returncode
+        elapsed = time.perf_counter() - started
+        log(f"{operation.capitalize()} with {label} took {elapsed:.2f} s")
+        if returncode == 0:
+            self.record(backend, operation, env["name"], elapsed)
+        return returncode
+
+    def record(self, backend, operation, env_name, seconds):
+        with self._lock:
+            timings = self._state["timings"].setdefault(f"{backend} {operation}", [])
+            timings.append([round(seconds, 3), env_name, time.time()])
+            del timings[:-TIMINGS_KEPT]
+        self._save()
+
+    def timing_summary(self):
+        """(backend, operation, count, median seconds, last environment) for each recorded pair"""
+        with self._lock:
+            timings = {key: list(values) for key, values in self._state["timings"].items()}
+        summary = []
+        for key, values in sorted(timings.items()):
+            backend, operation = key.split(" ", 1)
+            summary.append((backend, operation, len(values),
+                            statistics.median(value[0] for value in values), values[-1][1]))
+        return summary
+
+    def _save(self):
+        with self._lock:
+            state = json.loads(json.dumps(self._state))
+        try:
+            write_json_atomic(self.path, state)
+        except OSError as e:
+            print(f"Could not save installer state: {str(e)}")
@@ -0,0 +1,223 @@
+import os
+import json
+import base64
+import hashlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from distributions import find_distributions, env_site_packages
+from http_cache import write_json_atomic
+from tracing import tracer
+
+CHUNK_SIZE = 1024 * 1024
+# Files are hashed in batches of about this many bytes per worker task
+BATCH_BYTES = 32 * 1024 * 1024
+BATCH_FILES = 500
+# Below this much data a process pool costs more than it saves
+POOL_THRESHOLD_BYTES = 16 * 1024 * 1024
+
+# Files that are expected in site-packages without belonging to a RECORD
+IGNORED_SUFFIXES = (".pyc", ".pyo")
+IGNORED_DIRS = {"__pycache__"}
+
+
+def hash_file(path):
+    """RECORD-style digest (urlsafe base64 SHA-256 without padding) of a file"""
+    digest = hashlib.sha256()
+    buffer = bytearray(CHUNK_SIZE)
+    view = memoryview(buffer)
+    with open(path, "rb", buffering=0) as f:
+        while True:
+            count = f.readinto(buffer)
+            if not count:
+                break
+            digest.update(view[:count])
+    return base64.urlsafe_b64encode(digest.digest()).rstrip(b"=").decode("ascii")
+
+
+def hash_batch(paths):
+    """Hash a list of files; runs in worker processes. Returns (path, digest or None)"""
+    results = []
+    for path in paths:
+        try:
+            results.append((path, hash_file(path)))
+        except OSError:
+            results.append((path, None))
+    return results
+
+
+def make_batches(files):
+    """Group (path, size) pairs into batches of roughly BATCH_BYTES"""
+    batches = []
+    current, current_bytes = [], 0
+    # Largest first so one big file does not end up last on a single worker
+    for path, size in sorted(files, key=lambda item: item[1], reverse=True):
+        current.append(path)
+        current_bytes += size
+        if current_bytes >= BATCH_BYTES or len(current) >= BATCH_FILES:
+            batches.append(current)
+            current, current_bytes = [], 0
+    if current:
+        batches.append(current)
+    return batches
+
+
+class IntegrityChecker:
+    """Verifies installed files against the hashes in their RECORD
+
+    Digests are cached per file with its mtime and size, so verifying an
+    environment again only hashes files that changed since the last run.
+    """
+
+    def __init__(self, cache_dir, workers=None):
+        self.cache_dir = os.path.join(str(cache_dir), "integrity")
+        self.workers = workers or os.cpu_count() or 1
+
+    def cache_path(self, env_path):
+        key = hashlib.sha1(os.path.abspath(env_path).encode("utf-8")).hexdigest()[:16]
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def load_cache(self, env_path):
+        try:
+            with open(self.cache_path(env_path), "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def verify(self, env_path, progress=None, cancelled=None):
+        """Check every hashed RECORD entry of every distribution in env_path
+
+        progress(done_bytes, total_bytes) is called as batches complete and
+        cancelled() is polled between batches. Returns a report dict:
+
+            packages: {name: {version, checked, missing, modified, no_record}}
+            unowned:  files in site-packages no distribution claims
+            files, hashed, hashed_bytes: totals for this run
+            cancelled: whether the run stopped early (results are partial)
+        """
+        with tracer.span("verify integrity", "app", environment=env_path) as attrs:
+            cache = self.load_cache(env_path)
+            packages = {}
+            expected = {}  # path -> (package name, digest)
+            owned = set()
+
+            for dist in find_distributions(env_path):
+                name = dist.name
+                package = packages.setdefault(name, {
+                    "version": dist.version, "checked": 0, "missing": [], "modified": [], "no_record": False
+                })
+                if not dist.is_dist_info:
+                    # installed-files.txt has no hashes, but still tells which files are owned
+                    files = dist.owned_files()
+                    if files is None:
+                        package["no_record"] = True
+                    else:
+                        owned.update(os.path.normcase(path) for path in files)
+                    continue
+                entries = dist.record()
+                if entries is None:
+                    package["no_record"] = True
+                    continue
+                for rel_path, algorithm, digest, size in entries:
+                    path = os.path.normpath(os.path.join(dist.site_dir, rel_path))
+                    owned.add(os.path.normcase(path))
+                    if algorithm == "sha256":
+                        expected[path] = (name, digest)
+
+            # Work out which files need hashing
+            to_hash = []
+            actual = {}
+            for path, (name, digest) in expected.items():
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    packages[name]["missing"].append(path)
+                    continue
+                cached = cache.get(path)
+                if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+                    actual[path] = cached[2]
+                else:
+                    to_hash.append((path, st.st_size, st.st_mtime_ns))
+
+            total_bytes = sum(size for _, size, _ in to_hash)
+            stats = {path: (size, mtime) for path, size, mtime in to_hash}
+            done_bytes = 0
+            if progress:
+                progress(0, total_bytes)
+
+            batches = make_batches([(path, size) for path, size, _ in to_hash])
+            pool = None
+            stopped = False
+            if total_bytes < POOL_THRESHOLD_BYTES or self.workers == 1:
+                results = map(hash_batch, batches)
+            else:
+                pool = ProcessPoolExecutor(max_workers=self.workers)
+                futures = [pool.submit(hash_batch, batch) for batch in batches]
+                results = (future.result() for future in as_completed(futures))
+            try:
+                for batch_results in results:
+                    for path, digest in batch_results:
+                        if digest is None:
+                            packages[expected[path][0]]["missing"].append(path)
+                            continue
+                        actual[path] = digest
+                        size, mtime = stats[path]
+                        cache[path] = [mtime, size, digest]
+                        done_bytes += size
+                    if progress:
+                        progress(done_bytes, total_bytes)
+                    if cancelled and cancelled():
+                        attrs["cancelled"] = stopped = True
+                        break
+            finally:
+                if pool:
+                    for future in futures:
+                        future.cancel()
+                    pool.shutdown(wait=True)
+
+            for path, digest in actual.items():
+                name, expected_digest = expected[path]
+                packages[name]["checked"] += 1
+                if digest != expected_digest:
+                    packages[name]["modified"].append(path)
+
+            # Drop entries for files that no longer exist before saving
+            cache_size = len(cache)
+            cache = {path: entry for path, entry in cache.items() if path in expected}
+            if to_hash or len(cache) != cache_size:
+                try:
+                    write_json_atomic(self.cache_path(env_path), cache)
+                except OSError as e:
+                    print(f"Could not save integrity cache: {str(e)}")
+
+            unowned = self.find_unowned(env_path, owned)
+            attrs["files"] = len(expected)
+            attrs["hashed"] = len(to_hash)
+            attrs["hashed_bytes"] = total_bytes
+            return {
+                "packages": packages,
+                "unowned": unowned,
+                "files": len(expected),
+                "hashed": len(to_hash),
+                "hashed_bytes": total_bytes,
+                "cancelled": stopped,
+            }
+
+    def find_unowned(self, env_path, owned):
+        """Files in site-packages that no installed distribution lists"""
+        unowned = []
+        for site_dir in env_site_packages(env_path):
+            for directory, dirnames, filenames in os.walk(site_dir):
+                dirnames[:] = [d for d in dirnames if d not in IGNORED_DIRS]
+                for filename in filenames:
+                    if filename.endswith(IGNORED_SUFFIXES):
+                        continue
+                    path = os.path.join(directory, filename)
+                    if os.path.normcase(path) not in owned:
+                        unowned.append(path)
+        return sorted(unowned)
+
+
+def problem_count(report):
+    """Number of missing, modified and unowned files in a report"""
+    return (sum(len(p["missing"]) + len(p["modified"]) for p in report["packages"].values())
+            + len(report["unowned"]))
@@ -0,0 +1,248 @@
+import os
+import re
+import sys
+import glob
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from http_cache import write_json_atomic
+from tracing import tracer
+from versions import sort_key
+import scheduler
+
+INDEX_FILE = "interpreters.json"
+PROBE_WORKERS = 8
+PROBE_TIMEOUT = 10
+
+# python, python3, python3.12, python.exe, ...
+EXECUTABLE_PATTERN = re.compile(r"^python(\d+(\.\d+)?)?(\.exe)?$", re.IGNORECASE)
+
+# Printed by the interpreter being probed
+PROBE_SCRIPT = (
+    "import sys, json, platform; "
+    "print(json.dumps([platform.python_version(), platform.architecture()[0], "
+    "platform.machine(), sys.implementation.name, sys.prefix != getattr(sys, 'base_prefix', sys.prefix)]))"
+)
+
+
+def file_key(path):
+    """What must stay the same for a cached probe of path to remain valid"""
+    st = os.stat(path)
+    return [st.st_mtime_ns, st.st_ino, st.st_size]
+
+
+def executables_in(directory):
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return []
+    return [os.path.join(directory, name) for name in names if EXECUTABLE_PATTERN.match(name)]
+
+
+def registry_executables():
+    """Interpreters registered under PEP 514 keys (Windows only)"""
+    try:
+        import winreg
+    except ImportError:
+        return []
+
+    found = []
+    for hive in (winreg.HKEY_CURRENT_USER, winreg.HKEY_LOCAL_MACHINE):
+        for view in (winreg.KEY_WOW64_64KEY, winreg.KEY_WOW64_32KEY):
+            try:
+                root = winreg.OpenKey(hive, r"Software\Python", 0, winreg.KEY_READ | view)
+            except OSError:
+                continue
+            with root:
+                for company in _subkeys(winreg, root):
+                    try:
+                        company_key = winreg.OpenKey(root, company)
+                    except OSError:
+                        continue
+                    with company_key:
+                        for tag in _subkeys(winreg, company_key):
+                            try:
+                                with winreg.OpenKey(company_key, tag + r"\InstallPath") as install_key:
+                                    try:
+                                        found.append(winreg.QueryValueEx(install_key, "ExecutablePath")[0])
+                                    except OSError:
+                                        directory = winreg.QueryValueEx(install_key, "")[0]
+                                        found.append(os.path.join(directory, "python.exe"))
+                            except OSError:
+                                continue
+    return found
+
+
+def _subkeys(winreg, key):
+    index = 0
+    while True:
+        try:
+            yield winreg.EnumKey(key, index)
+        except OSError:
+            return
+        index += 1
+
+
+def candidate_executables():
+    """Paths that may be Python interpreters, in discovery order"""
+    home = os.path.expanduser("~")
+    candidates = []
+
+    # PATH. pyenv and asdf shims are skipped: they only dispatch to the
+    # versions found below, so probing them would list those twice
+    for directory in os.environ.get("PATH", "").split(os.pathsep):
+        if directory and os.path.basename(os.path.normpath(directory)) != "shims":
+            candidates.extend(executables_in(directory))
+
+    # Version managers
+    pyenv_root = os.environ.get("PYENV_ROOT", os.path.join(home, ".pyenv"))
+    asdf_root = os.environ.get("ASDF_DATA_DIR", os.path.join(home, ".asdf"))
+    if sys.platform == "win32":
+        patterns = [
+            os.path.join(pyenv_root, "pyenv-win", "versions", "*", "python.exe"),
+            os.path.join(os.environ.get("LOCALAPPDATA", ""), "Programs", "Python", "Python*", "python.exe"),
+            os.path.join(os.environ.get("ProgramFiles", r"C:\Program Files"), "Python*", "python.exe"),
+            os.path.join(os.environ.get("ProgramFiles(x86)", r"C:\Program Files (x86)"), "Python*", "python.exe"),
+            os.path.join(os.environ.get("SystemDrive", "C:") + os.sep, "Python*", "python.exe"),
+        ]
+    else:
+        patterns = [
+            os.path.join(pyenv_root, "versions", "*", "bin", "python"),
+            os.path.join(asdf_root, "installs", "python", "*", "bin", "python"),
+            os.path.join(home, ".local", "share", "uv", "python", "*", "bin", "python3"),
+            "/usr/bin/python3*",
+            "/usr/local/bin/python3*",
+            "/opt/homebrew/bin/python3*",
+            "/opt/local/bin/python3*",
+            "/opt/python*/bin/python3",
+            "/Library/Frameworks/Python.framework/Versions/*/bin/python3",
+        ]
+    for pattern in patterns:
+        candidates.extend(path for path in glob.glob(pattern)
+                          if EXECUTABLE_PATTERN.match(os.path.basename(path)))
+
+    candidates.extend(registry_executables())
+    return candidates
+
+
+def probe(path):
+    """Ask an interpreter for its version and architecture; None if it is not usable"""
+    with tracer.span("probe interpreter", "subprocess", command=path) as attrs:
+        try:
+            result = scheduler.run([path, "-I", "-c", PROBE_SCRIPT], capture_output=True,
+                                   text=True, timeout=PROBE_TIMEOUT)
+            version, arch, machine, implementation, is_venv = json.loads(result.stdout)
+        except Exception as e:
+            attrs["error"] = type(e).__name__
+            return None
+    return {
+        "version": version,
+        "arch": arch,
+        "machine": machine,
+        "implementation": implementation,
+        "is_venv": is_venv,
+    }
+
+
+class InterpreterIndex:
+    """Persistent index of the Python interpreters on this machine
+
+    Probe results are cached per resolved executable and reused for as long as
+    its mtime, inode and size are unchanged, so only new or replaced
+    interpreters are launched on a rescan.
+    """
+
+    def __init__(self, cache_dir):
+        self.path = os.path.join(str(cache_dir), INDEX_FILE)
+        self._lock = threading.Lock()
+        self._entries = None
+
+    def _load(self):
+        if self._entries is None:
+            try:
+                with open(self.path, "r") as f:
+                    self._entries = json.load(f)
+            except (OSError, ValueError):
+                self._entries = {}
+        return self._entries
+
+    def _save(self):
+        try:
+            write_json_atomic(self.path, self._entries)
+        except OSError as e:
+            print(f"Could not save interpreter index: {str(e)}")
+
+    def cached(self):
+        """Interpreters from the last scan, without touching the filesystem"""
+        with self._lock:
+            entries = dict(self._load())
+        return self._listing(entries)
+
+    def _listing(self, entries):
+        interpreters = [dict(info, path=entry["display_path"])
+                        for entry in entries.values()
+                        for info in [entry.get("info")] if info and entry.get("discovered")]
+        interpreters.sort(key=lambda i: (sort_key(i["version"]), i["path"]), reverse=True)
+        return interpreters
+
+    def lookup(self, path):
+        """Version info for one executable, probing only if it changed; None if unusable"""
+        try:
+            real = os.path.realpath(path)
+            key = file_key(real)
+        except OSError:
+            return None
+        with self._lock:
+            entry = self._load().get(real)
+        if entry and entry["key"] == key:
+            return entry["info"]
+
+        info = probe(path)
+        with self._lock:
+            entries = self._load()
+            previous = entries.get(real, {})
+            entries[real] = {"key": key, "info": info, "display_path": previous.get("display_path", path),
+                             "discovered": previous.get("discovered", False)}
+            self._save()
+        return info
+
+    def refresh(self):
+        """Rescan all known locations and return the usable interpreters"""
+        with tracer.span("scan interpreters", "app") as attrs:
+            # Resolve symlinks so python3 and python3.12 in one prefix count once
+            found = {}
+            for path in candidate_executables():
+                try:
+                    real = os.path.realpath(path)
+                    if os.path.isfile(real) and os.access(real, os.X_OK) and real not in found:
+                        found[real] = (path, file_key(real))
+                except OSError:
+                    continue
+
+            with self._lock:
+                entries = self._load()
+                stale = [real for real, (path, key) in found.items()
+                         if real not in entries or entries[real]["key"] != key]
+            attrs["candidates"] = len(found)
+            attrs["probed"] = len(stale)
+
+            probed = {}
+            if stale:
+                with ThreadPoolExecutor(max_workers=PROBE_WORKERS) as pool:
+                    for real, info in zip(stale, pool.map(lambda real: probe(found[real][0]), stale)):
+                        probed[real] = info
+
+            with self._lock:
+                entries = self._load()
+                for real, (path, key) in found.items():
+                    if real in probed:
+                        entries[real] = {"key": key, "info": probed[real]}
+                    entries[real]["display_path"] = path
+                    entries[real]["discovered"] = True
+                for real in list(entries):
+                    if real not in found and entries[real].get("discovered"):
+                        del entries[real]
+                self._save()
+                entries = dict(entries)
+        return self._listing(entries)
@@ -0,0 +1,333 @@
+"""Offline package mirror in the simple repository layout (PEP 503 and 691)
+
+Each project gets a folder under <root>/simple holding its files together
+with an index.html and an index.json page, so the directory works both as a
+pip --index-url (file:// or served over HTTP) and with static file servers.
+Pages are only rewritten for projects whose files changed, and file hashes
+are reused from the existing pages.
+"""
+import os
+import re
+import json
+import shutil
+import hashlib
+import tempfile
+import threading
+import html
+import urllib.parse
+from functools import partial
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+
+from distributions import normalize_name
+from package_index import version_from_filename, ARCHIVE_SUFFIXES
+from versions import sort_versions
+import scheduler
+from scheduler import PRIORITY_BACKGROUND
+
+SIMPLE_DIR = "simple"
+JSON_CONTENT_TYPE = "application/vnd.pypi.simple.v1+json"
+API_VERSION = "1.1"
+DEFAULT_PORT = 8765
+
+PINNED_REQUIREMENT = re.compile(r"^([A-Za-z0-9][A-Za-z0-9._-]*)(?:\[[^\]]*\])?\s*===?\s*([^\s;,]+)")
+
+
+def sha256_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+INCLUDE_OPTION = re.compile(r"^(?:-r|--requirement)(?:\s*=\s*|\s+|(?=[^\s-]))(\S+)$")
+
+
+def requirements_file_lines(path, _seen=None):
+    """Lines of a requirements file without comments, with the files it includes through -r inlined"""
+    path = os.path.abspath(path)
+    seen = _seen if _seen is not None else set()
+    if path in seen:
+        return []
+    seen.add(path)
+    with open(path, "r", encoding="utf-8") as f:
+        text = f.read().replace("\\\n", " ")
+    lines = []
+    for line in text.splitlines():
+        line = line.split(" #", 1)[0].strip()
+        if not line or line.startswith("#"):
+            continue
+        include = INCLUDE_OPTION.match(line)
+        if include and "://" not in include.group(1):
+            lines += requirements_file_lines(os.path.join(os.path.dirname(path), include.group(1)), seen)
+        else:
+            lines.append(line)
+    return lines
+
+
+def parse_requirements_file(path):
+    """Requirement lines of a requirements or lock file and the files it includes, without options and hashes"""
+    return [line.split(" --", 1)[0].strip() for line in requirements_file_lines(path) if not line.startswith("-")]
+
+
+def pinned(requirement):
+    """(normalized name, version) of a name==version requirement, else None"""
+    match = PINNED_REQUIREMENT.match(requirement)
+    return (normalize_name(match.group(1)), match.group(2)) if match else None
+
+
+def project_from_filename(filename):
+    """Normalized project name of a wheel or sdist file name"""
+    if filename.endswith(".whl"):
+        return normalize_name(filename.split("-")[0])
+    for suffix in ARCHIVE_SUFFIXES:
+        if filename.endswith(suffix):
+            return normalize_name(filename[:-len(suffix)].rsplit("-", 1)[0])
+    return None
+
+
+class Mirror:
+    """A directory of packages laid out as a simple repository"""
+
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+        self.simple_dir = os.path.join(self.root, SIMPLE_DIR)
+
+    def project_dir(self, project):
+        return os.path.join(self.simple_dir, normalize_name(project))
+
+    def projects(self):
+        try:
+            return sorted(entry.name for entry in os.scandir(self.simple_dir) if entry.is_dir())
+        except OSError:
+            return []
+
+    def files(self, project):
+        try:
+            names = os.listdir(self.project_dir(project))
+        except OSError:
+            return []
+        return sorted(name for name in names if name.endswith(ARCHIVE_SUFFIXES))
+
+    def has_version(self, project, version):
+        project = normalize_name(project)
+        return any(version_from_filename(name, project) == version for name in self.files(project))
+
+    def add_files(self, paths):
+        """Move downloaded archives into their project folders; returns the changed projects"""
+        changed = set()
+        for path in paths:
+            filename = os.path.basename(path)
+            project = project_from_filename(filename)
+            if not project:
+                continue
+            target_dir = self.project_dir(project)
+            os.makedirs(target_dir, exist_ok=True)
+            shutil.move(path, os.path.join(target_dir, filename))
+            changed.add(project)
+        return changed
+
+    def update_pages(self, projects=None):
+        """Regenerate the pages of projects (all when None) and the root page
+
+        Returns the number of pages that were rewritten.
+        """
+        all_projects = self.projects()
+        written = 0
+        for project in (all_projects if projects is None else sorted(projects)):
+            written += self._update_project_page(project)
+        root = {
+            "meta": {"api-version": API_VERSION},
+            "projects": [{"name": project} for project in all_projects],
+        }
+        links = "".join(f'<a href="{html.escape(project)}/">{html.escape(project)}</a><br>\n'
+                        for project in all_projects)
+        written += self._write_pages(self.simple_dir, root, "Simple index", links)
+        return written
+
+    def _update_project_page(self, project):
+        directory = self.project_dir(project)
+        # Reuse hashes of files that are already listed with the same size
+        known = {}
+        try:
+            with open(os.path.join(directory, "index.json"), "r") as f:
+                for file in json.load(f).get("files", []):
+                    known[file["filename"]] = (file.get("size"), file["hashes"]["sha256"])
+        except (OSError, ValueError, KeyError):
+            pass
+
+        files = []
+        versions = set()
+        for filename in self.files(project):
+            size = os.path.getsize(os.path.join(directory, filename))
+            cached = known.get(filename)
+            digest = cached[1] if cached and cached[0] == size else sha256_file(os.path.join(directory, filename))
+            files.append({
+                "filename": filename,
+                "url": urllib.parse.quote(filename),
+                "hashes": {"sha256": digest},
+                "size": size,
+            })
+            version = version_from_filename(filename, project)
+            if version:
+                versions.add(version)
+
+        page = {
+            "meta": {"api-version": API_VERSION},
+            "name": project,
+            "files": files,
+            "versions": sort_versions(versions),
+        }
+        links = "".join(f'<a href="{file["url"]}#sha256={file["hashes"]["sha256"]}">{html.escape(file["filename"])}</a><br>\n'
+                        for file in files)
+        return self._write_pages(directory, page, f"Links for {html.escape(project)}", links)
+
+    def _write_pages(self, directory, data, title, links):
+        """Write index.json and index.html unless they are unchanged; returns 1 if written"""
+        os.makedirs(directory, exist_ok=True)
+        json_text = json.dumps(data, indent=1, sort_keys=True)
+        json_path = os.path.join(directory, "index.json")
+        try:
+            with open(json_path, "r") as f:
+                if f.read() == json_text and os.path.exists(os.path.join(directory, "index.html")):
+                    return 0
+        except OSError:
+            pass
+        html_text = (f'<!DOCTYPE html>\n<html><head><meta name="pypi:repository-version" content="1.0">'
+                     f"<title>{title}</title></head>\n<body>\n<h1>{title}</h1>\n{links}</body></html>\n")
+        for name, text in (("index.html", html_text), ("index.json", json_text)):
+            tmp_path = os.path.join(directory, name + ".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp_path, os.path.join(directory, name))
+        return 1
+
+    def collect(self, python, requirements, log=None, cancelled=None):
+        """Build wheels for requirements with an interpreter's pip and add them
+
+        Pinned requirements whose version is already mirrored are skipped.
+        Returns a dict with requested, skipped, added (file names) and failed
+        (requirements pip could not provide).
+        """
+        log = log or (lambda line: None)
+        missing = []
+        skipped = 0
+        for requirement in requirements:
+            pin = pinned(requirement)
+            if pin and self.has_version(*pin):
+                skipped += 1
+            else:
+                missing.append(requirement)
+
+        added, failed = [], []
+        if missing:
+            with tempfile.TemporaryDirectory(prefix="pyenv_mirror_") as incoming:
+                if self._pip_wheel(python, missing, incoming, log, cancelled) != 0:
+                    # One unavailable package fails the whole run, so find out which
+                    for requirement in missing:
+                        if cancelled and cancelled():
+                            break
+                        if self._pip_wheel(python, [requirement], incoming, log, cancelled) != 0:
+                            failed.append(requirement)
+                downloaded = [os.path.join(incoming, name) for name in os.listdir(incoming)
+                              if name.endswith(ARCHIVE_SUFFIXES) and not os.path.exists(
+                                  os.path.join(self.project_dir(project_from_filename(name) or ""), name))]
+                added = sorted(os.path.basename(path) for path in downloaded)
+                changed = self.add_files(downloaded)
+            if changed:
+                self.update_pages(changed)
+        elif not os.path.exists(os.path.join(self.simple_dir, "index.html")):
+            self.update_pages()
+
+        return {"requested": len(requirements), "skipped": skipped, "added": added, "failed": failed}
+
+    def _pip_wheel(self, python, requirements, directory, log, cancelled):
+        fd, requirements_path = tempfile.mkstemp(suffix=".txt", prefix="pyenv_mirror_")
+        with os.fdopen(fd, "w") as f:
+            f.write("\n".join(requirements) + "\n")
+        command = [python, "-m", "pip", "wheel", "--no-deps", "--disable-pip-version-check",
+                   "-w", directory, "-r", requirements_path]
+        try:
+            return scheduler.stream(command, lambda line: log(line.rstrip()), priority=PRIORITY_BACKGROUND,
+                                    cancelled=cancelled)
+        finally:
+            os.remove(requirements_path)
+
+
+def prefers_json(accept):
+    """Whether an Accept header asks for the PEP 691 JSON form over HTML"""
+    best_json = best_html = 0.0
+    for part in (accept or "").split(","):
+        fields = [field.strip() for field in part.split(";")]
+        media_type, quality = fields[0].lower(), 1.0
+        for field in fields[1:]:
+            if field.startswith("q="):
+                try:
+                    quality = float(field[2:])
+                except ValueError:
+                    pass
+        if media_type == JSON_CONTENT_TYPE:
+            best_json = max(best_json, quality)
+        elif media_type in ("text/html", "application/vnd.pypi.simple.v1+html", "*/*"):
+            best_html = max(best_html, quality)
+    return best_json > best_html
+
+
+class MirrorRequestHandler(SimpleHTTPRequestHandler):
+    """Serves the mirror directory, picking the JSON or HTML page per the Accept header"""
+
+    def send_head(self):
+        request_path = self.path.split("?", 1)[0]
+        local_path = self.translate_path(request_path)
+        if (request_path.endswith("/") and os.path.isdir(local_path)
+                and prefers_json(self.headers.get("Accept"))
+                and os.path.exists(os.path.join(local_path, "index.json"))):
+            self.path = request_path + "index.json"
+        return super().send_head()
+
+    def guess_type(self, path):
+        if os.path.basename(str(path)) == "index.json":
+            return JSON_CONTENT_TYPE
+        return super().guess_type(path)
+
+    def end_headers(self):
+        self.send_header("Vary", "Accept")
+        super().end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MirrorServer:
+    """Threaded HTTP server for a mirror directory"""
+
+    def __init__(self, root, host="127.0.0.1", port=DEFAULT_PORT):
+        self.root = os.path.abspath(root)
+        self.host = host
+        self.port = port
+        self._server = None
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._server is not None
+
+    @property
+    def url(self):
+        host = "localhost" if self.host in ("127.0.0.1", "0.0.0.0", "") else self.host
+        return f"http://{host}:{self.port}/{SIMPLE_DIR}/"
+
+    def start(self):
+        handler = partial(MirrorRequestHandler, directory=self.root)
+        self._server = ThreadingHTTPServer((self.host, self.port), handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
@@ -0,0 +1,320 @@
+"""Local index of project names from a PEP 503/691 simple index
+
+The name list is stored gzip-compressed on disk together with the
+validators of the response it came from, so refreshing it is a conditional
+request that costs nothing when the index has not changed. A local
+directory laid out like a simple index (one folder per project) can be used
+instead of a URL.
+"""
+import os
+import re
+import gzip
+import json
+import time
+import bisect
+import difflib
+import hashlib
+import threading
+import urllib.parse
+import urllib.request
+import urllib.error
+from pathlib import Path
+
+from distributions import normalize_name
+from http_cache import CachedResource, USER_AGENT, read_body, write_json_atomic
+from tracing import tracer
+from versions import sort_versions
+
+DEFAULT_INDEX_URL = "https://pypi.org/simple/"
+NAMES_TTL = 24 * 60 * 60  # Revalidate the name list at most once a day
+PROJECT_TTL = 60 * 60
+# Ask for the PEP 691 JSON form, falling back to HTML for older indexes
+SIMPLE_ACCEPT = "application/vnd.pypi.simple.v1+json, application/vnd.pypi.simple.v1+html;q=0.2, text/html;q=0.01"
+
+ANCHOR_TEXT = re.compile(r"<a\s[^>]*>([^<]+)</a>", re.IGNORECASE)
+ANCHOR = re.compile(r"<a\s([^>]*)>([^<]+)</a>", re.IGNORECASE)
+ARCHIVE_SUFFIXES = (".whl", ".tar.gz", ".zip", ".tar.bz2", ".tgz", ".egg")
+
+
+def is_local_index(index_url):
+    return not re.match(r"^https?://", index_url or "", re.IGNORECASE)
+
+
+def local_index_path(index_url):
+    if index_url.lower().startswith("file:"):
+        return urllib.request.url2pathname(urllib.parse.urlparse(index_url).path)
+    return os.path.expanduser(index_url)
+
+
+def pip_index_args(index_url):
+    """pip options that make it install from index_url"""
+    if not index_url or index_url == DEFAULT_INDEX_URL:
+        return []
+    if is_local_index(index_url):
+        path = local_index_path(index_url)
+        if not os.path.isdir(path):
+            return []  # A plain name list is only used for suggestions
+        index_url = Path(os.path.abspath(path)).as_uri() + "/"
+    return ["--index-url", index_url]
+
+
+def parse_project_list(body):
+    """Normalized project names from a simple index root page (JSON or HTML)"""
+    text = body.decode("utf-8", errors="replace")
+    if text.lstrip().startswith("{"):
+        names = (project["name"] for project in json.loads(text).get("projects", []))
+    else:
+        names = (match.strip() for match in ANCHOR_TEXT.findall(text))
+    return sorted({normalize_name(name) for name in names if name})
+
+
+def version_from_filename(filename, project):
+    """Version part of a wheel or sdist file name, or None"""
+    if filename.endswith(".whl"):
+        parts = filename.split("-")
+        return parts[1] if len(parts) >= 5 else None
+    for suffix in ARCHIVE_SUFFIXES:
+        if filename.endswith(suffix):
+            stem = filename[:-len(suffix)]
+            break
+    else:
+        return None
+    if suffix == ".egg":
+        parts = stem.split("-")
+        return parts[1] if len(parts) > 1 else None
+    # sdist names are "<name>-<version>", and the name part may contain dashes
+    for index, char in enumerate(stem):
+        if char == "-" and normalize_name(stem[:index]) == project:
+            return stem[index + 1:] or None
+    return None
+
+
+def parse_project_page(project):
+    """Build a parser for one project's simple page returning its versions, newest first"""
+    def parse(body):
+        text = body.decode("utf-8", errors="replace")
+        versions = set()
+        if text.lstrip().startswith("{"):
+            page = json.loads(text)
+            for file in page.get("files", []):
+                if file.get("yanked"):
+                    continue
+                version = version_from_filename(file.get("filename", ""), project)
+                if version:
+                    versions.add(version)
+        else:
+            for attrs, filename in ANCHOR.findall(text):
+                if "data-yanked" in attrs:
+                    continue
+                version = version_from_filename(filename.strip(), project)
+                if version:
+                    versions.add(version)
+        return sort_versions(versions, reverse=True)
+    return parse
+
+
+class PackageIndex:
+    """Project names and versions offered by a simple index, cached on disk"""
+
+    def __init__(self, cache_dir, index_url=DEFAULT_INDEX_URL):
+        self.index_url = index_url
+        key = hashlib.sha1(index_url.encode("utf-8")).hexdigest()[:16]
+        self.cache_dir = os.path.join(str(cache_dir), "package_index", key)
+        self.names_path = os.path.join(self.cache_dir, "names.gz")
+        self.meta_path = os.path.join(self.cache_dir, "names.json")
+        self._names = None
+        self._joined = ""
+        self._lock = threading.Lock()
+
+    # Name list
+
+    def load_meta(self):
+        try:
+            with open(self.meta_path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def load(self):
+        """Load the cached name list into memory; returns the number of names"""
+        with self._lock:
+            if self._names is not None:
+                return len(self._names)
+        try:
+            with gzip.open(self.names_path, "rt", encoding="utf-8") as f:
+                names = f.read().split("\n")
+        except (OSError, EOFError):
+            names = []
+        self._set_names([name for name in names if name])
+        return len(self._names)
+
+    def _set_names(self, names):
+        with self._lock:
+            self._names = names
+            # One newline-separated string lets substring search run in C
+            self._joined = "\n" + "\n".join(names) + "\n"
+
+    def _save_names(self, names, meta):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = self.names_path + ".tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8", compresslevel=6) as f:
+            f.write("\n".join(names))
+        os.replace(tmp_path, self.names_path)
+        write_json_atomic(self.meta_path, meta)
+
+    def needs_refresh(self):
+        meta = self.load_meta()
+        if is_local_index(self.index_url):
+            return meta.get("stamp") != self._local_stamp()
+        return time.time() - meta.get("fetched_at", 0) >= NAMES_TTL
+
+    def _local_stamp(self):
+        try:
+            return os.stat(local_index_path(self.index_url)).st_mtime_ns
+        except OSError:
+            return None
+
+    def refresh(self, force=False, timeout=60):
+        """Bring the name list up to date; returns (count, status)
+
+        status is "fresh", "not-modified", "updated" or "offline", as for
+        CachedResource.fetch.
+        """
+        self.load()
+        if not force and not self.needs_refresh():
+            return len(self._names), "fresh"
+        if is_local_index(self.index_url):
+            return self._refresh_local()
+
+        meta = self.load_meta()
+        headers = {"User-Agent": USER_AGENT, "Accept": SIMPLE_ACCEPT, "Accept-Encoding": "gzip, deflate"}
+        if meta.get("url") == self.index_url and self._names:
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+
+        req = urllib.request.Request(self.index_url, headers=headers)
+        try:
+            with tracer.span("http GET", "http", url=self.index_url, conditional="If-None-Match" in headers) as attrs, \
+                    urllib.request.urlopen(req, timeout=timeout) as response:
+                attrs["status"] = response.status
+                names = parse_project_list(read_body(response))
+                attrs["projects"] = len(names)
+                meta = {
+                    "url": self.index_url,
+                    "etag": response.headers.get("ETag"),
+                    "last_modified": response.headers.get("Last-Modified"),
+                    "fetched_at": time.time(),
+                }
+        except urllib.error.HTTPError as e:
+            if e.code == 304:
+                meta["fetched_at"] = time.time()
+                write_json_atomic(self.meta_path, meta)
+                return len(self._names), "not-modified"
+            if self._names and e.code >= 500:
+                return len(self._names), "offline"
+            raise
+        except (urllib.error.URLError, OSError):
+            if self._names:
+                return len(self._names), "offline"
+            raise
+
+        if names != self._names:
+            self._save_names(names, meta)
+            self._set_names(names)
+        else:
+            write_json_atomic(self.meta_path, meta)
+        return len(names), "updated"
+
+    def _refresh_local(self):
+        root = local_index_path(self.index_url)
+        stamp = self._local_stamp()
+        with tracer.span("scan local index", "io", path=root):
+            if os.path.isdir(root):
+                names = sorted({normalize_name(entry.name) for entry in os.scandir(root) if entry.is_dir()})
+            else:
+                # A file with one project name per line
+                with open(root, "r", encoding="utf-8") as f:
+                    names = sorted({normalize_name(line.strip()) for line in f if line.strip()})
+        self._save_names(names, {"url": self.index_url, "stamp": stamp, "fetched_at": time.time()})
+        self._set_names(names)
+        return len(names), "updated"
+
+    # Suggestions
+
+    def suggest(self, query, limit=10):
+        """Project names matching what has been typed so far
+
+        Prefix matches come first (shortest first), then close spellings for
+        likely typos, then names containing the query.
+        """
+        query = normalize_name(query.strip())
+        with self._lock:
+            names, joined = self._names or [], self._joined
+        if not query or not names:
+            return []
+
+        start = bisect.bisect_left(names, query)
+        end = bisect.bisect_left(names, query + "\uffff")
+        prefix = names[start:min(end, start + 500)]
+        results = sorted(prefix, key=len)[:limit]
+        seen = set(results)
+
+        if len(results) < limit and len(query) >= 3:
+            # Only compare against names sharing the first letter and of similar length
+            start = bisect.bisect_left(names, query[0])
+            end = bisect.bisect_left(names, query[0] + "\uffff")
+            candidates = [name for name in names[start:end] if abs(len(name) - len(query)) <= 2]
+            for name in difflib.get_close_matches(query, candidates, n=limit, cutoff=0.75):
+                if name not in seen and len(results) < limit:
+                    seen.add(name)
+                    results.append(name)
+
+        if len(results) < limit:
+            position = joined.find(query)
+            while position != -1 and len(results) < limit:
+                line_start = joined.rfind("\n", 0, position) + 1
+                line_end = joined.find("\n", position)
+                name = joined[line_start:line_end]
+                if name not in seen:
+                    seen.add(name)
+                    results.append(name)
+                position = joined.find(query, line_end)
+        return results
+
+    def __contains__(self, name):
+        with self._lock:
+            names = self._names or []
+        name = normalize_name(name)
+        position = bisect.bisect_left(names, name)
+        return position < len(names) and names[position] == name
+
+    # Project pages
+
+    def versions(self, project, force=False):
+        """Versions of a project, newest first, from its cached simple page"""
+        project = normalize_name(project)
+        if is_local_index(self.index_url):
+            directory = os.path.join(local_index_path(self.index_url), project)
+            try:
+                filenames = os.listdir(directory)
+            except OSError:
+                return []
+            versions = {version_from_filename(name, project) for name in filenames}
+            return sort_versions((v for v in versions if v), reverse=True)
+
+        resource = CachedResource(
+            urllib.parse.urljoin(self.index_url.rstrip("/") + "/", f"{project}/"),
+            os.path.join(self.cache_dir, "projects", f"{project}.json"),
+            PROJECT_TTL,
+            parse_project_page(project),
+            headers={"Accept": SIMPLE_ACCEPT},
+        )
+        try:
+            versions, status = resource.fetch(force=force)
+        except urllib.error.HTTPError as e:
+            if e.code == 404:
+                return []
+            raise
+        return list(versions)
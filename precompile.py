@@ -0,0 +1,158 @@
+import os
+import re
+import json
+import time
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+
+from distributions import env_python, env_site_packages
+from http_cache import write_json_atomic
+from tracing import tracer
+import scheduler
+from scheduler import PRIORITY_BACKGROUND
+
+INVALIDATION_MODES = ("timestamp", "checked-hash", "unchecked-hash")
+COMPILE_ERROR = re.compile(r"^\*\*\* Error compiling '(.+)'\.\.\.$")
+PROBE_SCRIPT = "import sys; print(sys.implementation.cache_tag, sys.version_info[0], sys.version_info[1])"
+
+
+def pyc_paths(source, cache_tag, optimize_levels):
+    """Where the interpreter writes the bytecode for source at each optimization level"""
+    directory, filename = os.path.split(source)
+    stem = os.path.splitext(filename)[0]
+    paths = []
+    for level in optimize_levels:
+        suffix = f".opt-{level}" if level else ""
+        paths.append(os.path.join(directory, "__pycache__", f"{stem}.{cache_tag}{suffix}.pyc"))
+    return paths
+
+
+def find_sources(env_path):
+    """All .py files in an environment's site-packages"""
+    sources = []
+    for site_dir in env_site_packages(env_path):
+        for directory, dirnames, filenames in os.walk(site_dir):
+            dirnames[:] = [d for d in dirnames if d != "__pycache__"]
+            sources.extend(os.path.join(directory, name) for name in filenames if name.endswith(".py"))
+    return sources
+
+
+class Precompiler:
+    """Compiles an environment's site-packages to bytecode with the environment's interpreter
+
+    Source stamps (mtime and size) of successfully compiled files are cached
+    per environment, so later runs only hand changed or new files to
+    compileall.
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = os.path.join(str(cache_dir), "precompile")
+
+    def cache_path(self, env_path):
+        key = hashlib.sha1(os.path.abspath(env_path).encode("utf-8")).hexdigest()[:16]
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def load_cache(self, env_path, settings):
+        try:
+            with open(self.cache_path(env_path), "r") as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        # Stamps only count for the settings they were compiled with
+        return cache.get("files", {}) if cache.get("settings") == settings else {}
+
+    def precompile(self, env_path, optimize_levels=(0,), invalidation_mode="timestamp", workers=0):
+        """Compile changed sources; returns a report dict
+
+        workers=0 uses one worker per CPU. The report has files, compiled,
+        unchanged, failed (list of paths), seconds and workers.
+        """
+        if invalidation_mode not in INVALIDATION_MODES:
+            raise ValueError(f"Unknown invalidation mode: {invalidation_mode}")
+        optimize_levels = sorted(set(optimize_levels))
+        python = env_python(env_path)
+
+        with tracer.span("precompile bytecode", "app", environment=env_path) as attrs:
+            start = time.perf_counter()
+            probe = scheduler.run([python, "-c", PROBE_SCRIPT], priority=PRIORITY_BACKGROUND,
+                                  capture_output=True, text=True, check=True)
+            cache_tag, major, minor = probe.stdout.split()
+            version = (int(major), int(minor))
+            if invalidation_mode != "timestamp" and version < (3, 7):
+                raise ValueError(f"Python {major}.{minor} only supports timestamp-based bytecode")
+
+            settings = {"levels": optimize_levels, "mode": invalidation_mode}
+            cache = self.load_cache(env_path, settings)
+            sources = find_sources(env_path)
+
+            changed = []
+            stamps = {}
+            for source in sources:
+                try:
+                    st = os.stat(source)
+                except OSError:
+                    continue
+                stamps[source] = [st.st_mtime_ns, st.st_size]
+                if (cache.get(source) != stamps[source]
+                        or not all(os.path.exists(pyc) for pyc in pyc_paths(source, cache_tag, optimize_levels))):
+                    changed.append(source)
+
+            workers = workers or os.cpu_count() or 1
+            failed = set()
+            if changed:
+                # compileall only parallelizes directory walks, not explicit file
+                # lists, so split the changed files across several compileall runs
+                options = ["-m", "compileall", "-q", "-i", "-"]
+                if version >= (3, 7):
+                    options += ["--invalidation-mode", invalidation_mode]
+                if invalidation_mode != "timestamp":
+                    # compileall cannot tell whether hash-based bytecode is current
+                    options.append("-f")
+
+                if version >= (3, 9):
+                    commands = [[python] + options + [arg for level in optimize_levels for arg in ("-o", str(level))]]
+                else:
+                    commands = [[python] + ["-O"] * level + options for level in optimize_levels]
+
+                chunks = [changed[index::workers] for index in range(min(workers, len(changed)))]
+                jobs = [(command, chunk) for command in commands for chunk in chunks]
+                with ThreadPoolExecutor(max_workers=len(chunks)) as pool:
+                    # Each compileall run takes its own scheduler slot
+                    for result in pool.map(lambda job: scheduler.run(job[0], input="\n".join(job[1]),
+                                                                     priority=PRIORITY_BACKGROUND,
+                                                                     capture_output=True, text=True), jobs):
+                        for line in result.stdout.splitlines():
+                            match = COMPILE_ERROR.match(line.strip())
+                            if match:
+                                failed.add(match.group(1))
+                        if result.returncode not in (0, 1):
+                            raise RuntimeError(result.stderr.strip() or f"compileall exited with code {result.returncode}")
+
+            # Failed files stay out of the cache so they are retried next time
+            cache = {source: stamp for source, stamp in stamps.items()
+                     if source not in failed and (source in cache or source in changed)}
+            try:
+                write_json_atomic(self.cache_path(env_path), {"settings": settings, "files": cache})
+            except OSError as e:
+                print(f"Could not save precompile cache: {str(e)}")
+
+            seconds = time.perf_counter() - start
+            attrs["files"] = len(sources)
+            attrs["compiled"] = len(changed)
+            return {
+                "files": len(sources),
+                "compiled": len(changed) - len(failed),
+                "unchanged": len(sources) - len(changed),
+                "failed": sorted(failed),
+                "seconds": seconds,
+                "workers": workers,
+            }
+
+
+def describe_report(report):
+    """One-line summary of a precompile report"""
+    text = (f"Precompiled {report['compiled']} of {report['files']} files in {report['seconds']:.1f}s "
+            f"with {report['workers']} workers ({report['unchanged']} unchanged)")
+    if report["failed"]:
+        text += f"; {len(report['failed'])} could not be compiled"
+    return text
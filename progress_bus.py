@@ -0,0 +1,260 @@
+import time
+import queue
+import itertools
+import threading
+
+# How often the UI drains the bus
+DEFAULT_FPS = 20
+# Smoothing factor for the transfer rate used in ETA estimates
+RATE_SMOOTHING = 0.3
+
+
+class OperationCancelled(Exception):
+    """Raised inside a worker when its operation has been cancelled"""
+
+
+class CancelToken:
+    """Thread-safe cancellation flag shared between the UI and a worker"""
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def cancel(self):
+        """Request cancellation and run any registered cancel callbacks"""
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._event.set()
+            callbacks = list(self._callbacks)
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                pass
+
+    def on_cancel(self, callback):
+        """Run callback when cancelled (immediately if already cancelled)"""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def raise_if_cancelled(self):
+        if self._event.is_set():
+            raise OperationCancelled()
+
+
+class TaskState:
+    """What the UI sees of a task after each frame"""
+
+    def __init__(self, task_id, title):
+        self.task_id = task_id
+        self.title = title
+        self.done = 0
+        self.total = None
+        self.message = None
+        self.new_lines = []
+        self.finished = False
+        self.error = None
+        self.cancelled = False
+        self.started_at = time.time()
+        self.rate = None
+        self.eta = None
+        self._last_sample = None
+
+    @property
+    def percent(self):
+        if not self.total:
+            return None
+        return min(self.done * 100.0 / self.total, 100.0)
+
+    def _update_rate(self, now):
+        if self._last_sample:
+            last_time, last_done = self._last_sample
+            elapsed = now - last_time
+            if elapsed > 0 and self.done >= last_done:
+                rate = (self.done - last_done) / elapsed
+                if self.rate is None:
+                    self.rate = rate
+                else:
+                    self.rate = RATE_SMOOTHING * rate + (1 - RATE_SMOOTHING) * self.rate
+        self._last_sample = (now, self.done)
+        if self.total and self.rate:
+            self.eta = max(self.total - self.done, 0) / self.rate
+        else:
+            self.eta = None
+
+
+def format_eta(seconds):
+    """Format an ETA in seconds for display"""
+    if seconds is None:
+        return ""
+    seconds = int(seconds + 0.5)
+    if seconds < 60:
+        return f"{seconds}s"
+    if seconds < 3600:
+        return f"{seconds // 60}m {seconds % 60:02d}s"
+    return f"{seconds // 3600}h {(seconds % 3600) // 60:02d}m"
+
+
+class Task:
+    """Handle a worker uses to report on one long-running operation
+
+    All methods are safe to call from any thread; nothing here touches Tk.
+    """
+
+    def __init__(self, bus, task_id, title, token):
+        self.bus = bus
+        self.task_id = task_id
+        self.title = title
+        self.token = token
+
+    @property
+    def cancelled(self):
+        return self.token.cancelled
+
+    def progress(self, done, total=None, message=None):
+        self.bus._put(("progress", self.task_id, done, total, message))
+
+    def status(self, message):
+        self.bus._put(("status", self.task_id, message))
+
+    def log(self, line):
+        self.bus._put(("log", self.task_id, line.rstrip("\n")))
+
+    def finish(self, error=None):
+        self.bus._put(("finish", self.task_id, error, self.token.cancelled))
+
+    def cancel(self):
+        self.token.cancel()
+
+
+class ProgressBus:
+    """Collects progress events from workers and replays them on the UI thread
+
+    Workers publish as often as they like; the UI drains the queue at a fixed
+    frame rate. Progress updates for the same task are coalesced within a
+    frame, log lines are delivered in batches, and each listener is called at
+    most once per frame per task.
+    """
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._ids = itertools.count(1)
+        self._states = {}
+        self._listeners = {}
+        self._root = None
+        self._interval = int(1000 / DEFAULT_FPS)
+
+    def _put(self, event):
+        self._queue.put(event)
+
+    def start_task(self, title, token=None):
+        """Create a task to report on; listeners can be added straight away"""
+        task_id = next(self._ids)
+        self._put(("start", task_id, title))
+        return Task(self, task_id, title, token or CancelToken())
+
+    def subscribe(self, task, callback):
+        """Call callback(state) on the UI thread whenever task changes"""
+        self._listeners.setdefault(task.task_id, []).append(callback)
+
+    def post(self, callback):
+        """Run callback on the UI thread at the next frame"""
+        self._put(("call", callback))
+
+    def run_in_thread(self, title, work, token=None):
+        """Run work(task) in a daemon thread and finish the task afterwards"""
+        task = self.start_task(title, token)
+
+        def runner():
+            try:
+                work(task)
+                task.finish()
+            except OperationCancelled:
+                task.finish()
+            except Exception as e:
+                task.finish(error=str(e))
+
+        threading.Thread(target=runner, daemon=True).start()
+        return task
+
+    def attach(self, root, fps=DEFAULT_FPS):
+        """Start draining the bus from root's event loop"""
+        self._root = root
+        self._interval = max(int(1000 / fps), 1)
+        root.after(self._interval, self._pump)
+
+    def _pump(self):
+        try:
+            self.drain()
+        finally:
+            try:
+                self._root.after(self._interval, self._pump)
+            except Exception:
+                pass  # Root window has been destroyed
+
+    def drain(self):
+        """Apply all queued events and notify listeners once per task"""
+        now = time.time()
+        changed = {}
+        calls = []
+        while True:
+            try:
+                event = self._queue.get_nowait()
+            except queue.Empty:
+                break
+
+            kind = event[0]
+            if kind == "call":
+                calls.append(event[1])
+                continue
+
+            task_id = event[1]
+            if kind == "start":
+                self._states[task_id] = TaskState(task_id, event[2])
+                continue
+            state = self._states.get(task_id)
+            if state is None:
+                continue
+
+            if kind == "progress":
+                _, _, state.done, total, message = event
+                if total is not None:
+                    state.total = total
+                if message is not None:
+                    state.message = message
+            elif kind == "status":
+                state.message = event[2]
+            elif kind == "log":
+                state.new_lines.append(event[2])
+            elif kind == "finish":
+                state.finished = True
+                state.error = event[2]
+                state.cancelled = event[3]
+            changed[task_id] = state
+
+        for state in changed.values():
+            state._update_rate(now)
+            for callback in list(self._listeners.get(state.task_id, [])):
+                try:
+                    callback(state)
+                except Exception as e:
+                    print(f"Progress listener error: {str(e)}")
+            state.new_lines = []
+            if state.finished:
+                self._states.pop(state.task_id, None)
+                self._listeners.pop(state.task_id, None)
+
+        for callback in calls:
+            try:
+                callback()
+            except Exception as e:
+                print(f"UI callback error: {str(e)}")
@@ -8,16 +8,42 @@ from pathlib import Path
 import shutil
 import datetime
 import platform
-import re
 import webbrowser
 import urllib.request
 import tempfile
-import gzip
 import io
 import threading
-import zipfile
+import multiprocessing
 import time
 
+from release_catalog import ReleaseCatalog
+from delta_update import DeltaUpdater, MANIFEST_NAME, fetch_manifest, manifest_from_zip
+from update_checker import UpdateChecker, RateLimited
+from progress_bus import ProgressBus, OperationCancelled, format_eta
+import tracing
+from tracing import tracer
+import scheduler
+from scheduler import PRIORITY_INTERACTIVE
+from helper_client import HelperPool
+from interpreter_index import InterpreterIndex
+from integrity import IntegrityChecker
+from distributions import normalize_name, find_orphans, required_by, env_python
+from import_profiler import ImportProfiler
+from precompile import Precompiler, describe_report
+from package_index import PackageIndex, DEFAULT_INDEX_URL
+from mirror import Mirror, MirrorServer, parse_requirements_file, DEFAULT_PORT as MIRROR_PORT
+from env_model import ModelRegistry, EnvironmentModel, PACKAGES_CHANGED, OUTDATED_CHANGED, LOAD_FAILED
+from versions import parse as parse_version
+from fleet import LatestVersions, scan_fleet, outdated_matrix, load_report, save_report, update_entry
+from advisories import (AdvisoryStore, audit_fleet, audit_entry, load_report as load_audit_report,
+                        save_report as save_audit_report)
+from relocate import relocate, is_venv
+from installers import InstallerRegistry
+from wheel_installer import install_wheels
+from state_cache import StateCache, format_size, HEALTH_MISSING, HEALTH_BROKEN
+from snapshots import (InventoryCache, SNAPSHOT_EXTENSION, make_snapshot, save_snapshot, load_snapshot,
+                       diff_inventories)
+
 # Application version
 APP_VERSION = "1.0.0"
 APP_NAME = "PyEnv"
@@ -25,6 +51,32 @@ AUTHOR = "Kaustubh Parab"
 GITHUB_URL = "https://github.com/iamkaustic"
 GITHUB_REPO = "iamkaustic/PyEnv"  # Just username/repo format
 DEMO_MODE = False  # Set to False when you have a real GitHub repo
+GITHUB_API_URL = "https://api.github.com"
+# Lets a local stub server stand in for the GitHub release API
+UPDATE_API_ENV_VAR = "PYENV_MANAGER_UPDATE_API"
+
+# Defaults for settings stored in the settings file
+DEFAULT_SETTINGS = {
+    "auto_check_updates": False,
+    "update_check_interval_hours": 24,
+    "update_api_url": None,
+    "use_env_helper": True,
+    "env_helper_idle_minutes": 5,
+    "watch_environments": True,
+    "precompile_after_install": False,
+    "precompile_optimize_levels": [0],
+    "precompile_invalidation_mode": "timestamp",
+    "precompile_workers": 0,
+    "index_url": DEFAULT_INDEX_URL,
+    "mirror_dir": None,
+    "mirror_host": "127.0.0.1",
+    "mirror_port": MIRROR_PORT,
+    "max_concurrent_processes": 0,
+    "lower_background_priority": True,
+    "scan_outdated_on_start": True,
+    "advisory_database": None,
+    "installer": "pip",
+}
 
 class PyEnvManager:
     def __init__(self, root):
@@ -41,12 +93,102 @@ class PyEnvManager:
         
         # Initialize data storage
         self.config_file = Path.home() / ".pyenv_manager_config.json"
+        self.settings_file = Path.home() / ".pyenv_manager_settings.json"
+        self.cache_dir = Path.home() / ".pyenv_manager_cache"
         self.environments = self.load_environments()
+        self.settings = self.load_settings()
+        
+        # Catalog of Python releases, shared by all download dialogs
+        self.release_catalog = ReleaseCatalog(self.cache_dir)
+        
+        # Python interpreters found on this machine, offered in the selection dialogs
+        self.interpreter_index = InterpreterIndex(self.cache_dir)
+        
+        # Verifies installed files against RECORD hashes, caching digests between runs
+        self.integrity_checker = IntegrityChecker(self.cache_dir)
+        
+        # Optional bytecode compilation after environments are created or changed
+        self.precompiler = Precompiler(self.cache_dir)
+        
+        # Installed package lists, rescanned only when site-packages changes
+        self.inventory_cache = InventoryCache(self.cache_dir)
+        
+        # Last known health, package count and size of each environment, shown
+        # at startup until the environments have been checked again
+        self.state_cache = StateCache(self.cache_dir)
+        self.revalidating = set()
+        
+        # Project names from the package index, for autocomplete in the Install tab
+        self.package_index = PackageIndex(self.cache_dir, self.settings["index_url"])
+        
+        # Latest release of each project, shared by all outdated checks across environments
+        self.latest_versions = LatestVersions(self.package_index)
+        
+        # Outdated packages of every environment, from the last fleet scan
+        self.fleet_report = load_report(self.cache_dir)
+        self.fleet_task = None
+        
+        # OSV advisory database from disk, and the last audit of every environment
+        self.advisory_store = AdvisoryStore(self.cache_dir)
+        self.audit_report = load_audit_report(self.cache_dir)
+        self.audit_task = None
+        
+        # Built-in HTTP server for the offline mirror, started from the mirror dialog
+        self.mirror_server = None
+        
+        # Progress/event bus that worker threads report through
+        self.bus = ProgressBus()
+        self.bus.attach(self.root)
+        
+        # Update checker, also used to pre-stage updates in the background
+        app_dir = os.path.dirname(os.path.abspath(__file__))
+        self.update_checker = UpdateChecker(
+            self.get_update_api_url(),
+            APP_VERSION,
+            self.cache_dir,
+            DeltaUpdater(app_dir),
+            interval=self.settings["update_check_interval_hours"] * 3600,
+            on_update_ready=lambda version, release: self.bus.post(lambda: self.show_update_ready(version))
+        )
+        
+        # Every pip, venv and interpreter call goes through the shared scheduler
+        scheduler.configure(max_concurrent=self.settings["max_concurrent_processes"],
+                            lower_background_priority=self.settings["lower_background_priority"])
+        
+        # pip, or uv when it is installed; found once in the background
+        self.installers = InstallerRegistry(self.cache_dir)
+        self.bus.run_in_thread("Detect installers", lambda task: self.installers.detect())
+        
+        # Long-lived helper processes that answer package queries per environment
+        self.helpers = HelperPool(idle_timeout=self.settings["env_helper_idle_minutes"] * 60)
+        
+        # One shared model per environment, observed by every window showing it
+        self.models = ModelRegistry(lambda env: EnvironmentModel(
+            env,
+            self.bus,
+            lambda: self.latest_versions,
+            get_helper=lambda: (self.helpers.get(env_python(env["path"]), env["name"])
+                                if self.settings["use_env_helper"] else None),
+            watch=self.settings["watch_environments"],
+            on_change=self.on_model_change
+        ))
         
         # Get system Python version
         self.system_python_version = self.get_system_python_version()
         
         self.setup_ui()
+        
+        # Start background update checks once the window is up
+        if self.settings["auto_check_updates"]:
+            self.root.after(5000, self.update_checker.start)
+        
+        # Refresh the outdated column in the background
+        if self.settings["scan_outdated_on_start"] and self.environments:
+            self.root.after(3000, self.start_fleet_scan)
+        
+        # Audit against the advisory database, if one is configured
+        if self.settings["advisory_database"] and self.environments:
+            self.root.after(2000, self.start_audit)
     
     def load_environments(self):
         """Load saved environments from config file"""
@@ -63,6 +205,33 @@ class PyEnvManager:
         with open(self.config_file, 'w') as f:
             json.dump(self.environments, f)
     
+    def load_settings(self):
+        """Load settings from the settings file, filling in defaults"""
+        settings = dict(DEFAULT_SETTINGS)
+        if self.settings_file.exists():
+            try:
+                with open(self.settings_file, 'r') as f:
+                    settings.update(json.load(f))
+            except:
+                pass
+        return settings
+    
+    def save_settings(self):
+        """Save settings to the settings file"""
+        with open(self.settings_file, 'w') as f:
+            json.dump(self.settings, f, indent=2)
+    
+    def get_update_api_url(self):
+        """Get the release API endpoint, which can be overridden for testing"""
+        return (os.environ.get(UPDATE_API_ENV_VAR)
+                or self.settings.get("update_api_url")
+                or f"{GITHUB_API_URL}/repos/{GITHUB_REPO}/releases/latest")
+    
+    def show_update_ready(self, version):
+        """Show the header button for an update staged in the background"""
+        self.update_ready_btn.config(text=f"Install v{version}")
+        self.update_ready_btn.pack(side=tk.LEFT, padx=5)
+    
     def setup_ui(self):
         """Set up the main user interface"""
         # Create main frame
@@ -91,13 +260,23 @@ class PyEnvManager:
                                      command=self.check_for_updates, width=15)
         check_update_btn.pack(side=tk.LEFT, padx=5)
         
+        # Shown once the background checker has staged an update
+        self.update_ready_btn = ttk.Button(version_update_frame, text="Install Update",
+                                           command=self.check_for_updates)
+        
         # Right side: Python version and actions
         python_frame = ttk.Frame(header_frame)
         python_frame.pack(side=tk.RIGHT, fill=tk.Y)
         
-        # About button at top right
-        about_btn = ttk.Button(python_frame, text="About", command=self.show_about, width=10)
-        about_btn.pack(side=tk.TOP, anchor=tk.E, pady=(0, 5))
+        # About and diagnostics buttons at top right
+        top_buttons_frame = ttk.Frame(python_frame)
+        top_buttons_frame.pack(side=tk.TOP, anchor=tk.E, pady=(0, 5))
+        
+        about_btn = ttk.Button(top_buttons_frame, text="About", command=self.show_about, width=10)
+        about_btn.pack(side=tk.RIGHT)
+        
+        diagnostics_btn = ttk.Button(top_buttons_frame, text="Diagnostics", command=self.show_diagnostics, width=12)
+        diagnostics_btn.pack(side=tk.RIGHT, padx=(0, 5))
         
         # Python version info
         ttk.Label(python_frame, text=f"System Python: {self.system_python_version}", 
@@ -121,30 +300,55 @@ class PyEnvManager:
         
         # Create buttons
         create_btn = ttk.Button(button_frame, text="Create New Environment", 
-                               command=self.create_environment, width=25)
+                               command=self.create_environment, width=20)
         create_btn.pack(side=tk.LEFT, padx=5)
         
         open_btn = ttk.Button(button_frame, text="Open Environment", 
-                             command=self.open_environment, width=25)
+                             command=self.open_environment, width=20)
         open_btn.pack(side=tk.LEFT, padx=5)
         
+        mirror_btn = ttk.Button(button_frame, text="Offline Mirror", 
+                               command=self.manage_mirror, width=20)
+        mirror_btn.pack(side=tk.LEFT, padx=5)
+        
+        outdated_btn = ttk.Button(button_frame, text="Outdated Packages", 
+                                 command=self.show_fleet_dashboard, width=20)
+        outdated_btn.pack(side=tk.LEFT, padx=5)
+        
+        audit_btn = ttk.Button(button_frame, text="Security Audit", 
+                              command=self.show_audit, width=20)
+        audit_btn.pack(side=tk.LEFT, padx=5)
+        
         # Create environments list frame
         list_frame = ttk.LabelFrame(main_frame, text="Your Python Environments")
         list_frame.pack(fill=tk.BOTH, expand=True, pady=10)
         
         # Create treeview for environments
-        columns = ("name", "path", "python_version")
+        columns = ("name", "path", "python_version", "packages", "size", "outdated", "advisories")
         self.tree = ttk.Treeview(list_frame, columns=columns, show="headings")
         
         # Define headings
         self.tree.heading("name", text="Name")
         self.tree.heading("path", text="Path")
         self.tree.heading("python_version", text="Python Version")
+        self.tree.heading("packages", text="Packages")
+        self.tree.heading("size", text="Size")
+        self.tree.heading("outdated", text="Outdated")
+        self.tree.heading("advisories", text="Advisories")
         
         # Define columns
-        self.tree.column("name", width=150)
-        self.tree.column("path", width=350)
-        self.tree.column("python_version", width=150)
+        self.tree.column("name", width=130)
+        self.tree.column("path", width=210)
+        self.tree.column("python_version", width=100)
+        self.tree.column("packages", width=70)
+        self.tree.column("size", width=80)
+        self.tree.column("outdated", width=70)
+        self.tree.column("advisories", width=80)
+        
+        # Rows drawn from the saved state until they have been checked again
+        self.tree.tag_configure("stale", foreground="gray")
+        # Environments with known advisories stand out
+        self.tree.tag_configure("vulnerable", foreground="red")
         
         # Add scrollbar
         scrollbar = ttk.Scrollbar(list_frame, orient=tk.VERTICAL, command=self.tree.yview)
@@ -162,6 +366,11 @@ class PyEnvManager:
         self.context_menu.add_command(label="Manage Packages", command=self.manage_packages)
         self.context_menu.add_command(label="Open in Explorer", command=self.open_in_explorer)
         self.context_menu.add_command(label="Backup Environment", command=self.backup_environment)
+        self.context_menu.add_command(label="Verify Integrity", command=self.verify_environment)
+        self.context_menu.add_command(label="Profile Imports", command=self.profile_imports)
+        self.context_menu.add_command(label="Export Snapshot...", command=self.export_snapshot)
+        self.context_menu.add_command(label="Compare With...", command=self.compare_environments)
+        self.context_menu.add_command(label="Move / Rename...", command=self.relocate_environment)
         self.context_menu.add_separator()
         self.context_menu.add_command(label="Remove Environment", command=self.remove_environment)
         
@@ -173,24 +382,174 @@ class PyEnvManager:
     
     def refresh_environments_list(self):
         """Refresh the environments list in the treeview"""
-        # Clear the tree
+        with tracer.span("refresh environments list", "ui", rows=len(self.environments)):
+            # Clear the tree
+            for item in self.tree.get_children():
+                self.tree.delete(item)
+            
+            # Add environments to the tree, from the last known state until checked again
+            for env in self.environments:
+                values, tags = self.environment_row(env)
+                self.tree.insert("", tk.END, values=values, tags=tags)
+        
+        self.revalidate_environments()
+    
+    def environment_row(self, env):
+        """Values and tags of an environment's row in the list"""
+        path = env.get("path", "")
+        state = self.state_cache.get(path) or {}
+        health = state.get("health")
+        if health == HEALTH_MISSING:
+            python_version = "Not found"
+        elif health == HEALTH_BROKEN:
+            python_version = "Broken"
+        else:
+            python_version = state.get("python_version") or env.get("python_version", "Unknown")
+        packages = state.get("packages")
+        size = state.get("size")
+        advisories = self.advisories_label(env)
+        values = (
+            env.get("name", "Unknown"),
+            path,
+            python_version,
+            "" if packages is None else packages,
+            "" if size is None else format_size(size),
+            self.outdated_label(env),
+            advisories
+        )
+        tags = []
+        if self.state_cache.is_stale(path):
+            tags.append("stale")
+        if advisories not in ("", "0"):
+            tags.append("vulnerable")
+        return values, tuple(tags)
+    
+    def revalidate_environments(self):
+        """Check the environments not yet checked this session in the background, updating their rows"""
+        environments = [dict(env) for env in self.environments
+                        if self.state_cache.is_stale(env["path"]) and env["path"] not in self.revalidating]
+        if not environments:
+            return
+        paths = {env["path"] for env in environments}
+        listed = {env["path"] for env in self.environments}
+        self.revalidating |= paths
+        
+        def on_state(path, state):
+            self.bus.post(lambda: self.apply_environment_state(path, state))
+        
+        def work(task):
+            self.state_cache.revalidate(environments, self.inventory_cache, on_state,
+                                        cancelled=lambda: task.cancelled, keep=listed)
+        
+        def on_progress(state):
+            if state.finished:
+                self.revalidating -= paths
+                if state.error:
+                    print(f"Checking environments failed: {state.error}")
+                elif not state.cancelled:
+                    # Environments that changed while they were being checked
+                    self.revalidate_environments()
+        
+        task = self.bus.run_in_thread("Check environments", work)
+        self.bus.subscribe(task, on_progress)
+    
+    def apply_environment_state(self, path, state):
+        """Show an environment's freshly checked state in its row"""
+        env = next((e for e in self.environments if e["path"] == path), None)
+        if env is None:
+            return
+        # Keep the stored version in step, e.g. after the interpreter was upgraded
+        if state["python_version"] and env.get("python_version") != state["python_version"]:
+            env["python_version"] = state["python_version"]
+            self.save_environments()
         for item in self.tree.get_children():
-            self.tree.delete(item)
+            if self.tree.set(item, "path") == path:
+                values, tags = self.environment_row(env)
+                self.tree.item(item, values=values, tags=tags)
+    
+    def on_model_change(self, model, event, names):
+        """Keep an environment's row in step with its model, e.g. after an install or upgrade"""
+        env = next((e for e in self.environments if e["path"] == model.path), None)
+        if env is None or model.stale or event not in (PACKAGES_CHANGED, OUTDATED_CHANGED):
+            return
+        if event == PACKAGES_CHANGED:
+            # Package count and size are checked again; the row is grey until then
+            self.state_cache.invalidate(env["path"])
+            self.revalidate_environments()
+            self.update_audit_entry(env, model)
+        if self.fleet_report is not None and model.outdated is not None:
+            update_entry(self.fleet_report, env,
+                         [(row["name"], row["version"]) for row in model.packages.values()],
+                         [[row["name"], row["version"], row["latest_version"]] for row in model.outdated.values()],
+                         len(model.unknown))
+            try:
+                save_report(self.cache_dir, self.fleet_report)
+            except OSError as e:
+                print(f"Could not save the outdated report: {str(e)}")
+        self.update_report_columns()
+    
+    def update_audit_entry(self, env, model):
+        """Match an environment's current packages against the advisory database, if it was audited"""
+        if self.audit_report is None or self.audit_task:
+            return
+        rows = [(row["name"], row["version"]) for row in model.packages.values()]
+        database_path = self.settings["advisory_database"]
+        entry = {}
+        
+        def work(task):
+            # Usually loaded already; otherwise read from the compiled index
+            entry.update(audit_entry(env, rows, self.advisory_store.load(database_path)))
+        
+        def on_progress(state):
+            if not state.finished or state.error or state.cancelled or self.audit_report is None:
+                if state.error:
+                    print(f"Could not audit {env['name']}: {state.error}")
+                return
+            self.audit_report.setdefault("environments", {})[env["path"]] = entry
+            try:
+                save_audit_report(self.cache_dir, self.audit_report)
+            except OSError as e:
+                print(f"Could not save the audit report: {str(e)}")
+            self.update_report_columns()
         
-        # Add environments to the tree
-        for env in self.environments:
-            self.tree.insert("", tk.END, values=(
-                env.get("name", "Unknown"),
-                env.get("path", ""),
-                env.get("python_version", "Unknown")
-            ))
+        task = self.bus.run_in_thread(f"Audit {env['name']}", work)
+        self.bus.subscribe(task, on_progress)
+    
+    def outdated_label(self, env):
+        """Outdated column text for an environment, from the last fleet scan"""
+        entry = (self.fleet_report or {}).get("environments", {}).get(env.get("path"))
+        if entry is None:
+            return ""
+        if entry["error"]:
+            return "Error"
+        if entry["packages"] and entry["unknown"] == entry["packages"]:
+            return "Unknown"
+        return str(len(entry["outdated"]))
+    
+    def advisories_label(self, env):
+        """Advisories column text for an environment, from the last audit"""
+        entry = (self.audit_report or {}).get("environments", {}).get(env.get("path"))
+        if entry is None:
+            return ""
+        if entry["error"]:
+            return "Error"
+        return str(len(entry["findings"]))
+    
+    def update_report_columns(self):
+        """Update every row in place, e.g. after a scan or check, without rebuilding the list"""
+        by_path = {env.get("path", ""): env for env in self.environments}
+        for item in self.tree.get_children():
+            env = by_path.get(self.tree.set(item, "path"))
+            if env:
+                values, tags = self.environment_row(env)
+                self.tree.item(item, values=values, tags=tags)
     
     def create_environment(self):
         """Create a new Python environment"""
         # Create dialog window
         dialog = tk.Toplevel(self.root)
         dialog.title("Create New Environment")
-        dialog.geometry("500x300")
+        dialog.geometry("500x340")
         dialog.transient(self.root)
         dialog.grab_set()
         
@@ -226,21 +585,31 @@ class PyEnvManager:
         python_frame.grid(row=2, column=1, sticky=tk.W, pady=5)
         
         python_var = tk.StringVar(value=sys.executable)
-        python_entry = ttk.Entry(python_frame, textvariable=python_var, width=30)
-        python_entry.pack(side=tk.LEFT)
+        python_combo = ttk.Combobox(python_frame, textvariable=python_var, width=30)
+        python_combo.pack(side=tk.LEFT)
+        
+        version_label = ttk.Label(form_frame, text="")
+        version_label.grid(row=3, column=1, sticky=tk.W)
+        show_version = self.setup_interpreter_choices(python_combo, version_label)
         
         def browse_python():
             filetypes = [("Python Executable", "python.exe")] if sys.platform == "win32" else []
             path = filedialog.askopenfilename(title="Select Python Executable", filetypes=filetypes)
             if path:
                 python_var.set(path)
+                show_version()
         
         browse_python_btn = ttk.Button(python_frame, text="Browse...", command=browse_python)
         browse_python_btn.pack(side=tk.LEFT, padx=5)
         
+        # Bytecode precompilation
+        precompile_var = tk.BooleanVar(value=self.settings["precompile_after_install"])
+        ttk.Checkbutton(form_frame, text="Precompile bytecode after creating",
+                        variable=precompile_var).grid(row=4, column=1, sticky=tk.W, pady=5)
+        
         # Buttons
         button_frame = ttk.Frame(form_frame)
-        button_frame.grid(row=3, column=0, columnspan=2, pady=20)
+        button_frame.grid(row=5, column=0, columnspan=2, pady=20)
         
         def on_cancel():
             dialog.destroy()
@@ -272,17 +641,19 @@ class PyEnvManager:
             progress_window.transient(dialog)
             progress_window.grab_set()
             
-            ttk.Label(progress_window, text="Creating Python environment...").pack(pady=10)
+            progress_label = ttk.Label(progress_window, text="Creating Python environment...")
+            progress_label.pack(pady=10)
             progress = ttk.Progressbar(progress_window, mode="indeterminate")
             progress.pack(fill=tk.X, padx=20)
             progress.start()
             
-            # Update UI
-            self.root.update()
+            precompile = precompile_var.get()
+            created = {}
             
-            try:
+            def create(task):
                 # Create the virtual environment
-                subprocess.run([python_exe, "-m", "venv", env_path], check=True)
+                scheduler.run([python_exe, "-m", "venv", env_path], env_name=name, check=True,
+                              cancelled=lambda: task.cancelled)
                 
                 # Get Python version
                 if sys.platform == "win32":
@@ -290,15 +661,24 @@ class PyEnvManager:
                 else:
                     python_path = os.path.join(env_path, "bin", "python")
                 
-                result = subprocess.run([python_path, "--version"], 
-                                       capture_output=True, text=True, check=True)
-                python_version = result.stdout.strip()
+                result = scheduler.run([python_path, "--version"], env_name=name, priority=PRIORITY_INTERACTIVE,
+                                       cancelled=lambda: task.cancelled, capture_output=True, text=True, check=True)
+                created["python_version"] = result.stdout.strip()
+            
+            def on_created(state):
+                if not state.finished:
+                    return
+                if state.error or "python_version" not in created:
+                    progress_window.destroy()
+                    if state.error:
+                        messagebox.showerror("Error", f"Failed to create environment: {state.error}")
+                    return
                 
                 # Add to environments list
                 self.environments.append({
                     "name": name,
                     "path": env_path,
-                    "python_version": python_version
+                    "python_version": created["python_version"]
                 })
                 
                 # Save environments
@@ -307,15 +687,38 @@ class PyEnvManager:
                 # Refresh the list
                 self.refresh_environments_list()
                 
+                if precompile:
+                    # Compile in the background; the dialogs close when it is done
+                    progress_label.config(text="Precompiling bytecode...")
+                    
+                    def work(task):
+                        task.status(describe_report(self.precompile_environment(env_path)))
+                    
+                    def on_precompiled(state):
+                        if not state.finished:
+                            return
+                        progress_window.destroy()
+                        dialog.destroy()
+                        if state.error:
+                            messagebox.showwarning("Success", f"Python environment '{name}' created successfully, "
+                                                              f"but precompiling failed: {state.error}")
+                        else:
+                            messagebox.showinfo("Success", f"Python environment '{name}' created successfully!\n\n"
+                                                           f"{state.message}")
+                    
+                    task = self.bus.run_in_thread(f"Precompile {name}", work)
+                    self.bus.subscribe(task, on_precompiled)
+                    return
+                
                 # Close dialogs
                 progress_window.destroy()
                 dialog.destroy()
                 
                 messagebox.showinfo("Success", f"Python environment '{name}' created successfully!")
-                
-            except Exception as e:
-                progress_window.destroy()
-                messagebox.showerror("Error", f"Failed to create environment: {str(e)}")
+            
+            # The venv call may wait for a scheduler slot, so keep the window responsive meanwhile
+            task = self.bus.run_in_thread(f"Create {name}", create)
+            self.bus.subscribe(task, on_created)
         
         ttk.Button(button_frame, text="Cancel", command=on_cancel).pack(side=tk.LEFT, padx=5)
         ttk.Button(button_frame, text="Create", command=on_create).pack(side=tk.LEFT, padx=5)
@@ -327,48 +730,55 @@ class PyEnvManager:
             return
         
         # Check if it's a valid Python environment
-        is_valid = False
-        python_version = "Unknown"
-        
         if sys.platform == "win32":
             python_path = os.path.join(path, "Scripts", "python.exe")
         else:
             python_path = os.path.join(path, "bin", "python")
         
-        if os.path.exists(python_path):
-            try:
-                result = subprocess.run([python_path, "--version"], 
-                                       capture_output=True, text=True, check=True)
-                python_version = result.stdout.strip()
-                is_valid = True
-            except:
-                pass
-        
-        if not is_valid:
-            messagebox.showerror("Error", "The selected directory is not a valid Python environment")
-            return
-        
         # Check if already in the list
         for env in self.environments:
             if env["path"] == path:
                 messagebox.showinfo("Info", "This environment is already in your list")
                 return
         
-        # Add to environments list
-        name = os.path.basename(path)
-        self.environments.append({
-            "name": name,
-            "path": path,
-            "python_version": python_version
-        })
+        checked = {}
         
-        # Save environments
-        self.save_environments()
+        def check(task):
+            if os.path.exists(python_path):
+                try:
+                    result = scheduler.run([python_path, "--version"], env_name=os.path.basename(path),
+                                           priority=PRIORITY_INTERACTIVE, cancelled=lambda: task.cancelled,
+                                           capture_output=True, text=True, check=True)
+                    checked["python_version"] = result.stdout.strip()
+                except (OSError, subprocess.SubprocessError):
+                    pass
         
-        # Refresh the list
-        self.refresh_environments_list()
+        def on_checked(state):
+            if not state.finished or state.cancelled:
+                return
+            if "python_version" not in checked:
+                messagebox.showerror("Error", "The selected directory is not a valid Python environment")
+                return
+            
+            # Add to environments list
+            name = os.path.basename(path)
+            self.environments.append({
+                "name": name,
+                "path": path,
+                "python_version": checked["python_version"]
+            })
+            
+            # Save environments
+            self.save_environments()
+            
+            # Refresh the list
+            self.refresh_environments_list()
+            
+            messagebox.showinfo("Success", f"Python environment '{name}' added to your list")
         
-        messagebox.showinfo("Success", f"Python environment '{name}' added to your list")
+        # Checking the interpreter may wait for a scheduler slot
+        task = self.bus.run_in_thread(f"Open {os.path.basename(path)}", check)
+        self.bus.subscribe(task, on_checked)
     
     def on_environment_double_click(self, event):
         """Handle double-click on environment in the list"""
@@ -446,18 +856,25 @@ class PyEnvManager:
         list_frame.pack(fill=tk.BOTH, expand=True, pady=5)
         
         # Create treeview for packages
-        columns = ("name", "version", "latest_version")
-        pkg_tree = ttk.Treeview(list_frame, columns=columns, show="headings")
+        columns = ("name", "version", "latest_version", "advisories")
+        pkg_tree = ttk.Treeview(list_frame, columns=columns, show="headings", selectmode="extended")
         
         # Define headings
         pkg_tree.heading("name", text="Package Name")
         pkg_tree.heading("version", text="Version")
         pkg_tree.heading("latest_version", text="Latest Version")
+        pkg_tree.heading("advisories", text="Advisories")
         
         # Define columns
         pkg_tree.column("name", width=200)
         pkg_tree.column("version", width=100)
         pkg_tree.column("latest_version", width=100)
+        pkg_tree.column("advisories", width=200)
+        
+        # Saved package list shown until the current one has loaded
+        pkg_tree.tag_configure("stale", foreground="gray")
+        # Packages affected by a known advisory
+        pkg_tree.tag_configure("vulnerable", foreground="red")
         
         # Add scrollbar
         scrollbar = ttk.Scrollbar(list_frame, orient=tk.VERTICAL, command=pkg_tree.yview)
@@ -483,6 +900,10 @@ class PyEnvManager:
         show_deps_btn = ttk.Button(button_frame, text="Show Dependencies")
         show_deps_btn.pack(side=tk.LEFT, padx=5)
         
+        remove_orphans_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(button_frame, text="Also remove orphans",
+                        variable=remove_orphans_var).pack(side=tk.LEFT, padx=5)
+        
         # Set up dependencies tab
         ttk.Label(dependencies_tab, text="Select a package to view its dependencies:").pack(anchor=tk.W, pady=(0, 5))
         
@@ -584,8 +1005,14 @@ class PyEnvManager:
         browse_file_btn = ttk.Button(local_file_frame, text="Browse...", command=browse_local_file)
         browse_file_btn.pack(side=tk.LEFT)
         
-        install_local_btn = ttk.Button(local_frame, text="Install Local Package")
-        install_local_btn.pack(anchor=tk.W, padx=10, pady=(0, 10))
+        local_buttons_frame = ttk.Frame(local_frame)
+        local_buttons_frame.pack(fill=tk.X, padx=10, pady=(0, 10))
+        
+        install_local_btn = ttk.Button(local_buttons_frame, text="Install Local Package")
+        install_local_btn.pack(side=tk.LEFT)
+        
+        install_wheels_btn = ttk.Button(local_buttons_frame, text="Install Wheel Set...")
+        install_wheels_btn.pack(side=tk.LEFT, padx=5)
         
         # Set up install new packages tab
         ttk.Label(install_tab, text="Package Name:").pack(anchor=tk.W, pady=(0, 5))
@@ -601,12 +1028,30 @@ class PyEnvManager:
         ttk.Label(pkg_frame, text="Version (optional):").pack(side=tk.LEFT, padx=(10, 5))
         
         pkg_version_var = tk.StringVar()
-        pkg_version_entry = ttk.Entry(pkg_frame, textvariable=pkg_version_var, width=15)
+        pkg_version_entry = ttk.Combobox(pkg_frame, textvariable=pkg_version_var, width=15)
         pkg_version_entry.pack(side=tk.LEFT)
         
-        # Install button
-        install_btn = ttk.Button(install_tab, text="Install Package")
-        install_btn.pack(anchor=tk.W, pady=10)
+        # Matching project names from the local package index, shown while typing
+        suggestions_listbox = tk.Listbox(install_tab, height=6, width=40, exportselection=False)
+        index_status_label = ttk.Label(install_tab, text="Loading package index...", foreground="gray")
+        index_status_label.pack(anchor=tk.W, pady=(2, 0))
+        
+        # Install and cancel buttons
+        install_btn_frame = ttk.Frame(install_tab)
+        install_btn_frame.pack(fill=tk.X, pady=10)
+        
+        install_btn = ttk.Button(install_btn_frame, text="Install Package")
+        install_btn.pack(side=tk.LEFT)
+        
+        cancel_btn = ttk.Button(install_btn_frame, text="Cancel", state=tk.DISABLED)
+        cancel_btn.pack(side=tk.LEFT, padx=5)
+        
+        sync_btn = ttk.Button(install_btn_frame, text="Sync to Requirements...")
+        sync_btn.pack(side=tk.LEFT, padx=5)
+        
+        installer_label = ttk.Label(install_btn_frame, foreground="gray",
+                                    text=f"Installer: {self.installers.select(self.settings['installer']).label}")
+        installer_label.pack(side=tk.RIGHT)
         
         # Output frame
         output_frame = ttk.LabelFrame(install_tab, text="Output")
@@ -616,86 +1061,85 @@ class PyEnvManager:
         output_text.pack(fill=tk.BOTH, expand=True)
         
         # Get Python executable path
-        if sys.platform == "win32":
-            python_exe = os.path.join(env["path"], "Scripts", "python.exe")
-            pip_exe = os.path.join(env["path"], "Scripts", "pip.exe")
-        else:
-            python_exe = os.path.join(env["path"], "bin", "python")
-            pip_exe = os.path.join(env["path"], "bin", "pip")
+        python_exe = env_python(env["path"])
+        
+        # Windows keeps the helper's imported modules locked while pip replaces them
+        helper = self.helpers.get(python_exe, env['name']) if self.settings["use_env_helper"] else None
+        
+        # Package list, outdated packages and dependency graph, shared with every
+        # other window showing this environment
+        model = self.models.get(env)
+        
+        def package_row(project, row):
+            """Values and tags of a package's row, with advisories from the loaded database"""
+            database = self.advisory_store.database
+            matches = database.match(project, row["version"]) if database else []
+            advisories = ""
+            if matches:
+                advisories = database.describe(matches[0][0])[0]
+                if len(matches) > 1:
+                    advisories += f" and {len(matches) - 1} more"
+            values = (row["name"], row["version"], model.latest_version(project) or "Checking...", advisories)
+            tags = ("stale",) if model.stale else ()
+            return values, tags + (("vulnerable",) if matches else ())
+        
+        def render_packages(names=None):
+            """Show the model's packages; names limits the update to those rows"""
+            if names is None:
+                with tracer.span("refresh package tree", "ui", environment=env['name'], rows=len(model.packages)):
+                    pkg_tree.delete(*pkg_tree.get_children())
+                    for project, row in model.sorted_packages():
+                        # Rows are keyed by normalized name for incremental updates
+                        values, tags = package_row(project, row)
+                        pkg_tree.insert("", tk.END, iid=project, values=values, tags=tags)
+            else:
+                for project in names:
+                    row = model.packages.get(project)
+                    if row is None:
+                        if pkg_tree.exists(project):
+                            pkg_tree.delete(project)
+                        continue
+                    values, tags = package_row(project, row)
+                    if pkg_tree.exists(project):
+                        pkg_tree.item(project, values=values, tags=tags)
+                    else:
+                        # Keep the list sorted by name
+                        names_in_tree = [str(pkg_tree.item(item, "values")[0]).lower() for item in pkg_tree.get_children()]
+                        index = sum(1 for existing in names_in_tree if existing < row["name"].lower())
+                        pkg_tree.insert("", index, iid=project, values=values, tags=tags)
+            
+            # Add to combobox for dependencies
+            deps_pkg_combo['values'] = [row["name"] for project, row in model.sorted_packages()]
         
-        # Function to load installed packages
-        def load_installed_packages():
-            # Clear the tree
+        def render_outdated():
+            """Show latest versions and fill the upgrade tab"""
             for item in pkg_tree.get_children():
-                pkg_tree.delete(item)
+                name, version, latest, advisories = pkg_tree.item(item, "values")
+                pkg_tree.item(item, values=(name, version, model.latest_version(item) or "Checking...", advisories))
             
-            try:
-                # Run pip list
-                result = subprocess.run([pip_exe, "list", "--format=json"], 
-                                       capture_output=True, text=True, check=True)
-                
-                packages = json.loads(result.stdout)
-                
-                # Get latest versions for packages
-                latest_versions = {}
-                
-                # Add packages to the tree
-                for pkg in packages:
-                    pkg_name = pkg.get("name", "Unknown")
-                    pkg_version = pkg.get("version", "Unknown")
-                    
-                    # Add to combobox for dependencies
-                    deps_pkg_combo['values'] = [p.get("name") for p in packages]
-                    
-                    pkg_tree.insert("", tk.END, values=(
-                        pkg_name,
-                        pkg_version,
-                        "Checking..."
-                    ))
-                
-                # Update latest versions in background
-                pkg_window.after(100, check_for_updates)
-                
-            except Exception as e:
-                messagebox.showerror("Error", f"Failed to get installed packages: {str(e)}")
+            upgrade_tree.delete(*upgrade_tree.get_children())
+            for project, pkg in sorted((model.outdated or {}).items()):
+                upgrade_tree.insert("", tk.END, values=(
+                    pkg.get("name", "Unknown"),
+                    pkg.get("version", "Unknown"),
+                    pkg.get("latest_version", "Unknown")
+                ))
+        
+        def on_model_change(event, names):
+            if not pkg_window.winfo_exists():
+                return
+            if event == PACKAGES_CHANGED:
+                render_packages(names)
+                if names is not None:
+                    render_outdated()
+            elif event == OUTDATED_CHANGED:
+                render_outdated()
+            elif event == LOAD_FAILED:
+                messagebox.showerror("Error", f"Failed to get installed packages: {names}", parent=pkg_window)
         
-        # Function to check for package updates
-        def check_for_updates():
-            try:
-                # Run pip list --outdated
-                result = subprocess.run(
-                    [pip_exe, "list", "--outdated", "--format=json"],
-                    capture_output=True, text=True, check=True
-                )
-                
-                outdated_packages = json.loads(result.stdout)
-                outdated_dict = {pkg["name"]: pkg["latest_version"] for pkg in outdated_packages}
-                
-                # Update the tree with latest versions
-                for item in pkg_tree.get_children():
-                    values = pkg_tree.item(item, "values")
-                    pkg_name = values[0]
-                    current_version = values[1]
-                    
-                    if pkg_name in outdated_dict:
-                        latest_version = outdated_dict[pkg_name]
-                        pkg_tree.item(item, values=(pkg_name, current_version, latest_version))
-                    else:
-                        pkg_tree.item(item, values=(pkg_name, current_version, "Up to date"))
-                
-                # Populate upgrade tab
-                for item in upgrade_tree.get_children():
-                    upgrade_tree.delete(item)
-                
-                for pkg in outdated_packages:
-                    upgrade_tree.insert("", tk.END, values=(
-                        pkg.get("name", "Unknown"),
-                        pkg.get("version", "Unknown"),
-                        pkg.get("latest_version", "Unknown")
-                    ))
-                
-            except Exception as e:
-                print(f"Error checking for updates: {str(e)}")
+        # Function to load installed packages
+        def load_installed_packages():
+            model.load(force=True)
         
         # Function to show dependencies for a package
         def show_dependencies():
@@ -708,60 +1152,103 @@ class PyEnvManager:
             for item in deps_tree.get_children():
                 deps_tree.delete(item)
             
-            try:
-                # Run pip show
-                result = subprocess.run(
-                    [pip_exe, "show", pkg_name],
-                    capture_output=True, text=True, check=True
-                )
-                
-                # Parse the output
-                output = result.stdout
-                requires = None
-                required_by = None
+            # Read from the model's dist-info metadata; no pip calls needed
+            requirements = model.requirements(pkg_name)
+            for dep, version in requirements:
+                deps_tree.insert("", tk.END, values=(
+                    dep,
+                    version or "Not installed",
+                    pkg_name
+                ))
+            if not requirements:
+                deps_tree.insert("", tk.END, values=(
+                    "No dependencies",
+                    "",
+                    ""
+                ))
+        
+        # Currently running installer command, if any
+        running_pip = [None]
+        
+        # Run a package operation, streaming its output into the output box. run(task)
+        # returns the exit code and runs on a worker thread; its output reaches the
+        # window through the progress bus, a batch of lines per frame.
+        def run_package_task(title, installer_text, run, success_message, failure_message, precompile=True):
+            if running_pip[0]:
+                messagebox.showinfo("Info", "Another package operation is still running")
+                return
+            
+            # Clear output
+            output_text.delete(1.0, tk.END)
+            
+            # Windows keeps imported extension modules locked; let pip replace them
+            if helper and sys.platform == "win32":
+                helper.close()
+            
+            # Other windows ignore site-packages changes until the model reloads afterwards
+            model.begin_operation()
+            installer_label.config(text=f"Installer: {installer_text}")
+            
+            def work(task):
+                if run(task) != 0:
+                    raise RuntimeError(failure_message)
                 
-                for line in output.splitlines():
-                    if line.startswith("Requires:"):
-                        requires = line.replace("Requires:", "").strip()
-                    elif line.startswith("Required-by:"):
-                        required_by = line.replace("Required-by:", "").strip()
+                # Compile what was just installed so the first import does not have to
+                if precompile and self.settings["precompile_after_install"]:
+                    task.log("Precompiling bytecode...")
+                    try:
+                        task.log(describe_report(self.precompile_environment(env["path"])))
+                    except Exception as e:
+                        task.log(f"Precompiling failed: {str(e)}")
+            
+            def on_progress(state):
+                if state.finished:
+                    # Refresh the list in every window showing this environment,
+                    # even if this one has been closed
+                    model.end_operation()
+                if not pkg_window.winfo_exists():
+                    return
                 
-                if requires:
-                    deps = [dep.strip() for dep in requires.split(",") if dep.strip()]
-                    for dep in deps:
-                        # Get version of dependency
-                        try:
-                            show_result = subprocess.run(
-                                [pip_exe, "show", dep],
-                                capture_output=True, text=True, check=True
-                            )
-                            
-                            dep_version = "Unknown"
-                            for line in show_result.stdout.splitlines():
-                                if line.startswith("Version:"):
-                                    dep_version = line.replace("Version:", "").strip()
-                                    break
-                            
-                            deps_tree.insert("", tk.END, values=(
-                                dep,
-                                dep_version,
-                                pkg_name
-                            ))
-                        except:
-                            deps_tree.insert("", tk.END, values=(
-                                dep,
-                                "Not installed",
-                                pkg_name
-                            ))
-                else:
-                    deps_tree.insert("", tk.END, values=(
-                        "No dependencies",
-                        "",
-                        ""
-                    ))
+                # Show output in real-time
+                if state.new_lines:
+                    output_text.insert(tk.END, "\n".join(state.new_lines) + "\n")
+                    output_text.see(tk.END)
                 
-            except Exception as e:
-                messagebox.showerror("Error", f"Failed to get dependencies: {str(e)}")
+                if state.finished:
+                    running_pip[0] = None
+                    cancel_btn.config(state=tk.DISABLED)
+                    
+                    if state.cancelled:
+                        output_text.insert(tk.END, "\nOperation cancelled\n")
+                    elif state.error:
+                        output_text.insert(tk.END, f"\n{state.error}\n")
+                    else:
+                        output_text.insert(tk.END, f"\n{success_message}\n")
+                    output_text.see(tk.END)
+            
+            task = self.bus.run_in_thread(title, work)
+            self.bus.subscribe(task, on_progress)
+            running_pip[0] = task
+            cancel_btn.config(state=tk.NORMAL)
+        
+        # Run an installer operation (install, sync or uninstall) with the configured backend
+        def run_installer(operation, args, success_message, failure_message, **options):
+            installer = self.installers.select(self.settings["installer"])
+            if operation != "uninstall":
+                options["index_url"] = self.settings["index_url"]
+            
+            def run(task):
+                # Waits for a free slot; cancelling kills the installer and anything it started
+                return self.installers.run(installer, operation, env, task.log, args,
+                                           cancelled=lambda: task.cancelled, **options)
+            
+            run_package_task(f"{installer.name} {operation}", installer.label, run, success_message,
+                             failure_message, precompile=operation != "uninstall")
+        
+        # Function to cancel the running installer command
+        def cancel_pip_command():
+            if running_pip[0]:
+                running_pip[0].cancel()
         
         # Function to upgrade selected package
         def upgrade_selected_package():
@@ -780,38 +1267,13 @@ class PyEnvManager:
             
             # Confirm upgrade
             if messagebox.askyesno("Confirm", f"Upgrade {pkg_name} to version {latest_version}?"):
-                # Clear output
-                output_text.delete(1.0, tk.END)
+                # Switch to install tab to show output
+                notebook.select(1)
                 
-                try:
-                    # Run pip install --upgrade
-                    process = subprocess.Popen(
-                        [pip_exe, "install", "--upgrade", pkg_name],
-                        stdout=subprocess.PIPE,
-                        stderr=subprocess.STDOUT,
-                        text=True,
-                        bufsize=1,
-                        universal_newlines=True
-                    )
-                    
-                    # Show output in real-time
-                    for line in process.stdout:
-                        output_text.insert(tk.END, line)
-                        output_text.see(tk.END)
-                        pkg_window.update()
-                    
-                    process.wait()
-                    
-                    if process.returncode == 0:
-                        output_text.insert(tk.END, f"\nPackage '{pkg_name}' upgraded successfully\n")
-                        
-                        # Refresh the list
-                        load_installed_packages()
-                    else:
-                        output_text.insert(tk.END, f"\nFailed to upgrade package '{pkg_name}'\n")
-                    
-                except Exception as e:
-                    output_text.insert(tk.END, f"\nError: {str(e)}\n")
+                # Run pip install --upgrade
+                run_installer("install", [pkg_name],
+                              f"Package '{pkg_name}' upgraded successfully",
+                              f"Failed to upgrade package '{pkg_name}'", upgrade=True)
         
         # Function to upgrade selected package from upgrade tab
         def upgrade_selected_from_tab():
@@ -829,38 +1291,10 @@ class PyEnvManager:
                 # Switch to install tab to show output
                 notebook.select(1)  # Switch to install tab
                 
-                # Clear output
-                output_text.delete(1.0, tk.END)
-                
-                try:
-                    # Run pip install --upgrade
-                    process = subprocess.Popen(
-                        [pip_exe, "install", "--upgrade", pkg_name],
-                        stdout=subprocess.PIPE,
-                        stderr=subprocess.STDOUT,
-                        text=True,
-                        bufsize=1,
-                        universal_newlines=True
-                    )
-                    
-                    # Show output in real-time
-                    for line in process.stdout:
-                        output_text.insert(tk.END, line)
-                        output_text.see(tk.END)
-                        pkg_window.update()
-                    
-                    process.wait()
-                    
-                    if process.returncode == 0:
-                        output_text.insert(tk.END, f"\nPackage '{pkg_name}' upgraded successfully\n")
-                        
-                        # Refresh the list
-                        load_installed_packages()
-                    else:
-                        output_text.insert(tk.END, f"\nFailed to upgrade package '{pkg_name}'\n")
-                    
-                except Exception as e:
-                    output_text.insert(tk.END, f"\nError: {str(e)}\n")
+                # Run pip install --upgrade
+                run_installer("install", [pkg_name],
+                              f"Package '{pkg_name}' upgraded successfully",
+                              f"Failed to upgrade package '{pkg_name}'", upgrade=True)
         
         # Function to upgrade all packages
         def upgrade_all_packages():
@@ -873,38 +1307,10 @@ class PyEnvManager:
                 # Switch to install tab to show output
                 notebook.select(1)  # Switch to install tab
                 
-                # Clear output
-                output_text.delete(1.0, tk.END)
-                
-                try:
-                    # Run pip install --upgrade for all outdated packages
-                    process = subprocess.Popen(
-                        [pip_exe, "install", "--upgrade", *[upgrade_tree.item(item, "values")[0] for item in upgrade_tree.get_children()]],
-                        stdout=subprocess.PIPE,
-                        stderr=subprocess.STDOUT,
-                        text=True,
-                        bufsize=1,
-                        universal_newlines=True
-                    )
-                    
-                    # Show output in real-time
-                    for line in process.stdout:
-                        output_text.insert(tk.END, line)
-                        output_text.see(tk.END)
-                        pkg_window.update()
-                    
-                    process.wait()
-                    
-                    if process.returncode == 0:
-                        output_text.insert(tk.END, "\nAll packages upgraded successfully\n")
-                        
-                        # Refresh the list
-                        load_installed_packages()
-                    else:
-                        output_text.insert(tk.END, "\nFailed to upgrade some packages\n")
-                    
-                except Exception as e:
-                    output_text.insert(tk.END, f"\nError: {str(e)}\n")
+                # Run pip install --upgrade for all outdated packages
+                run_installer("install", [upgrade_tree.item(item, "values")[0] for item in upgrade_tree.get_children()],
+                              "All packages upgraded successfully",
+                              "Failed to upgrade some packages", upgrade=True)
         
         # Function to install local package
         def install_local_package():
@@ -920,61 +1326,220 @@ class PyEnvManager:
             # Switch to install tab to show output
             notebook.select(1)  # Switch to install tab
             
-            # Clear output
-            output_text.delete(1.0, tk.END)
+            # Run pip install
+            run_installer("install", [file_path],
+                          f"Package installed successfully from '{file_path}'",
+                          f"Failed to install package from '{file_path}'")
+        
+        # Install a complete set of wheels, e.g. a wheelhouse, without pip
+        def install_wheel_set():
+            paths = filedialog.askopenfilenames(
+                title="Select Wheels",
+                filetypes=[("Wheels", "*.whl")],
+                parent=pkg_window
+            )
+            if not paths:
+                return
+            notebook.select(1)  # Switch to the tab with the output box
             
-            try:
-                # Run pip install
-                process = subprocess.Popen(
-                    [pip_exe, "install", file_path],
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.STDOUT,
-                    text=True,
-                    bufsize=1,
-                    universal_newlines=True
-                )
-                
-                # Show output in real-time
-                for line in process.stdout:
-                    output_text.insert(tk.END, line)
-                    output_text.see(tk.END)
-                    pkg_window.update()
-                
-                process.wait()
-                
-                if process.returncode == 0:
-                    output_text.insert(tk.END, f"\nPackage installed successfully from '{file_path}'\n")
-                    
-                    # Refresh the list
-                    load_installed_packages()
-                else:
-                    output_text.insert(tk.END, f"\nFailed to install package from '{file_path}'\n")
-                
-            except Exception as e:
-                output_text.insert(tk.END, f"\nError: {str(e)}\n")
+            def run(task):
+                # Unpacked directly, without a resolver; see wheel_installer
+                def install():
+                    install_wheels(env["path"], list(paths), task.log, lambda: task.cancelled)
+                    return 0
+                return self.installers.timed("wheels", "wheel set", "install", env, task.log, install)
+            
+            run_package_task("wheel set install", "wheel set", run,
+                             f"Installed {len(paths)} wheel(s)",
+                             "Failed to install the wheels")
+        
+        # Make the environment match a requirements or lock file exactly
+        def sync_requirements():
+            file_path = filedialog.askopenfilename(
+                title="Select Requirements File",
+                filetypes=[("Requirements Files", "*.txt"), ("All Files", "*.*")],
+                parent=pkg_window
+            )
+            if not file_path:
+                return
+            if not messagebox.askyesno("Confirm", f"Install the packages in '{os.path.basename(file_path)}' "
+                                                  f"and uninstall every package it does not list?", parent=pkg_window):
+                return
+            run_installer("sync", file_path,
+                          f"Environment synced to '{file_path}'",
+                          f"Failed to sync to '{file_path}'")
         
         # Function to uninstall selected package
         def uninstall_package():
-            selected = pkg_tree.selection()[0] if pkg_tree.selection() else None
+            selected = pkg_tree.selection()
             if not selected:
-                messagebox.showinfo("Info", "Please select a package to uninstall")
+                messagebox.showinfo("Info", "Please select one or more packages to uninstall")
                 return
             
-            values = pkg_tree.item(selected, "values")
-            pkg_name = values[0]
+            pkg_names = [str(pkg_tree.item(item, "values")[0]) for item in selected]
             
-            if messagebox.askyesno("Confirm", f"Are you sure you want to uninstall {pkg_name}?"):
-                try:
-                    # Run pip uninstall
-                    subprocess.run([pip_exe, "uninstall", "-y", pkg_name], check=True)
-                    
-                    # Refresh the list
-                    load_installed_packages()
-                    
-                    messagebox.showinfo("Success", f"Package '{pkg_name}' uninstalled successfully")
-                    
-                except Exception as e:
-                    messagebox.showerror("Error", f"Failed to uninstall package: {str(e)}")
+            if not remove_orphans_var.get():
+                if messagebox.askyesno("Confirm", "Are you sure you want to uninstall "
+                                                  f"{', '.join(pkg_names)}?"):
+                    run_uninstall(pkg_names)
+                return
+            
+            preview_uninstall(pkg_names)
+        
+        # Run one pip uninstall for all the given packages
+        def run_uninstall(pkg_names):
+            notebook.select(1)  # Switch to the tab with the output box
+            run_installer("uninstall", pkg_names,
+                          f"Uninstalled {len(pkg_names)} package(s): {', '.join(pkg_names)}",
+                          "Failed to uninstall packages")
+        
+        # Show what would be removed, including dependencies nothing else needs
+        def preview_uninstall(pkg_names):
+            distributions = model.distributions()
+            graph = model.dependency_graph()
+            by_name = {dist.normalized_name: dist for dist in distributions}
+            removing = {normalize_name(name) for name in pkg_names}
+            # Packages the user installed explicitly are never treated as orphans
+            requested = {dist.normalized_name for dist in distributions if dist.requested}
+            kept = set()
+            
+            preview = tk.Toplevel(pkg_window)
+            preview.title("Uninstall Preview")
+            preview.geometry("600x400")
+            preview.transient(pkg_window)
+            preview.grab_set()
+            
+            preview_frame = ttk.Frame(preview, padding="10")
+            preview_frame.pack(fill=tk.BOTH, expand=True)
+            
+            summary_label = ttk.Label(preview_frame, text="")
+            summary_label.pack(anchor=tk.W, pady=(0, 5))
+            
+            preview_columns = ("name", "version", "reason")
+            preview_tree = ttk.Treeview(preview_frame, columns=preview_columns, show="headings")
+            preview_tree.heading("name", text="Package Name")
+            preview_tree.heading("version", text="Version")
+            preview_tree.heading("reason", text="Reason")
+            preview_tree.column("name", width=180)
+            preview_tree.column("version", width=90)
+            preview_tree.column("reason", width=280)
+            preview_tree.pack(fill=tk.BOTH, expand=True, pady=5)
+            
+            plan = []
+            
+            def update_plan():
+                orphans = find_orphans(graph, removing, keep=requested | kept)
+                plan[:] = sorted(removing | orphans)
+                for item in preview_tree.get_children():
+                    preview_tree.delete(item)
+                for name in plan:
+                    dist = by_name.get(name)
+                    if name in removing:
+                        reason = "Selected"
+                    else:
+                        parents = sorted(required_by(graph, name) & set(plan))
+                        reason = f"Only needed by {', '.join(parents)}"
+                    preview_tree.insert("", tk.END, iid=name, values=(
+                        dist.name if dist else name,
+                        dist.version if dist else "",
+                        reason
+                    ))
+                summary_label.config(text=f"{len(removing)} selected package(s) and {len(orphans)} "
+                                          "orphaned dependencies will be uninstalled.")
+            
+            def keep_selected():
+                for item in preview_tree.selection():
+                    if item not in removing:
+                        kept.add(item)
+                update_plan()
+            
+            def confirm():
+                names = [by_name[name].name if name in by_name else name for name in plan]
+                preview.destroy()
+                run_uninstall(names)
+            
+            preview_buttons = ttk.Frame(preview_frame)
+            preview_buttons.pack(fill=tk.X, pady=5)
+            ttk.Button(preview_buttons, text="Keep Selected", command=keep_selected).pack(side=tk.LEFT, padx=5)
+            ttk.Button(preview_buttons, text="Cancel", command=preview.destroy).pack(side=tk.RIGHT, padx=5)
+            ttk.Button(preview_buttons, text="Uninstall", command=confirm).pack(side=tk.RIGHT, padx=5)
+            
+            update_plan()
+        
+        # Suggest package names from the cached index as the user types
+        suggest_job = {"id": None}
+        
+        def update_suggestions():
+            suggest_job["id"] = None
+            names = self.package_index.suggest(pkg_name_var.get())
+            suggestions_listbox.delete(0, tk.END)
+            for name in names:
+                suggestions_listbox.insert(tk.END, name)
+            if names and pkg_name_var.get().strip() != names[0]:
+                suggestions_listbox.pack(anchor=tk.W, after=pkg_frame)
+            else:
+                suggestions_listbox.pack_forget()
+        
+        def on_name_key(event):
+            if event.keysym == "Down" and suggestions_listbox.winfo_ismapped():
+                suggestions_listbox.focus_set()
+                suggestions_listbox.selection_clear(0, tk.END)
+                suggestions_listbox.selection_set(0)
+                suggestions_listbox.activate(0)
+                return
+            if event.keysym == "Escape":
+                suggestions_listbox.pack_forget()
+                return
+            if event.keysym in ("Up", "Left", "Right", "Return", "Tab"):
+                return
+            # Wait for a pause in typing before searching
+            if suggest_job["id"]:
+                pkg_window.after_cancel(suggest_job["id"])
+            suggest_job["id"] = pkg_window.after(150, update_suggestions)
+        
+        def choose_suggestion(event=None):
+            selection = suggestions_listbox.curselection()
+            if not selection:
+                return
+            pkg_name_var.set(suggestions_listbox.get(selection[0]))
+            suggestions_listbox.pack_forget()
+            pkg_name_entry.focus_set()
+            pkg_name_entry.icursor(tk.END)
+            load_versions()
+        
+        def load_versions(event=None):
+            """Offer the project's versions from its cached index page"""
+            name = pkg_name_var.get().strip()
+            if not name or (self.package_index.load() and name not in self.package_index):
+                pkg_version_entry.config(values=[])
+                return
+            
+            def work(task):
+                versions = self.package_index.versions(name)
+                self.bus.post(lambda: pkg_version_entry.config(values=versions)
+                              if pkg_window.winfo_exists() and pkg_name_var.get().strip() == name else None)
+            
+            self.bus.run_in_thread(f"Fetch versions of {name}", work)
+        
+        def load_package_index():
+            def work(task):
+                count, status = self.package_index.refresh()
+                text = f"Package index: {count} projects" + (" (offline)" if status == "offline" else "")
+                self.bus.post(lambda: index_status_label.config(text=text)
+                              if pkg_window.winfo_exists() else None)
+            
+            def on_progress(state):
+                if state.finished and state.error and pkg_window.winfo_exists():
+                    index_status_label.config(text=f"Package index unavailable: {state.error}")
+            
+            task = self.bus.run_in_thread("Refresh package index", work)
+            self.bus.subscribe(task, on_progress)
+        
+        pkg_name_entry.bind("<KeyRelease>", on_name_key)
+        pkg_name_entry.bind("<FocusOut>", load_versions)
+        suggestions_listbox.bind("<Double-1>", choose_suggestion)
+        suggestions_listbox.bind("<Return>", choose_suggestion)
+        suggestions_listbox.bind("<Escape>", lambda event: (suggestions_listbox.pack_forget(), pkg_name_entry.focus_set()))
         
         # Function to install package
         def install_package():
@@ -985,49 +1550,22 @@ class PyEnvManager:
                 messagebox.showerror("Error", "Please enter a package name")
                 return
             
-            # Clear output
-            output_text.delete(1.0, tk.END)
-            
             # Prepare command
             if pkg_version:
                 pkg_spec = f"{pkg_name}=={pkg_version}"
             else:
                 pkg_spec = pkg_name
             
-            try:
-                # Run pip install
-                process = subprocess.Popen(
-                    [pip_exe, "install", pkg_spec],
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.STDOUT,
-                    text=True,
-                    bufsize=1,
-                    universal_newlines=True
-                )
-                
-                # Show output in real-time
-                for line in process.stdout:
-                    output_text.insert(tk.END, line)
-                    output_text.see(tk.END)
-                    pkg_window.update()
-                
-                process.wait()
-                
-                if process.returncode == 0:
-                    output_text.insert(tk.END, f"\nPackage '{pkg_spec}' installed successfully\n")
-                    
-                    # Refresh the list
-                    load_installed_packages()
-                else:
-                    output_text.insert(tk.END, f"\nFailed to install package '{pkg_spec}'\n")
-                
-            except Exception as e:
-                output_text.insert(tk.END, f"\nError: {str(e)}\n")
+            # Run pip install
+            run_installer("install", [pkg_spec],
+                          f"Package '{pkg_spec}' installed successfully",
+                          f"Failed to install package '{pkg_spec}'")
         
         # Connect functions to buttons
         refresh_btn.config(command=load_installed_packages)
         uninstall_btn.config(command=uninstall_package)
         install_btn.config(command=install_package)
+        sync_btn.config(command=sync_requirements)
         upgrade_btn.config(command=upgrade_selected_package)
         show_deps_btn.config(command=lambda: notebook.select(2))  # Switch to dependencies tab
         
@@ -1035,9 +1573,35 @@ class PyEnvManager:
         upgrade_selected_btn.config(command=upgrade_selected_from_tab)
         upgrade_all_btn.config(command=upgrade_all_packages)
         install_local_btn.config(command=install_local_package)
-        
-        # Load installed packages
-        load_installed_packages()
+        install_wheels_btn.config(command=install_wheel_set)
+        cancel_btn.config(command=cancel_pip_command)
+        
+        # Closing the window cancels a running pip command
+        def on_close():
+            cancel_pip_command()
+            pkg_window.destroy()
+        
+        pkg_window.protocol("WM_DELETE_WINDOW", on_close)
+        
+        # Until the first load finishes, show the packages and outdated versions
+        # saved by the last scans, greyed out
+        if model.packages is None:
+            saved = self.inventory_cache.last_known(env["path"])
+            entry = (self.fleet_report or {}).get("environments", {}).get(env["path"])
+            if saved is not None:
+                model.seed([(row[0], row[1]) for row in saved],
+                           entry["outdated"] if entry and not entry["error"] else None)
+        
+        # Show what another window already loaded; the model watches site-packages
+        # while any window is subscribed
+        unsubscribe = model.subscribe(on_model_change)
+        pkg_window.bind("<Destroy>", lambda event: unsubscribe() if event.widget is pkg_window else None)
+        if model.packages is not None:
+            render_packages()
+            render_outdated()
+        model.load()
+        model.check_outdated()
+        load_package_index()
     
     def open_in_explorer(self):
         """Open the environment directory in file explorer"""
@@ -1050,9 +1614,9 @@ class PyEnvManager:
         if sys.platform == "win32":
             os.startfile(path)
         elif sys.platform == "darwin":  # macOS
-            subprocess.run(["open", path])
+            tracing.run(["open", path])
         else:  # Linux
-            subprocess.run(["xdg-open", path])
+            tracing.run(["xdg-open", path])
     
     def remove_environment(self):
         """Remove the environment from the list (does not delete files)"""
@@ -1070,6 +1634,144 @@ class PyEnvManager:
             # Refresh the list
             self.refresh_environments_list()
 
+    def relocate_environment(self):
+        """Move or rename the selected environment, fixing the paths embedded in it"""
+        env = self.get_selected_environment()
+        if not env:
+            return
+        if not is_venv(env["path"]):
+            messagebox.showerror("Error", f"'{env['name']}' is not a virtual environment and cannot be moved")
+            return
+        
+        dialog = tk.Toplevel(self.root)
+        dialog.title(f"Move / Rename - {env['name']}")
+        dialog.geometry("600x300")
+        dialog.transient(self.root)
+        dialog.grab_set()
+        
+        main_frame = ttk.Frame(dialog, padding="10")
+        main_frame.pack(fill=tk.BOTH, expand=True)
+        
+        ttk.Label(main_frame, text=f"Move or Rename {env['name']}", 
+                 font=("Helvetica", 14, "bold")).pack(anchor=tk.W, pady=(0, 10))
+        
+        form_frame = ttk.Frame(main_frame)
+        form_frame.pack(fill=tk.X, pady=5)
+        
+        ttk.Label(form_frame, text="Name:").grid(row=0, column=0, sticky=tk.W, pady=2)
+        name_var = tk.StringVar(value=os.path.basename(os.path.abspath(env["path"])))
+        ttk.Entry(form_frame, textvariable=name_var, width=50).grid(row=0, column=1, sticky=tk.W, padx=5, pady=2)
+        
+        ttk.Label(form_frame, text="Location:").grid(row=1, column=0, sticky=tk.W, pady=2)
+        location_var = tk.StringVar(value=os.path.dirname(os.path.abspath(env["path"])))
+        ttk.Entry(form_frame, textvariable=location_var, width=50).grid(row=1, column=1, sticky=tk.W, padx=5, pady=2)
+        
+        def browse_location():
+            path = filedialog.askdirectory(title="Select New Location", initialdir=location_var.get(), parent=dialog)
+            if path:
+                location_var.set(path)
+        
+        ttk.Button(form_frame, text="Browse...", command=browse_location).grid(row=1, column=2, padx=5)
+        
+        target_label = ttk.Label(main_frame, text="")
+        target_label.pack(anchor=tk.W, pady=5)
+        
+        def target_path():
+            return os.path.abspath(os.path.join(location_var.get().strip(), name_var.get().strip()))
+        
+        def show_target(*args):
+            target_label.config(text=f"New path: {target_path()}")
+        
+        name_var.trace_add("write", show_target)
+        location_var.trace_add("write", show_target)
+        show_target()
+        
+        status_label = ttk.Label(main_frame, text="")
+        status_label.pack(anchor=tk.W)
+        
+        progress = ttk.Progressbar(main_frame, mode="determinate")
+        progress.pack(fill=tk.X, pady=5)
+        
+        button_frame = ttk.Frame(main_frame)
+        button_frame.pack(fill=tk.X, pady=10)
+        close_btn = ttk.Button(button_frame, text="Cancel", command=dialog.destroy)
+        close_btn.pack(side=tk.RIGHT, padx=5)
+        move_btn = ttk.Button(button_frame, text="Move", command=lambda: start_move())
+        move_btn.pack(side=tk.RIGHT, padx=5)
+        
+        def finish_move(new_path, new_name, result):
+            old_path = env["path"]
+            self.models.discard(env)
+            for e in self.environments:
+                if e["path"] == old_path:
+                    e["path"], e["name"] = new_path, new_name
+            self.save_environments()
+            
+            # Carry the last outdated scan and audit over to the new path
+            for report, save in ((self.fleet_report, save_report), (self.audit_report, save_audit_report)):
+                entries = (report or {}).get("environments", {})
+                if old_path in entries:
+                    entries[new_path] = dict(entries.pop(old_path), name=new_name)
+                    save(self.cache_dir, report)
+            self.state_cache.rename(old_path, new_path)
+            self.refresh_environments_list()
+            
+            how = "Renamed" if result["method"] == "rename" else f"Copied {result['files']} files"
+            messagebox.showinfo("Success", f"{how} and updated {result['rewritten']} file(s). "
+                                           f"'{new_name}' is now at '{new_path}'.", parent=dialog)
+            dialog.destroy()
+        
+        def start_move():
+            new_name, new_path = name_var.get().strip(), target_path()
+            if not new_name or not location_var.get().strip():
+                messagebox.showerror("Error", "Please enter a name and a location", parent=dialog)
+                return
+            if os.path.normcase(new_path) == os.path.normcase(os.path.abspath(env["path"])):
+                messagebox.showerror("Error", "The new path is the same as the current one", parent=dialog)
+                return
+            if any(e["path"] == new_path for e in self.environments):
+                messagebox.showerror("Error", "Another environment in your list already uses that path", parent=dialog)
+                return
+            model = self.models.find(env)
+            if model and model.in_use:
+                messagebox.showerror("Error", f"Close the package manager windows for '{env['name']}' "
+                                              f"and wait for its operations to finish first", parent=dialog)
+                return
+            
+            # The helper process keeps files in the environment open
+            self.helpers.discard(env_python(env["path"]))
+            move_btn.config(state=tk.DISABLED)
+            status_label.config(text="Moving...")
+            
+            def work(task):
+                result = relocate(
+                    env["path"],
+                    new_path,
+                    progress=lambda done, total, message: task.progress(done, total, message),
+                    cancelled=lambda: task.cancelled
+                )
+                self.bus.post(lambda: finish_move(new_path, new_name, result))
+            
+            def on_progress(state):
+                if not dialog.winfo_exists():
+                    return
+                if state.message:
+                    status_label.config(text=state.message)
+                if state.percent is not None:
+                    progress["value"] = state.percent
+                if state.finished:
+                    move_btn.config(state=tk.NORMAL)
+                    close_btn.config(text="Close", command=dialog.destroy)
+                    if state.error:
+                        status_label.config(text=f"Move failed: {state.error}")
+                    elif state.cancelled:
+                        status_label.config(text="Move cancelled; the environment was left where it was.")
+            
+            task = self.bus.run_in_thread(f"Move {env['name']}", work)
+            self.bus.subscribe(task, on_progress)
+            close_btn.config(command=task.cancel)
+            dialog.bind("<Destroy>", lambda event: task.cancel() if event.widget is dialog else None)
+    
     def backup_environment(self):
         """Backup the selected environment"""
         env = self.get_selected_environment()
@@ -1087,19 +1789,1003 @@ class PyEnvManager:
         
         # Copy environment files
         try:
-            shutil.copytree(env["path"], os.path.join(backup_dir, env["name"]))
+            with tracer.span("copy environment", "io", environment=env["name"], source=env["path"]):
+                shutil.copytree(env["path"], os.path.join(backup_dir, env["name"]))
             messagebox.showinfo("Success", f"Environment '{env['name']}' backed up successfully to '{backup_dir}'")
         except Exception as e:
             messagebox.showerror("Error", f"Failed to backup environment: {str(e)}")
 
+    def verify_environment(self):
+        """Check the selected environment's files against their RECORD hashes"""
+        env = self.get_selected_environment()
+        if not env:
+            return
+        
+        dialog = tk.Toplevel(self.root)
+        dialog.title(f"Verify Integrity - {env['name']}")
+        dialog.geometry("750x500")
+        dialog.transient(self.root)
+        
+        main_frame = ttk.Frame(dialog, padding="10")
+        main_frame.pack(fill=tk.BOTH, expand=True)
+        
+        ttk.Label(main_frame, text=f"Verify Integrity of {env['name']}", 
+                 font=("Helvetica", 14, "bold")).pack(anchor=tk.W, pady=(0, 10))
+        
+        status_label = ttk.Label(main_frame, text="Reading RECORD files...")
+        status_label.pack(anchor=tk.W)
+        
+        progress = ttk.Progressbar(main_frame, mode="determinate")
+        progress.pack(fill=tk.X, pady=5)
+        
+        # Packages with problems; expand a package to see its files
+        results_frame = ttk.Frame(main_frame)
+        results_frame.pack(fill=tk.BOTH, expand=True, pady=5)
+        
+        columns = ("version", "checked", "problem")
+        results_tree = ttk.Treeview(results_frame, columns=columns, show="tree headings")
+        results_tree.heading("#0", text="Package / File")
+        results_tree.heading("version", text="Version")
+        results_tree.heading("checked", text="Files Checked")
+        results_tree.heading("problem", text="Problem")
+        results_tree.column("#0", width=380)
+        results_tree.column("version", width=100)
+        results_tree.column("checked", width=100)
+        results_tree.column("problem", width=120)
+        
+        results_scrollbar = ttk.Scrollbar(results_frame, orient=tk.VERTICAL, command=results_tree.yview)
+        results_tree.configure(yscroll=results_scrollbar.set)
+        results_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        results_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        
+        button_frame = ttk.Frame(main_frame)
+        button_frame.pack(fill=tk.X, pady=10)
+        close_btn = ttk.Button(button_frame, text="Cancel", command=lambda: task.cancel())
+        close_btn.pack(side=tk.RIGHT, padx=5)
+        
+        def show_report(report):
+            def short(path):
+                # Show paths relative to the environment
+                return os.path.relpath(path, env["path"])
+            
+            problems = 0
+            for name, package in sorted(report["packages"].items(), key=lambda item: item[0].lower()):
+                files = [(path, "Missing") for path in package["missing"]]
+                files += [(path, "Modified") for path in package["modified"]]
+                if not files and not package["no_record"]:
+                    continue
+                problems += len(files)
+                node = results_tree.insert("", tk.END, text=name, open=len(files) <= 10, values=(
+                    package["version"],
+                    package["checked"],
+                    "No RECORD" if package["no_record"] else f"{len(files)} file(s)"
+                ))
+                for path, problem in sorted(files):
+                    results_tree.insert(node, tk.END, text=short(path), values=("", "", problem))
+            
+            if report["unowned"]:
+                problems += len(report["unowned"])
+                node = results_tree.insert("", tk.END, text="Files not owned by any package", values=(
+                    "", "", f"{len(report['unowned'])} file(s)"
+                ))
+                for path in report["unowned"]:
+                    results_tree.insert(node, tk.END, text=short(path), values=("", "", "Unowned"))
+            
+            summary = (f"Checked {report['files']} files in {len(report['packages'])} packages "
+                       f"({report['hashed']} hashed, {report['hashed_bytes'] / (1024 * 1024):.1f} MB). ")
+            if report["cancelled"]:
+                summary += "Verification was cancelled; results are incomplete."
+            elif problems:
+                summary += f"Found {problems} problem(s)."
+            else:
+                summary += "No problems found."
+            status_label.config(text=summary)
+        
+        def work(task):
+            report = self.integrity_checker.verify(
+                env["path"],
+                progress=lambda done, total: task.progress(done, total),
+                cancelled=lambda: task.cancelled
+            )
+            self.bus.post(lambda: show_report(report) if dialog.winfo_exists() else None)
+        
+        def on_progress(state):
+            if not dialog.winfo_exists():
+                return
+            if state.percent is not None:
+                progress["value"] = state.percent
+                eta = format_eta(state.eta)
+                status_label.config(text=f"Hashing files... {state.percent:.0f}%" + (f" ({eta} left)" if eta else ""))
+            if state.finished:
+                progress["value"] = 100
+                close_btn.config(text="Close", command=dialog.destroy)
+                if state.error:
+                    status_label.config(text=f"Verification failed: {state.error}")
+        
+        task = self.bus.run_in_thread(f"Verify {env['name']}", work)
+        self.bus.subscribe(task, on_progress)
+        dialog.bind("<Destroy>", lambda event: task.cancel() if event.widget is dialog else None)
+    
+    def profile_imports(self):
+        """Profile interpreter startup and package import times for the selected environment"""
+        env = self.get_selected_environment()
+        if not env:
+            return
+        
+        dialog = tk.Toplevel(self.root)
+        dialog.title(f"Import Profiler - {env['name']}")
+        dialog.geometry("800x600")
+        dialog.transient(self.root)
+        
+        main_frame = ttk.Frame(dialog, padding="10")
+        main_frame.pack(fill=tk.BOTH, expand=True)
+        
+        ttk.Label(main_frame, text=f"Import Times for {env['name']}", 
+                 font=("Helvetica", 14, "bold")).pack(anchor=tk.W, pady=(0, 10))
+        
+        status_label = ttk.Label(main_frame, text="Measuring interpreter startup...")
+        status_label.pack(anchor=tk.W)
+        
+        progress = ttk.Progressbar(main_frame, mode="determinate")
+        progress.pack(fill=tk.X, pady=5)
+        
+        # One row per top-level module; expand it to see its heaviest imports
+        results_frame = ttk.Frame(main_frame)
+        results_frame.pack(fill=tk.BOTH, expand=True, pady=5)
+        
+        columns = ("distribution", "cumulative", "self", "modules")
+        results_tree = ttk.Treeview(results_frame, columns=columns, show="tree headings")
+        results_tree.heading("#0", text="Module")
+        results_tree.column("#0", width=260)
+        headings = {"distribution": "Distribution", "cumulative": "Cumulative (ms)",
+                    "self": "Self (ms)", "modules": "Modules Imported"}
+        for column, text in headings.items():
+            results_tree.heading(column, text=text, command=lambda c=column: sort_by(c))
+            results_tree.column(column, width=120)
+        
+        results_scrollbar = ttk.Scrollbar(results_frame, orient=tk.VERTICAL, command=results_tree.yview)
+        results_tree.configure(yscroll=results_scrollbar.set)
+        results_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        results_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        
+        # .pth files and sys.path entries that slow down startup
+        warnings_frame = ttk.LabelFrame(main_frame, text="Startup Warnings")
+        warnings_frame.pack(fill=tk.X, pady=5)
+        warnings_text = tk.Text(warnings_frame, height=6, wrap=tk.WORD)
+        warnings_text.pack(fill=tk.X)
+        
+        button_frame = ttk.Frame(main_frame)
+        button_frame.pack(fill=tk.X, pady=10)
+        close_btn = ttk.Button(button_frame, text="Cancel", command=lambda: task.cancel())
+        close_btn.pack(side=tk.RIGHT, padx=5)
+        
+        sort_state = {"column": "cumulative", "reverse": True}
+        
+        def sort_by(column):
+            if sort_state["column"] == column:
+                sort_state["reverse"] = not sort_state["reverse"]
+            else:
+                sort_state.update(column=column, reverse=column != "distribution")
+            
+            def key(item):
+                value = results_tree.set(item, column)
+                return value.lower() if column == "distribution" else float(value or 0)
+            
+            items = sorted(results_tree.get_children(), key=key, reverse=sort_state["reverse"])
+            for index, item in enumerate(items):
+                results_tree.move(item, "", index)
+        
+        def show_report(report):
+            startup = report["startup"]
+            if startup["error"]:
+                status_label.config(text=f"Could not profile startup: {startup['error']}")
+            else:
+                no_site = (f" ({startup['no_site_wall_s'] * 1000:.0f} ms without site-packages)"
+                           if startup["no_site_wall_s"] is not None else "")
+                status_label.config(text=f"Interpreter startup: {startup['wall_s'] * 1000:.0f} ms{no_site}. "
+                                         f"Profiled {len(report['packages'])} top-level modules.")
+            
+            for package in report["packages"]:
+                node = results_tree.insert("", tk.END, text=package["module"], values=(
+                    package["distribution"],
+                    f"{package['cumulative_us'] / 1000:.1f}",
+                    f"{package['self_us'] / 1000:.1f}",
+                    package["modules"]
+                ))
+                if package["error"]:
+                    results_tree.insert(node, tk.END, text=f"Import failed: {package['error']}")
+                for entry in package["heaviest"]:
+                    results_tree.insert(node, tk.END, text=entry["module"], values=(
+                        "",
+                        f"{entry['cumulative_us'] / 1000:.1f}",
+                        f"{entry['self_us'] / 1000:.1f}",
+                        ""
+                    ))
+            sort_state["reverse"] = False
+            sort_by("cumulative")
+            
+            warnings = []
+            for pth in report["pth_files"]:
+                for flag in pth["flags"]:
+                    warnings.append(f"{os.path.basename(pth['path'])}: {flag}")
+                for line in pth["import_lines"]:
+                    warnings.append(f"    {line[:200]}")
+            for entry in report["sys_path"]:
+                for flag in entry["flags"]:
+                    warnings.append(f"sys.path {entry['path']}: {flag}")
+            if len(report["sys_path"]) > 10:
+                warnings.append(f"sys.path has {len(report['sys_path'])} entries; each failed import searches all of them")
+            warnings_text.insert(tk.END, "\n".join(warnings) if warnings else "No problems found.")
+            warnings_text.config(state=tk.DISABLED)
+        
+        def work(task):
+            report = ImportProfiler(env["path"]).run(
+                progress=lambda done, total: task.progress(done, total, "Profiling package imports..."),
+                cancelled=lambda: task.cancelled
+            )
+            self.bus.post(lambda: show_report(report) if dialog.winfo_exists() else None)
+        
+        def on_progress(state):
+            if not dialog.winfo_exists():
+                return
+            if state.percent is not None:
+                progress["value"] = state.percent
+                status_label.config(text=f"{state.message} {state.done}/{state.total}")
+            if state.finished:
+                progress["value"] = 100
+                close_btn.config(text="Close", command=dialog.destroy)
+                if state.error:
+                    status_label.config(text=f"Profiling failed: {state.error}")
+        
+        task = self.bus.run_in_thread(f"Profile imports in {env['name']}", work)
+        self.bus.subscribe(task, on_progress)
+        dialog.bind("<Destroy>", lambda event: task.cancel() if event.widget is dialog else None)
+    
+    def export_snapshot(self):
+        """Save the selected environment's package list as a snapshot file"""
+        env = self.get_selected_environment()
+        if not env:
+            return
+        
+        path = filedialog.asksaveasfilename(
+            title="Export Snapshot",
+            initialfile=f"{env['name']}_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}{SNAPSHOT_EXTENSION}",
+            defaultextension=".json",
+            filetypes=[("PyEnv snapshots", f"*{SNAPSHOT_EXTENSION}"), ("JSON files", "*.json"), ("All files", "*.*")]
+        )
+        if not path:
+            return
+        
+        try:
+            packages = self.inventory_cache.get(env["path"])
+            save_snapshot(path, make_snapshot(env["name"], env.get("python_version", ""), packages))
+            messagebox.showinfo("Success", f"Exported {len(packages)} packages from '{env['name']}' to '{path}'")
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to export snapshot: {str(e)}")
+    
+    def compare_environments(self):
+        """Show the packages that differ between two environments or snapshots"""
+        env = self.get_selected_environment()
+        
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Compare Environments")
+        dialog.geometry("750x500")
+        dialog.transient(self.root)
+        
+        main_frame = ttk.Frame(dialog, padding="10")
+        main_frame.pack(fill=tk.BOTH, expand=True)
+        
+        ttk.Label(main_frame, text="Compare Environments", 
+                 font=("Helvetica", 14, "bold")).pack(anchor=tk.W, pady=(0, 10))
+        
+        # Each side is an environment from the list or a snapshot file
+        snapshot_choice = "Snapshot file..."
+        choices = [e["name"] for e in self.environments] + [snapshot_choice]
+        sources = {}
+        
+        select_frame = ttk.Frame(main_frame)
+        select_frame.pack(fill=tk.X, pady=5)
+        
+        left_var = tk.StringVar(value=env["name"] if env else "")
+        right_var = tk.StringVar()
+        for row, (label, var) in enumerate((("Left:", left_var), ("Right:", right_var))):
+            ttk.Label(select_frame, text=label).grid(row=row, column=0, sticky=tk.W, pady=2)
+            combo = ttk.Combobox(select_frame, textvariable=var, values=choices, state="readonly", width=50)
+            combo.grid(row=row, column=1, sticky=tk.W, padx=5, pady=2)
+            combo.bind("<<ComboboxSelected>>", lambda event, v=var: choose_source(v))
+        
+        compare_btn = ttk.Button(select_frame, text="Compare", command=lambda: run_compare())
+        compare_btn.grid(row=0, column=2, rowspan=2, padx=5)
+        
+        status_label = ttk.Label(main_frame, text="Choose two environments or snapshots to compare.")
+        status_label.pack(anchor=tk.W, pady=5)
+        
+        results_frame = ttk.Frame(main_frame)
+        results_frame.pack(fill=tk.BOTH, expand=True, pady=5)
+        
+        columns = ("package", "left", "right", "change")
+        results_tree = ttk.Treeview(results_frame, columns=columns, show="headings")
+        results_tree.heading("package", text="Package")
+        results_tree.heading("left", text="Left")
+        results_tree.heading("right", text="Right")
+        results_tree.heading("change", text="Change")
+        results_tree.column("package", width=220)
+        results_tree.column("left", width=150)
+        results_tree.column("right", width=150)
+        results_tree.column("change", width=180)
+        
+        results_scrollbar = ttk.Scrollbar(results_frame, orient=tk.VERTICAL, command=results_tree.yview)
+        results_tree.configure(yscroll=results_scrollbar.set)
+        results_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        results_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        
+        button_frame = ttk.Frame(main_frame)
+        button_frame.pack(fill=tk.X, pady=10)
+        ttk.Button(button_frame, text="Close", command=dialog.destroy).pack(side=tk.RIGHT, padx=5)
+        
+        def choose_source(var):
+            if var.get() != snapshot_choice:
+                return
+            path = filedialog.askopenfilename(
+                title="Open Snapshot",
+                filetypes=[("PyEnv snapshots", f"*{SNAPSHOT_EXTENSION}"), ("JSON files", "*.json"), ("All files", "*.*")],
+                parent=dialog
+            )
+            if not path:
+                var.set("")
+                return
+            label = f"Snapshot: {os.path.basename(path)}"
+            sources[label] = path
+            var.set(label)
+        
+        def load_side(choice):
+            """Inventory rows for a combobox choice"""
+            if choice in sources:
+                return load_snapshot(sources[choice])["packages"]
+            for e in self.environments:
+                if e["name"] == choice:
+                    return self.inventory_cache.get(e["path"])
+            raise ValueError(f"Unknown environment: {choice}")
+        
+        def describe(row):
+            version = row[1]
+            if row[2]:
+                version += f" ({row[2]})"
+            return version
+        
+        def show_diff(left_name, right_name, added, removed, changed, total):
+            for item in results_tree.get_children():
+                results_tree.delete(item)
+            rows = [(row[0], describe(row), "", "Only in left") for row in removed]
+            rows += [(row[0], "", describe(row), "Only in right") for row in added]
+            for left_row, right_row in changed:
+                if left_row[1] != right_row[1]:
+                    change = "Version differs"
+                elif left_row[2] != right_row[2]:
+                    change = "Installer differs"
+                else:
+                    change = "Files differ"
+                rows.append((right_row[0], describe(left_row), describe(right_row), change))
+            for row in sorted(rows, key=lambda row: row[0].lower()):
+                results_tree.insert("", tk.END, values=row)
+            
+            if rows:
+                status_label.config(text=f"{left_name} and {right_name}: {len(removed)} only in left, "
+                                         f"{len(added)} only in right, {len(changed)} changed, "
+                                         f"{total - len(removed) - len(changed)} identical.")
+            else:
+                status_label.config(text=f"{left_name} and {right_name} have identical packages ({total}).")
+        
+        def run_compare():
+            left_name, right_name = left_var.get(), right_var.get()
+            if not left_name or not right_name:
+                messagebox.showerror("Error", "Please choose both sides to compare", parent=dialog)
+                return
+            compare_btn.config(state=tk.DISABLED)
+            status_label.config(text="Reading package lists...")
+            
+            def work(task):
+                with tracer.span("compare environments", "app", left=left_name, right=right_name):
+                    left, right = load_side(left_name), load_side(right_name)
+                    added, removed, changed = diff_inventories(left, right)
+                self.bus.post(lambda: show_diff(left_name, right_name, added, removed, changed, len(left))
+                              if dialog.winfo_exists() else None)
+            
+            def on_progress(state):
+                if not dialog.winfo_exists() or not state.finished:
+                    return
+                compare_btn.config(state=tk.NORMAL)
+                if state.error:
+                    status_label.config(text=f"Comparison failed: {state.error}")
+            
+            task = self.bus.run_in_thread(f"Compare {left_name} with {right_name}", work)
+            self.bus.subscribe(task, on_progress)
+    
+    def start_fleet_scan(self):
+        """Check every environment for outdated packages; returns the running task
+        
+        A scan that is already running is returned instead of starting another.
+        """
+        if self.fleet_task:
+            return self.fleet_task
+        environments = [dict(env) for env in self.environments]
+        
+        def work(task):
+            report = scan_fleet(
+                environments,
+                self.inventory_cache,
+                self.latest_versions,
+                progress=lambda done, total, message: task.progress(done, total, message),
+                cancelled=lambda: task.cancelled
+            )
+            save_report(self.cache_dir, report)
+            self.bus.post(lambda: set_report(report))
+        
+        def set_report(report):
+            self.fleet_report = report
+            self.update_report_columns()
+        
+        def on_progress(state):
+            if not state.finished:
+                return
+            self.fleet_task = None
+            if state.error:
+                print(f"Outdated package scan failed: {state.error}")
+        
+        self.fleet_task = self.bus.run_in_thread("Check all environments for updates", work)
+        self.bus.subscribe(self.fleet_task, on_progress)
+        return self.fleet_task
+    
+    def show_fleet_dashboard(self):
+        """Outdated packages of every environment, with a package by environment matrix"""
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Outdated Packages")
+        dialog.geometry("850x600")
+        dialog.transient(self.root)
+        
+        main_frame = ttk.Frame(dialog, padding="10")
+        main_frame.pack(fill=tk.BOTH, expand=True)
+        
+        ttk.Label(main_frame, text="Outdated Packages in All Environments", 
+                 font=("Helvetica", 14, "bold")).pack(anchor=tk.W, pady=(0, 10))
+        
+        status_label = ttk.Label(main_frame, text="")
+        status_label.pack(anchor=tk.W)
+        
+        progress = ttk.Progressbar(main_frame, mode="determinate")
+        progress.pack(fill=tk.X, pady=5)
+        
+        # One row per environment; selecting rows limits the matrix to them
+        summary_frame = ttk.Frame(main_frame)
+        summary_frame.pack(fill=tk.X, pady=5)
+        
+        summary_columns = ("environment", "packages", "outdated", "unknown")
+        summary_tree = ttk.Treeview(summary_frame, columns=summary_columns, show="headings", height=6)
+        summary_tree.heading("environment", text="Environment")
+        summary_tree.heading("packages", text="Packages")
+        summary_tree.heading("outdated", text="Outdated")
+        summary_tree.heading("unknown", text="Not on Index")
+        summary_tree.column("environment", width=300)
+        summary_tree.column("packages", width=100)
+        summary_tree.column("outdated", width=100)
+        summary_tree.column("unknown", width=100)
+        
+        summary_scrollbar = ttk.Scrollbar(summary_frame, orient=tk.VERTICAL, command=summary_tree.yview)
+        summary_tree.configure(yscroll=summary_scrollbar.set)
+        summary_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        summary_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        
+        # Outdated packages by environment: installed version, or "current"
+        matrix_frame = ttk.LabelFrame(main_frame, text="Packages by Environment")
+        matrix_frame.pack(fill=tk.BOTH, expand=True, pady=5)
+        
+        matrix_tree = ttk.Treeview(matrix_frame, show="headings")
+        matrix_yscroll = ttk.Scrollbar(matrix_frame, orient=tk.VERTICAL, command=matrix_tree.yview)
+        matrix_xscroll = ttk.Scrollbar(matrix_frame, orient=tk.HORIZONTAL, command=matrix_tree.xview)
+        matrix_tree.configure(yscroll=matrix_yscroll.set, xscroll=matrix_xscroll.set)
+        matrix_yscroll.pack(side=tk.RIGHT, fill=tk.Y)
+        matrix_xscroll.pack(side=tk.BOTTOM, fill=tk.X)
+        matrix_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        
+        button_frame = ttk.Frame(main_frame)
+        button_frame.pack(fill=tk.X, pady=10)
+        ttk.Button(button_frame, text="Close", command=dialog.destroy).pack(side=tk.RIGHT, padx=5)
+        rescan_btn = ttk.Button(button_frame, text="Rescan", command=lambda: rescan())
+        rescan_btn.pack(side=tk.RIGHT, padx=5)
+        
+        def summarize(report):
+            scanned = datetime.datetime.fromtimestamp(report["scanned_at"]).strftime("%Y-%m-%d %H:%M")
+            entries = list(report["environments"].values())
+            outdated = sum(len(entry["outdated"]) for entry in entries)
+            stale = sum(1 for entry in entries if entry["outdated"])
+            return (f"{outdated} outdated package(s) in {stale} of {len(entries)} environment(s), "
+                    f"checked {scanned}.")
+        
+        def show_summary():
+            report = self.fleet_report
+            for item in summary_tree.get_children():
+                summary_tree.delete(item)
+            if not report:
+                status_label.config(text="No scan yet.")
+                show_matrix()
+                return
+            registered = {env["path"] for env in self.environments}
+            entries = [(path, entry) for path, entry in report["environments"].items() if path in registered]
+            for path, entry in sorted(entries, key=lambda item: item[1]["name"].lower()):
+                summary_tree.insert("", tk.END, iid=path, values=(
+                    entry["name"],
+                    entry["packages"],
+                    "Error" if entry["error"] else len(entry["outdated"]),
+                    entry["unknown"]
+                ))
+            status_label.config(text=summarize(report))
+            show_matrix()
+        
+        def show_matrix(event=None):
+            report = self.fleet_report or {}
+            names, rows = outdated_matrix(report, list(summary_tree.selection()) or None)
+            columns = ["package", "latest"] + [f"env{index}" for index in range(len(names))]
+            matrix_tree.delete(*matrix_tree.get_children())
+            matrix_tree.configure(columns=columns)
+            matrix_tree.heading("package", text="Package")
+            matrix_tree.heading("latest", text="Latest")
+            matrix_tree.column("package", width=180, stretch=False)
+            matrix_tree.column("latest", width=90, stretch=False)
+            for index, name in enumerate(names):
+                matrix_tree.heading(f"env{index}", text=name)
+                matrix_tree.column(f"env{index}", width=110, stretch=False)
+            for package, latest, cells in rows:
+                values = [package, latest]
+                for name in names:
+                    cell = cells.get(name)
+                    values.append("" if cell is None else (cell[0] if cell[1] else "current"))
+                matrix_tree.insert("", tk.END, values=values)
+        
+        def on_progress(state):
+            if not dialog.winfo_exists():
+                return
+            if state.message:
+                status_label.config(text=state.message)
+            if state.percent is not None:
+                progress["value"] = state.percent
+            if state.finished:
+                progress["value"] = 0
+                rescan_btn.config(state=tk.NORMAL)
+                if state.error:
+                    status_label.config(text=f"Scan failed: {state.error}")
+                else:
+                    show_summary()
+        
+        def rescan():
+            rescan_btn.config(state=tk.DISABLED)
+            self.bus.subscribe(self.start_fleet_scan(), on_progress)
+        
+        summary_tree.bind("<<TreeviewSelect>>", show_matrix)
+        show_summary()
+        if self.fleet_task:
+            rescan_btn.config(state=tk.DISABLED)
+            self.bus.subscribe(self.fleet_task, on_progress)
+        elif not self.fleet_report:
+            rescan()
+    
+    def start_audit(self):
+        """Match every environment against the advisory database; returns the running task
+        
+        An audit that is already running is returned instead of starting another.
+        """
+        if self.audit_task:
+            return self.audit_task
+        environments = [dict(env) for env in self.environments]
+        database_path = self.settings["advisory_database"]
+        
+        def work(task):
+            task.status("Loading advisory database...")
+            database = self.advisory_store.load(database_path)
+            task.status(f"Checking {len(environments)} environment(s) against {len(database)} advisories...")
+            report = audit_fleet(environments, self.inventory_cache, database, cancelled=lambda: task.cancelled)
+            save_audit_report(self.cache_dir, report)
+            self.bus.post(lambda: set_report(report))
+        
+        def set_report(report):
+            self.audit_report = report
+            self.update_report_columns()
+        
+        def on_progress(state):
+            if not state.finished:
+                return
+            self.audit_task = None
+            if state.error:
+                print(f"Security audit failed: {state.error}")
+        
+        self.audit_task = self.bus.run_in_thread("Audit environments", work)
+        self.bus.subscribe(self.audit_task, on_progress)
+        return self.audit_task
+    
+    def show_audit(self):
+        """Packages in any environment affected by advisories in the local database"""
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Security Audit")
+        dialog.geometry("850x550")
+        dialog.transient(self.root)
+        
+        main_frame = ttk.Frame(dialog, padding="10")
+        main_frame.pack(fill=tk.BOTH, expand=True)
+        
+        ttk.Label(main_frame, text="Security Audit", 
+                 font=("Helvetica", 14, "bold")).pack(anchor=tk.W, pady=(0, 10))
+        
+        # OSV dump: a zip such as PyPI/all.zip, a folder of JSON files or one JSON file
+        database_frame = ttk.Frame(main_frame)
+        database_frame.pack(fill=tk.X, pady=5)
+        ttk.Label(database_frame, text="Advisory database:").pack(side=tk.LEFT)
+        database_var = tk.StringVar(value=self.settings["advisory_database"] or "")
+        ttk.Entry(database_frame, textvariable=database_var, state="readonly", width=60).pack(
+            side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+        
+        def choose_database(folder=False):
+            if folder:
+                path = filedialog.askdirectory(title="Choose Advisory Folder", parent=dialog)
+            else:
+                path = filedialog.askopenfilename(
+                    title="Choose Advisory Database",
+                    filetypes=[("OSV dumps", "*.zip *.json"), ("All files", "*.*")],
+                    parent=dialog
+                )
+            if not path:
+                return
+            database_var.set(path)
+            self.settings["advisory_database"] = path
+            self.save_settings()
+            run_audit()
+        
+        ttk.Button(database_frame, text="Folder...", command=lambda: choose_database(folder=True)).pack(side=tk.RIGHT)
+        ttk.Button(database_frame, text="File...", command=choose_database).pack(side=tk.RIGHT, padx=5)
+        
+        status_label = ttk.Label(main_frame, text="")
+        status_label.pack(anchor=tk.W, pady=5)
+        
+        # Environments with findings; expand one to see its affected packages
+        results_frame = ttk.Frame(main_frame)
+        results_frame.pack(fill=tk.BOTH, expand=True, pady=5)
+        
+        columns = ("version", "advisory", "fixed", "summary")
+        results_tree = ttk.Treeview(results_frame, columns=columns, show="tree headings")
+        results_tree.heading("#0", text="Environment / Package")
+        results_tree.heading("version", text="Version")
+        results_tree.heading("advisory", text="Advisory")
+        results_tree.heading("fixed", text="Fixed In")
+        results_tree.heading("summary", text="Summary")
+        results_tree.column("#0", width=200)
+        results_tree.column("version", width=80)
+        results_tree.column("advisory", width=200)
+        results_tree.column("fixed", width=80)
+        results_tree.column("summary", width=260)
+        
+        results_scrollbar = ttk.Scrollbar(results_frame, orient=tk.VERTICAL, command=results_tree.yview)
+        results_tree.configure(yscroll=results_scrollbar.set)
+        results_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        results_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        
+        button_frame = ttk.Frame(main_frame)
+        button_frame.pack(fill=tk.X, pady=10)
+        ttk.Button(button_frame, text="Close", command=dialog.destroy).pack(side=tk.RIGHT, padx=5)
+        audit_btn = ttk.Button(button_frame, text="Run Audit", command=lambda: run_audit())
+        audit_btn.pack(side=tk.RIGHT, padx=5)
+        
+        def show_report():
+            results_tree.delete(*results_tree.get_children())
+            report = self.audit_report
+            if not report:
+                status_label.config(text="Choose an OSV advisory database to audit your environments."
+                                    if not self.settings["advisory_database"] else "No audit yet.")
+                return
+            registered = {env["path"] for env in self.environments}
+            entries = [entry for path, entry in report["environments"].items() if path in registered]
+            findings = 0
+            for entry in sorted(entries, key=lambda entry: entry["name"].lower()):
+                if entry["error"]:
+                    results_tree.insert("", tk.END, text=entry["name"], values=("", "", "", entry["error"]))
+                    continue
+                if not entry["findings"]:
+                    continue
+                findings += len(entry["findings"])
+                node = results_tree.insert("", tk.END, text=entry["name"], open=True, values=(
+                    "", f"{len(entry['findings'])} finding(s)", "", ""
+                ))
+                for package, version, advisory, summary, fixed in entry["findings"]:
+                    results_tree.insert(node, tk.END, text=package, values=(version, advisory, fixed, summary))
+            audited = datetime.datetime.fromtimestamp(report["audited_at"]).strftime("%Y-%m-%d %H:%M")
+            affected = sum(1 for entry in entries if entry["findings"])
+            status_label.config(text=f"{findings} finding(s) in {affected} of {len(entries)} environment(s) "
+                                     f"against {report['advisories']} advisories, checked {audited}.")
+        
+        def on_progress(state):
+            if not dialog.winfo_exists():
+                return
+            if state.message:
+                status_label.config(text=state.message)
+            if state.finished:
+                audit_btn.config(state=tk.NORMAL)
+                if state.error:
+                    status_label.config(text=f"Audit failed: {state.error}")
+                else:
+                    show_report()
+        
+        def run_audit():
+            if not self.settings["advisory_database"]:
+                messagebox.showerror("Error", "Please choose an advisory database first", parent=dialog)
+                return
+            audit_btn.config(state=tk.DISABLED)
+            self.bus.subscribe(self.start_audit(), on_progress)
+        
+        show_report()
+        if self.audit_task:
+            audit_btn.config(state=tk.DISABLED)
+            self.bus.subscribe(self.audit_task, on_progress)
+    
+    def set_index_url(self, index_url):
+        """Point installs, outdated checks and name suggestions at another index"""
+        self.settings["index_url"] = index_url
+        self.save_settings()
+        self.package_index = PackageIndex(self.cache_dir, index_url)
+        self.latest_versions = LatestVersions(self.package_index)
+    
+    def manage_mirror(self):
+        """Build an offline mirror from environments and lockfiles, and serve it"""
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Offline Mirror")
+        dialog.geometry("700x600")
+        dialog.transient(self.root)
+        
+        main_frame = ttk.Frame(dialog, padding="10")
+        main_frame.pack(fill=tk.BOTH, expand=True)
+        
+        ttk.Label(main_frame, text="Offline Mirror", 
+                 font=("Helvetica", 14, "bold")).pack(anchor=tk.W, pady=(0, 10))
+        
+        # Mirror directory
+        dir_frame = ttk.Frame(main_frame)
+        dir_frame.pack(fill=tk.X, pady=5)
+        ttk.Label(dir_frame, text="Mirror directory:").pack(side=tk.LEFT)
+        dir_var = tk.StringVar(value=self.settings["mirror_dir"] or str(self.cache_dir / "mirror"))
+        ttk.Entry(dir_frame, textvariable=dir_var, width=50).pack(side=tk.LEFT, padx=5)
+        
+        def browse_dir():
+            path = filedialog.askdirectory(title="Select Mirror Directory", parent=dialog)
+            if path:
+                dir_var.set(path)
+        
+        ttk.Button(dir_frame, text="Browse...", command=browse_dir).pack(side=tk.LEFT)
+        
+        # Environments and lockfiles whose packages go into the mirror
+        sources_frame = ttk.LabelFrame(main_frame, text="Mirror packages from")
+        sources_frame.pack(fill=tk.X, pady=5)
+        sources_list = tk.Listbox(sources_frame, height=7, selectmode=tk.EXTENDED, exportselection=False)
+        sources_list.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5, pady=5)
+        sources = [("env", e) for e in self.environments]
+        for kind, env in sources:
+            sources_list.insert(tk.END, f"Environment: {env['name']}")
+        sources_list.selection_set(0, tk.END)
+        
+        def add_lockfile():
+            path = filedialog.askopenfilename(
+                title="Add Lockfile",
+                filetypes=[("Requirements files", "*.txt"), ("All files", "*.*")],
+                parent=dialog
+            )
+            if path:
+                sources.append(("file", path))
+                sources_list.insert(tk.END, f"Lockfile: {path}")
+                sources_list.selection_set(tk.END)
+        
+        sources_buttons = ttk.Frame(sources_frame)
+        sources_buttons.pack(side=tk.RIGHT, fill=tk.Y, padx=5, pady=5)
+        ttk.Button(sources_buttons, text="Add Lockfile...", command=add_lockfile).pack(fill=tk.X)
+        build_btn = ttk.Button(sources_buttons, text="Build Mirror", command=lambda: build())
+        build_btn.pack(fill=tk.X, pady=5)
+        
+        status_label = ttk.Label(main_frame, text="Select environments and lockfiles, then click Build Mirror.")
+        status_label.pack(anchor=tk.W, pady=(5, 0))
+        
+        progress = ttk.Progressbar(main_frame, mode="determinate")
+        progress.pack(fill=tk.X, pady=5)
+        
+        output_text = tk.Text(main_frame, height=10, wrap=tk.WORD)
+        output_text.pack(fill=tk.BOTH, expand=True, pady=5)
+        
+        # Serving the mirror, and using it for installs
+        server_frame = ttk.LabelFrame(main_frame, text="Serve")
+        server_frame.pack(fill=tk.X, pady=5)
+        server_label = ttk.Label(server_frame)
+        server_label.pack(anchor=tk.W, padx=5, pady=(5, 0))
+        server_buttons = ttk.Frame(server_frame)
+        server_buttons.pack(fill=tk.X, padx=5, pady=5)
+        serve_btn = ttk.Button(server_buttons, command=lambda: toggle_server())
+        serve_btn.pack(side=tk.LEFT)
+        ttk.Button(server_buttons, text="Use for Installs", command=lambda: use_mirror()).pack(side=tk.LEFT, padx=5)
+        ttk.Button(server_buttons, text="Use PyPI", command=lambda: use_index(DEFAULT_INDEX_URL)).pack(side=tk.LEFT)
+        
+        button_frame = ttk.Frame(main_frame)
+        button_frame.pack(fill=tk.X, pady=(5, 0))
+        close_btn = ttk.Button(button_frame, text="Close", command=dialog.destroy)
+        close_btn.pack(side=tk.RIGHT, padx=5)
+        
+        running = {"task": None}
+        
+        def show_server_state():
+            server = self.mirror_server
+            if server and server.running:
+                server_label.config(text=f"Serving {server.root} at {server.url}")
+                serve_btn.config(text="Stop Server")
+            else:
+                server_label.config(text=f"Not serving. Installs use {self.settings['index_url']}")
+                serve_btn.config(text="Start Server")
+        
+        def toggle_server():
+            if self.mirror_server and self.mirror_server.running:
+                self.mirror_server.stop()
+                self.mirror_server = None
+            else:
+                mirror = Mirror(dir_var.get())
+                if not os.path.isdir(mirror.simple_dir):
+                    messagebox.showerror("Error", "Build the mirror before serving it", parent=dialog)
+                    return
+                try:
+                    self.mirror_server = MirrorServer(mirror.root, self.settings["mirror_host"],
+                                                      self.settings["mirror_port"]).start()
+                except OSError as e:
+                    messagebox.showerror("Error", f"Could not start the server: {str(e)}", parent=dialog)
+                    return
+            show_server_state()
+        
+        def use_index(index_url):
+            self.set_index_url(index_url)
+            show_server_state()
+            messagebox.showinfo("Package Index", f"Packages will be installed from {index_url}", parent=dialog)
+        
+        def use_mirror():
+            server = self.mirror_server
+            use_index(server.url if server and server.running else Mirror(dir_var.get()).simple_dir)
+        
+        def build():
+            chosen = [sources[index] for index in sources_list.curselection()]
+            if not chosen:
+                messagebox.showerror("Error", "Please select at least one environment or lockfile", parent=dialog)
+                return
+            envs = [source for kind, source in chosen if kind == "env"]
+            if not envs and any(kind == "file" for kind, source in chosen):
+                messagebox.showerror("Error", "Also select an environment; its interpreter decides which "
+                                              "wheels are downloaded for lockfiles", parent=dialog)
+                return
+            mirror = Mirror(dir_var.get())
+            self.settings["mirror_dir"] = mirror.root
+            self.save_settings()
+            output_text.delete(1.0, tk.END)
+            build_btn.config(state=tk.DISABLED)
+            close_btn.config(text="Cancel", command=lambda: running["task"].cancel())
+            
+            def work(task):
+                totals = {"requested": 0, "skipped": 0, "added": 0}
+                failed = []
+                for done, (kind, source) in enumerate(chosen):
+                    task.token.raise_if_cancelled()
+                    if kind == "env":
+                        label = source["name"]
+                        python = env_python(source["path"])
+                        requirements = [f"{row[0]}=={row[1]}" for row in self.inventory_cache.get(source["path"])]
+                    else:
+                        label = os.path.basename(source)
+                        python = env_python(envs[0]["path"])
+                        requirements = parse_requirements_file(source)
+                    task.progress(done, len(chosen), f"Collecting packages for {label}...")
+                    report = mirror.collect(python, requirements, log=task.log, cancelled=lambda: task.cancelled)
+                    totals["requested"] += report["requested"]
+                    totals["skipped"] += report["skipped"]
+                    totals["added"] += len(report["added"])
+                    failed += [f"{label}: {requirement}" for requirement in report["failed"]]
+                task.progress(len(chosen), len(chosen))
+                task.log(f"{totals['added']} files added, {totals['skipped']} of {totals['requested']} "
+                         f"requirements already mirrored.")
+                if failed:
+                    task.log("Could not be mirrored:\n    " + "\n    ".join(failed))
+            
+            def on_progress(state):
+                if not dialog.winfo_exists():
+                    return
+                if state.new_lines:
+                    output_text.insert(tk.END, "\n".join(state.new_lines) + "\n")
+                    output_text.see(tk.END)
+                if state.percent is not None:
+                    progress["value"] = state.percent
+                    if state.message:
+                        status_label.config(text=state.message)
+                if state.finished:
+                    running["task"] = None
+                    build_btn.config(state=tk.NORMAL)
+                    close_btn.config(text="Close", command=dialog.destroy)
+                    if state.cancelled:
+                        status_label.config(text="Building the mirror was cancelled")
+                    elif state.error:
+                        status_label.config(text=f"Building the mirror failed: {state.error}")
+                    else:
+                        status_label.config(text=f"Mirror is ready in {mirror.simple_dir}")
+            
+            running["task"] = self.bus.run_in_thread("Build offline mirror", work)
+            self.bus.subscribe(running["task"], on_progress)
+        
+        show_server_state()
+        dialog.bind("<Destroy>", lambda event: running["task"].cancel()
+                    if event.widget is dialog and running["task"] else None)
+    
+    def precompile_environment(self, env_path):
+        """Precompile an environment's site-packages with the configured settings"""
+        return self.precompiler.precompile(
+            env_path,
+            optimize_levels=self.settings["precompile_optimize_levels"],
+            invalidation_mode=self.settings["precompile_invalidation_mode"],
+            workers=self.settings["precompile_workers"]
+        )
+    
+    def setup_interpreter_choices(self, combo, version_label):
+        """Offer indexed interpreters in combo and show the chosen one's version
+        
+        The list is filled from the cached index straight away and updated
+        when a background rescan finishes. Returns a function that refreshes
+        version_label for whatever path is currently entered.
+        """
+        known = {}
+        
+        def fill(interpreters):
+            if not combo.winfo_exists():
+                return
+            known.clear()
+            for interpreter in interpreters:
+                known[interpreter["path"]] = interpreter
+            combo["values"] = list(known)
+            show_version()
+        
+        def describe(info):
+            if info:
+                venv = ", virtual environment" if info["is_venv"] else ""
+                version_label.config(text=f"Version: Python {info['version']} ({info['arch']}{venv})")
+            else:
+                version_label.config(text="Version: Unknown")
+        
+        def show_version(event=None):
+            path = combo.get().strip()
+            if not path:
+                version_label.config(text="Version: ")
+                return
+            if path in known:
+                describe(known[path])
+                return
+            
+            # Probing an interpreter not in the index may wait for a scheduler slot
+            version_label.config(text="Version: Checking...")
+            
+            def work(task):
+                info = self.interpreter_index.lookup(path)
+                self.bus.post(lambda: show(info))
+            
+            def show(info):
+                if version_label.winfo_exists() and combo.get().strip() == path:
+                    describe(info)
+            
+            self.bus.run_in_thread("Check Python interpreter", work)
+        
+        def rescan(task):
+            interpreters = self.interpreter_index.refresh()
+            self.bus.post(lambda: fill(interpreters))
+        
+        combo.bind("<<ComboboxSelected>>", show_version)
+        fill(self.interpreter_index.cached())
+        self.bus.run_in_thread("Scan Python interpreters", rescan)
+        return show_version
+    
     def get_system_python_version(self):
         """Get the system Python version"""
-        try:
-            result = subprocess.run([sys.executable, "--version"], 
-                                   capture_output=True, text=True, check=True)
-            return result.stdout.strip()
-        except:
-            return "Unknown"
+        # This is the interpreter running the application, so no subprocess (or scheduler slot) is needed
+        return f"Python {platform.python_version()}"
     
     def check_for_updates(self):
         """Check for updates from GitHub and update if available"""
@@ -1148,92 +2834,148 @@ class PyEnvManager:
         close_btn = ttk.Button(button_frame, text="Close", command=dialog.destroy)
         close_btn.pack(side=tk.LEFT, padx=5)
         
+        # Background checking option
+        auto_check_var = tk.BooleanVar(value=self.settings["auto_check_updates"])
+        
+        def toggle_auto_check():
+            self.settings["auto_check_updates"] = auto_check_var.get()
+            self.save_settings()
+            if auto_check_var.get():
+                self.update_checker.start()
+            else:
+                self.update_checker.stop()
+        
+        ttk.Checkbutton(button_frame, text="Check and download updates in the background",
+                        variable=auto_check_var, command=toggle_auto_check).pack(side=tk.LEFT, padx=10)
+        
+        # Workers report through the progress bus; only this listener touches the widgets
+        status_task = self.bus.start_task("Check for updates")
+        ui = self.bus.post
+        
+        def on_status(state):
+            if not dialog.winfo_exists():
+                return
+            if state.new_lines:
+                status_text.config(state=tk.NORMAL)
+                status_text.insert(tk.END, "\n".join(state.new_lines) + "\n")
+                status_text.see(tk.END)
+                status_text.config(state=tk.DISABLED)
+            if state.percent is not None:
+                progress["value"] = state.percent
+        
+        self.bus.subscribe(status_task, on_status)
+        
+        # Closing the dialog cancels whatever is still running
+        def on_dialog_destroy(event):
+            if event.widget is dialog:
+                status_task.cancel()
+                status_task.finish()
+        
+        dialog.bind("<Destroy>", on_dialog_destroy)
+        
         # Function to append text to status
         def append_status(text):
-            status_text.config(state=tk.NORMAL)
-            status_text.insert(tk.END, text + "\n")
-            status_text.see(tk.END)
-            status_text.config(state=tk.DISABLED)
-            dialog.update()
+            status_task.log(text)
+        
+        # Function to set the progress bar
+        def set_progress(value):
+            status_task.progress(value, 100)
+        
+        def enable_close():
+            ui(lambda: close_btn.config(text="Close", state=tk.NORMAL))
         
         # Function to download and update
         def download_and_update(release_data):
             try:
                 append_status("Preparing to update...")
-                progress["value"] = 0
+                set_progress(0)
                 
-                # Find the zip asset
+                updater = self.update_checker.updater
+                latest_version = release_data['tag_name'].lstrip('v')
+                
+                # Find the manifest and zip assets
+                manifest_asset = None
                 zip_asset = None
                 for asset in release_data['assets']:
-                    if asset['name'].endswith('.zip'):
+                    if asset['name'] == MANIFEST_NAME:
+                        manifest_asset = asset
+                    elif asset['name'].endswith('.zip') and not zip_asset:
                         zip_asset = asset
-                        break
-                
-                if not zip_asset:
-                    append_status("Error: No zip file found in release assets.")
-                    append_status("Please make sure the GitHub release includes a .zip file.")
-                    close_btn.config(state=tk.NORMAL)
-                    return
-                
-                # Download the zip file
-                append_status(f"Downloading update package: {zip_asset['name']}...")
-                download_url = zip_asset['browser_download_url']
-                
-                # Create temp directory
-                temp_dir = tempfile.mkdtemp()
-                zip_path = os.path.join(temp_dir, zip_asset['name'])
                 
                 # Function to update progress bar
-                def update_progress(count, block_size, total_size):
-                    if total_size > 0:
-                        percent = min(count * block_size * 100 / total_size, 100)
-                        progress["value"] = percent
-                        dialog.update()
-                
-                # Download the file
-                urllib.request.urlretrieve(download_url, zip_path, reporthook=update_progress)
+                def update_progress(done, total):
+                    status_task.token.raise_if_cancelled()
+                    if total > 0:
+                        set_progress(min(done * 100 / total, 100))
                 
-                append_status("Download complete.")
-                append_status("Extracting files...")
-                progress["value"] = 0
-                
-                # Extract the zip file
-                with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-                    # Get total files for progress tracking
-                    total_files = len(zip_ref.namelist())
-                    extracted = 0
+                staged = updater.staged_update(latest_version)
+                if staged:
+                    # Pre-staged by the background checker; nothing left to download
+                    append_status("Using update staged in the background.")
+                    plan, manifest = staged
+                elif manifest_asset:
+                    append_status("Downloading release manifest...")
+                    manifest = fetch_manifest(manifest_asset['browser_download_url'])
+                    manifest["version"] = latest_version
+                    plan = updater.plan(manifest)
                     
-                    # Extract each file
-                    for file in zip_ref.namelist():
-                        zip_ref.extract(file, temp_dir)
-                        extracted += 1
-                        progress["value"] = (extracted / total_files) * 100
-                        if extracted % 10 == 0:  # Update UI every 10 files
-                            dialog.update()
-                
-                # Find the extracted directory
-                extracted_dir = None
-                for item in os.listdir(temp_dir):
-                    item_path = os.path.join(temp_dir, item)
-                    if os.path.isdir(item_path) and item != "__MACOSX":  # Skip macOS metadata
-                        extracted_dir = item_path
-                        break
-                
-                if not extracted_dir:
-                    append_status("Error: Could not find extracted directory.")
-                    close_btn.config(state=tk.NORMAL)
+                    if plan.is_empty:
+                        append_status("All files are already up to date.")
+                        enable_close()
+                        return
+                    
+                    append_status(f"{len(plan.changed)} changed file(s), "
+                                  f"{plan.download_size / 1024:.1f} KB to download.")
+                    
+                    # Releases without a base URL serve files from the tagged source tree
+                    base_url = manifest.get("base_url") or \
+                        f"https://raw.githubusercontent.com/{GITHUB_REPO}/{release_data['tag_name']}/"
+                    updater.download(plan, manifest, base_url, progress=update_progress,
+                                     cancelled=lambda: status_task.cancelled)
+                elif zip_asset:
+                    # Download the zip file
+                    append_status(f"Downloading update package: {zip_asset['name']}...")
+                    
+                    temp_dir = tempfile.mkdtemp()
+                    zip_path = os.path.join(temp_dir, zip_asset['name'])
+                    
+                    with tracer.span("http download", "http", url=zip_asset['browser_download_url']):
+                        urllib.request.urlretrieve(
+                            zip_asset['browser_download_url'], zip_path,
+                            reporthook=lambda count, block_size, total_size: update_progress(count * block_size, total_size)
+                        )
+                    
+                    append_status("Download complete.")
+                    append_status("Comparing files...")
+                    set_progress(0)
+                    
+                    manifest = manifest_from_zip(zip_path, latest_version)
+                    plan = updater.plan(manifest)
+                    
+                    if plan.is_empty:
+                        append_status("All files are already up to date.")
+                        enable_close()
+                        return
+                    
+                    append_status(f"Extracting {len(plan.changed)} changed file(s)...")
+                    updater.stage_from_zip(plan, manifest, zip_path, progress=update_progress)
+                    shutil.rmtree(temp_dir, ignore_errors=True)
+                else:
+                    append_status("Error: No manifest or zip file found in release assets.")
+                    append_status("Please make sure the GitHub release includes a manifest.json or .zip file.")
+                    enable_close()
                     return
                 
-                append_status("Preparing to apply update...")
-                progress["value"] = 0
+                append_status("Download verified.")
+                append_status("Applying update...")
+                set_progress(0)
                 
-                # Get current application directory
-                app_dir = os.path.dirname(os.path.abspath(__file__))
+                # Swap in changed files, backing up only what gets replaced
+                backup_dir = updater.apply(plan, manifest, progress=update_progress)
+                if backup_dir:
+                    append_status(f"Replaced files backed up in: {backup_dir}")
                 
-                # Create backup of current version
-                backup_dir = os.path.join(app_dir, f"backup_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}")
-                append_status(f"Creating backup in: {backup_dir}")
-                shutil.copytree(app_dir, backup_dir, ignore=shutil.ignore_patterns('backup_*'))
+                append_status("Update applied. The application will restart.")
                 
                 # Create update script
                 update_script = """
@@ -1259,22 +3001,25 @@ subprocess.Popen([r"{python}", r"{script}"])
                 subprocess.Popen([sys.executable, restart_script_path])
                 
                 # Close the application
-                self.root.quit()
+                ui(self.root.quit)
                 
+            except (OperationCancelled, InterruptedError):
+                append_status("Update cancelled.")
+                enable_close()
             except Exception as e:
                 append_status(f"Error during update: {str(e)}")
-                close_btn.config(state=tk.NORMAL)
+                enable_close()
         
         # Function to check for updates
         def do_check_for_updates():
             try:
                 append_status("Checking for updates...")
-                progress["value"] = 10
+                set_progress(10)
                 
                 # Demo mode for testing without a real GitHub repo
                 if DEMO_MODE:
                     append_status("Running in demo mode (no actual GitHub repository connected)")
-                    progress["value"] = 30
+                    set_progress(30)
                     
                     # Simulate a delay
                     time.sleep(1)
@@ -1283,7 +3028,7 @@ subprocess.Popen([r"{python}", r"{script}"])
                     latest_version = "1.1.0"
                     append_status(f"Latest version: {latest_version}")
                     
-                    progress["value"] = 50
+                    set_progress(50)
                     
                     # Simulate release notes
                     release_notes = """
@@ -1303,145 +3048,121 @@ subprocess.Popen([r"{python}", r"{script}"])
                     append_status("Update available!")
                     append_status(f"Release notes:\n{release_notes}")
                     
-                    # Enable update button
-                    update_btn.config(state=tk.NORMAL)
-                    
                     # Configure update button for demo mode
-                    def demo_update():
-                        update_btn.config(state=tk.DISABLED)
-                        close_btn.config(state=tk.DISABLED)
-                        
+                    def demo_update_worker():
                         append_status("Preparing to update...")
-                        progress["value"] = 0
+                        set_progress(0)
                         
                         # Simulate download
                         for i in range(0, 101, 10):
                             append_status(f"Downloading update: {i}%") if i % 30 == 0 else None
-                            progress["value"] = i
+                            set_progress(i)
                             time.sleep(0.2)
-                            dialog.update()
                         
                         append_status("Download complete.")
                         append_status("Extracting files...")
-                        progress["value"] = 0
+                        set_progress(0)
                         
                         # Simulate extraction
                         for i in range(0, 101, 5):
-                            progress["value"] = i
+                            set_progress(i)
                             time.sleep(0.1)
-                            dialog.update()
                         
                         append_status("Preparing to apply update...")
                         append_status("Creating backup of current version...")
-                        progress["value"] = 0
+                        set_progress(0)
                         
                         # Simulate backup and update
                         for i in range(0, 101, 20):
                             append_status(f"Backing up files: {i}%") if i % 40 == 0 else None
-                            progress["value"] = i
+                            set_progress(i)
                             time.sleep(0.2)
-                            dialog.update()
                         
                         append_status("Update ready. The application will restart to apply the update.")
-                        progress["value"] = 100
+                        set_progress(100)
                         
                         # Show demo message
-                        messagebox.showinfo("Demo Mode", 
+                        ui(lambda: messagebox.showinfo("Demo Mode", 
                                            "This is a demonstration of the update feature.\n\n"
                                            "In a real deployment, the application would download "
                                            "and install the update from GitHub.\n\n"
                                            "To use this feature, set DEMO_MODE to False and "
-                                           "configure a valid GitHub repository.")
+                                           "configure a valid GitHub repository."))
                         
-                        close_btn.config(state=tk.NORMAL)
+                        enable_close()
+                    
+                    def demo_update():
+                        update_btn.config(state=tk.DISABLED)
+                        close_btn.config(state=tk.DISABLED)
+                        threading.Thread(target=demo_update_worker, daemon=True).start()
                     
-                    update_btn.config(command=demo_update)
+                    # Enable and configure update button
+                    ui(lambda: update_btn.config(state=tk.NORMAL, command=demo_update))
                     
                 else:
                     # Real GitHub API implementation
-                    # Fetch latest release info from GitHub API
-                    api_url = f"https://api.github.com/repos/{GITHUB_REPO}/releases/latest"
-                    
-                    append_status(f"Connecting to GitHub API: {api_url}")
-                    
-                    headers = {
-                        'User-Agent': 'Python Environment Manager Update Checker',
-                        'Accept': 'application/vnd.github.v3+json'
-                    }
-                    
-                    req = urllib.request.Request(api_url, headers=headers)
+                    # Fetch latest release info from the release API (GitHub unless overridden)
+                    append_status(f"Connecting to release API: {self.update_checker.api_url}")
                     
                     try:
-                        with urllib.request.urlopen(req) as response:
-                            data = json.loads(response.read().decode('utf-8'))
-                            
-                            # Debug output
-                            append_status(f"API response received. Status: {response.status}")
-                            
-                            if 'tag_name' not in data:
-                                append_status("Error: Invalid response from GitHub API")
-                                append_status(f"Response keys: {', '.join(data.keys())}")
-                                progress["value"] = 0
-                                return
-                            
-                            latest_version = data['tag_name'].lstrip('v')
-                            progress["value"] = 30
+                        # Conditional request; an unchanged release costs no rate limit
+                        data, fetch_status = self.update_checker.fetch_latest(force=True)
+                        
+                        # Debug output
+                        append_status(f"API response received ({fetch_status})")
+                        
+                        if 'tag_name' not in data:
+                            append_status("Error: Invalid response from GitHub API")
+                            append_status(f"Response keys: {', '.join(data.keys())}")
+                            set_progress(0)
+                            return
+                        
+                        latest_version = data['tag_name'].lstrip('v')
+                        set_progress(30)
+                        
+                        append_status(f"Latest version: {latest_version}")
+                        
+                        # Compare versions
+                        try:
+                            update_available = parse_version(latest_version) > parse_version(APP_VERSION)
                             
-                            append_status(f"Latest version: {latest_version}")
+                            set_progress(50)
                             
-                            # Compare versions
-                            try:
-                                current_version_parts = [int(x) for x in APP_VERSION.split('.')]
-                                latest_version_parts = [int(x) for x in latest_version.split('.')]
+                            if update_available:
+                                append_status("Update available!")
+                                
+                                # Check if body exists in the response
+                                if 'body' in data and data['body']:
+                                    append_status(f"Release notes:\n{data['body']}")
+                                else:
+                                    append_status("No release notes available.")
                                 
-                                # Pad with zeros if needed
-                                while len(current_version_parts) < 3:
-                                    current_version_parts.append(0)
-                                while len(latest_version_parts) < 3:
-                                    latest_version_parts.append(0)
+                                # Check if there are assets
+                                if 'assets' not in data or not data['assets']:
+                                    append_status("Warning: No assets found in this release.")
+                                    append_status("The update cannot be downloaded automatically.")
+                                    set_progress(100)
+                                    return
                                 
-                                update_available = False
-                                for i in range(3):
-                                    if latest_version_parts[i] > current_version_parts[i]:
-                                        update_available = True
-                                        break
-                                    elif latest_version_parts[i] < current_version_parts[i]:
-                                        break
+                                if self.update_checker.updater.staged_update(latest_version):
+                                    append_status("This update has already been downloaded and verified in the background.")
                                 
-                                progress["value"] = 50
+                                # Configure update button; closing the dialog cancels the download
+                                def do_update():
+                                    update_btn.config(state=tk.DISABLED)
+                                    close_btn.config(text="Cancel")
+                                    threading.Thread(target=download_and_update, args=(data,), daemon=True).start()
                                 
-                                if update_available:
-                                    append_status("Update available!")
-                                    
-                                    # Check if body exists in the response
-                                    if 'body' in data and data['body']:
-                                        append_status(f"Release notes:\n{data['body']}")
-                                    else:
-                                        append_status("No release notes available.")
-                                    
-                                    # Check if there are assets
-                                    if 'assets' not in data or not data['assets']:
-                                        append_status("Warning: No assets found in this release.")
-                                        append_status("The update cannot be downloaded automatically.")
-                                        progress["value"] = 100
-                                        return
-                                    
-                                    # Enable update button
-                                    update_btn.config(state=tk.NORMAL)
-                                    
-                                    # Configure update button
-                                    def do_update():
-                                        update_btn.config(state=tk.DISABLED)
-                                        close_btn.config(state=tk.DISABLED)
-                                        download_and_update(data)
-                                    
-                                    update_btn.config(command=do_update)
-                                else:
-                                    append_status("You have the latest version.")
-                            except ValueError as e:
-                                append_status(f"Error parsing version numbers: {str(e)}")
-                                append_status(f"Current version: {APP_VERSION}, Latest version: {latest_version}")
-                        
+                                # Enable update button
+                                ui(lambda: update_btn.config(state=tk.NORMAL, command=do_update))
+                            else:
+                                append_status("You have the latest version.")
+                        except ValueError as e:
+                            append_status(f"Error parsing version numbers: {str(e)}")
+                            append_status(f"Current version: {APP_VERSION}, Latest version: {latest_version}")
+                    
+                    except RateLimited as e:
+                        append_status(f"GitHub API rate limit reached. Try again after {time.ctime(e.retry_at)}.")
                     except urllib.error.HTTPError as e:
                         if e.code == 404:
                             append_status(f"Error: GitHub repository '{GITHUB_REPO}' not found or no releases available.")
@@ -1456,11 +3177,11 @@ subprocess.Popen([r"{python}", r"{script}"])
                     except json.JSONDecodeError as e:
                         append_status(f"Error parsing GitHub API response: {str(e)}")
                 
-                progress["value"] = 100
+                set_progress(100)
                 
             except Exception as e:
                 append_status(f"Error checking for updates: {str(e)}")
-                progress["value"] = 0
+                set_progress(0)
                 
                 # Log the error for debugging
                 import traceback
@@ -1501,30 +3222,24 @@ subprocess.Popen([r"{python}", r"{script}"])
         python_frame.grid(row=3, column=1, sticky=tk.W, pady=5)
         
         python_var = tk.StringVar()
-        python_entry = ttk.Entry(python_frame, textvariable=python_var, width=30)
-        python_entry.pack(side=tk.LEFT)
+        python_combo = ttk.Combobox(python_frame, textvariable=python_var, width=30)
+        python_combo.pack(side=tk.LEFT)
+        
+        # Version info
+        version_label = ttk.Label(form_frame, text="Version: ")
+        version_label.grid(row=4, column=1, sticky=tk.W, pady=5)
+        show_version = self.setup_interpreter_choices(python_combo, version_label)
         
         def browse_python():
             filetypes = [("Python Executable", "python.exe")] if sys.platform == "win32" else []
             path = filedialog.askopenfilename(title="Select Python Executable", filetypes=filetypes)
             if path:
                 python_var.set(path)
-                
-                # Get version of selected Python
-                try:
-                    result = subprocess.run([path, "--version"], 
-                                           capture_output=True, text=True, check=True)
-                    version_label.config(text=f"Version: {result.stdout.strip()}")
-                except:
-                    version_label.config(text="Version: Unknown")
+                show_version()
         
         browse_python_btn = ttk.Button(python_frame, text="Browse...", command=browse_python)
         browse_python_btn.pack(side=tk.LEFT, padx=5)
         
-        # Version info
-        version_label = ttk.Label(form_frame, text="Version: ")
-        version_label.grid(row=4, column=1, sticky=tk.W, pady=5)
-        
         # Warning
         warning_frame = ttk.Frame(form_frame)
         warning_frame.grid(row=5, column=0, columnspan=2, sticky=tk.EW, pady=10)
@@ -1550,11 +3265,28 @@ subprocess.Popen([r"{python}", r"{script}"])
                 messagebox.showerror("Error", "The selected file does not exist")
                 return
             
-            # Verify it's a Python executable
+            # Verify it's a Python executable, off the UI thread as it may have to be probed
+            checked = {}
+            
+            def check(task):
+                checked["info"] = self.interpreter_index.lookup(new_python)
+            
+            def on_checked(state):
+                if not state.finished or not dialog.winfo_exists():
+                    return
+                change_btn.config(state=tk.NORMAL)
+                if state.error or checked.get("info") is None:
+                    messagebox.showerror("Error", "The selected file is not a working Python interpreter",
+                                         parent=dialog)
+                    return
+                restart(new_python)
+            
+            change_btn.config(state=tk.DISABLED)
+            task = self.bus.run_in_thread("Check Python interpreter", check)
+            self.bus.subscribe(task, on_checked)
+        
+        def restart(new_python):
             try:
-                result = subprocess.run([new_python, "--version"], 
-                                       capture_output=True, text=True, check=True)
-                
                 # Create a restart script
                 restart_script = """
 import os
@@ -1584,7 +3316,8 @@ subprocess.Popen([r"{python}", r"{script}"])
                 messagebox.showerror("Error", f"Failed to verify Python executable: {str(e)}")
         
         ttk.Button(button_frame, text="Cancel", command=on_cancel).pack(side=tk.LEFT, padx=5)
-        ttk.Button(button_frame, text="Change", command=on_change).pack(side=tk.LEFT, padx=5)
+        change_btn = ttk.Button(button_frame, text="Change", command=on_change)
+        change_btn.pack(side=tk.LEFT, padx=5)
     
     def download_python(self):
         """Open dialog to download Python"""
@@ -1613,97 +3346,75 @@ subprocess.Popen([r"{python}", r"{script}"])
         
         ttk.Label(version_frame, text="Python Version:").pack(side=tk.LEFT)
         
-        # Python versions - default list
+        # Python versions - start from the cached catalog so the list shows up immediately
         default_versions = ["3.12.0", "3.11.7", "3.10.13", "3.9.18", "3.8.18"]
-        version_var = tk.StringVar(value=default_versions[0])
-        version_combo = ttk.Combobox(version_frame, textvariable=version_var, values=default_versions, width=10)
+        cached_versions = self.release_catalog.cached_versions()
+        initial_versions = cached_versions or default_versions
+        version_var = tk.StringVar(value=initial_versions[0])
+        version_combo = ttk.Combobox(version_frame, textvariable=version_var, values=initial_versions, width=10)
         version_combo.pack(side=tk.LEFT, padx=5)
         
+        def show_versions(versions, status):
+            if not dialog.winfo_exists():
+                return
+            
+            if versions:
+                current = version_var.get()
+                version_combo['values'] = versions
+                if current not in versions:
+                    version_var.set(versions[0])  # Set to latest version
+            
+            if status == "offline":
+                cached_at = self.release_catalog.cached_at()
+                when = cached_at.strftime("%Y-%m-%d %H:%M") if cached_at else "an earlier session"
+                status_label.config(text=f"Offline - showing {len(versions)} versions cached from {when}")
+            elif versions:
+                status_label.config(text=f"Found {len(versions)} Python versions")
+            else:
+                version_combo['values'] = default_versions
+                status_label.config(text="Could not fetch versions, using default list")
+            
+            progress["value"] = 100
+            refresh_btn.config(text="Refresh Versions", state="normal")
+            
+            # After a delay, reset progress bar
+            dialog.after(2000, lambda: progress.config(value=0))
+        
+        def show_fetch_error(error):
+            if not dialog.winfo_exists():
+                return
+            status_label.config(text=f"Error fetching versions: {error}")
+            refresh_btn.config(text="Refresh Versions", state="normal")
+            progress["value"] = 0
+        
         # Refresh button for versions
-        def fetch_python_versions():
+        def fetch_python_versions(force=True):
             refresh_btn.config(text="Refreshing...", state="disabled")
-            status_label.config(text="Fetching latest Python versions...")
+            status_label.config(text="Checking for new Python releases...")
             progress["value"] = 10
-            dialog.update()
             
-            # Function to actually fetch versions in a separate thread
+            # Revalidate the catalog in a separate thread to keep UI responsive;
+            # the result is handed back to the UI thread through the progress bus
             def do_fetch():
                 try:
-                    # Fetch the Python downloads page
-                    url = "https://www.python.org/downloads/"
-                    
-                    # Create a request with headers that accept gzip encoding
-                    headers = {
-                        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-                        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
-                        'Accept-Encoding': 'gzip, deflate'
-                    }
-                    
-                    req = urllib.request.Request(url, headers=headers)
-                    
-                    with urllib.request.urlopen(req) as response:
-                        # Check if the response is gzipped
-                        if response.info().get('Content-Encoding') == 'gzip':
-                            html = gzip.decompress(response.read()).decode('utf-8')
-                        else:
-                            html = response.read().decode('utf-8')
-                    
-                    progress["value"] = 50
-                    dialog.update()
-                    
-                    # Extract version numbers using regex
-                    # Look for Python 3.x.y release links
-                    pattern = r'Python\s+(\d+\.\d+\.\d+)'
-                    matches = re.findall(pattern, html)
-                    
-                    # Filter to only get Python 3.x versions and sort them
-                    versions = []
-                    for match in matches:
-                        if match.startswith('3.'):
-                            versions.append(match)
-                    
-                    # Remove duplicates and sort in descending order
-                    versions = sorted(list(set(versions)), key=lambda v: [int(x) for x in v.split('.')], reverse=True)
-                    
-                    # Take the top 10 versions
-                    versions = versions[:10] if len(versions) > 10 else versions
-                    
-                    progress["value"] = 80
-                    dialog.update()
-                    
-                    # Update the combobox
-                    if versions:
-                        version_combo['values'] = versions
-                        version_var.set(versions[0])  # Set to latest version
-                        status_label.config(text=f"Found {len(versions)} Python versions")
-                    else:
-                        # If no versions found, revert to default list
-                        version_combo['values'] = default_versions
-                        status_label.config(text="Could not fetch versions, using default list")
-                    
-                    progress["value"] = 100
-                    refresh_btn.config(text="Refresh Versions", state="normal")
-                    
-                    # After a delay, reset progress bar
-                    dialog.after(2000, lambda: setattr(progress, "value", 0))
-                    
+                    versions, status = self.release_catalog.refresh(force=force)
+                    callback = lambda: show_versions(versions, status)
                 except Exception as e:
-                    status_label.config(text=f"Error fetching versions: {str(e)}")
-                    refresh_btn.config(text="Refresh Versions", state="normal")
-                    progress["value"] = 0
-                    
                     # Log the error for debugging
                     print(f"Version fetch error: {str(e)}")
+                    error = str(e)
+                    callback = lambda: show_fetch_error(error)
+                
+                self.bus.post(callback)
             
-            # Run in a separate thread to keep UI responsive
-            import threading
             threading.Thread(target=do_fetch, daemon=True).start()
         
         refresh_btn = ttk.Button(version_frame, text="Refresh Versions", command=fetch_python_versions)
         refresh_btn.pack(side=tk.LEFT, padx=5)
         
-        # Auto-fetch versions on startup
-        dialog.after(100, fetch_python_versions)
+        # Revalidate the catalog on startup only when the cached copy has expired
+        if self.release_catalog.needs_refresh():
+            dialog.after(100, lambda: fetch_python_versions(force=False))
         
         # OS selection
         os_frame = ttk.Frame(main_frame)
@@ -1786,9 +3497,16 @@ subprocess.Popen([r"{python}", r"{script}"])
         button_frame = ttk.Frame(main_frame)
         button_frame.pack(fill=tk.X, pady=10)
         
+        # Download currently in progress, if any
+        active_download = [None]
+        
         def on_cancel():
+            if active_download[0]:
+                active_download[0].cancel()
             dialog.destroy()
         
+        dialog.protocol("WM_DELETE_WINDOW", on_cancel)
+        
         def on_download():
             version = version_var.get()
             os_name = os_var.get()
@@ -1853,21 +3571,50 @@ subprocess.Popen([r"{python}", r"{script}"])
             # Full path to save
             save_path = os.path.join(location, filename)
             
-            # Download function
-            def download_file():
+            # Download function, run on a worker thread that reports through the progress bus
+            def download_file(task):
+                # Function to report download progress
+                def update_progress(count, block_size, total_size):
+                    task.token.raise_if_cancelled()
+                    if total_size > 0:
+                        task.progress(min(count * block_size, total_size), total_size)
+                
                 try:
-                    status_label.config(text=f"Downloading {filename}...")
-                    
-                    # Function to update progress bar
-                    def update_progress(count, block_size, total_size):
-                        if total_size > 0:
-                            percent = min(count * block_size * 100 / total_size, 100)
-                            progress["value"] = percent
-                            dialog.update()
-                    
                     # Download the file
-                    urllib.request.urlretrieve(url, save_path, reporthook=update_progress)
+                    with tracer.span("http download", "http", url=url):
+                        urllib.request.urlretrieve(url, save_path, reporthook=update_progress)
+                except OperationCancelled:
+                    if os.path.exists(save_path):
+                        os.remove(save_path)
+                    raise
+            
+            # Reflect download progress in the dialog
+            def on_download_progress(state):
+                if not dialog.winfo_exists():
+                    return
+                
+                if not state.finished:
+                    if state.percent is not None:
+                        progress["value"] = state.percent
+                        eta = format_eta(state.eta)
+                        status_label.config(text=f"Downloading {filename}... {state.percent:.0f}%"
+                                                 + (f" (about {eta} left)" if eta else ""))
+                    return
+                
+                active_download[0] = None
+                if state.cancelled:
+                    status_label.config(text="Download cancelled")
+                    progress["value"] = 0
+                elif state.error:
+                    status_label.config(text=f"Error: {state.error}")
+                    messagebox.showerror("Error", f"Failed to download Python: {state.error}")
                     
+                    # Offer to open the download page
+                    if messagebox.askyesno("Open Download Page", "Would you like to open the Python download page in your browser?"):
+                        download_page = f"https://www.python.org/downloads/release/python-{version.replace('.', '')}"
+                        webbrowser.open(download_page)
+                else:
+                    progress["value"] = 100
                     status_label.config(text=f"Download complete: {save_path}")
                     messagebox.showinfo("Success", f"Python {version} downloaded successfully to {save_path}")
                     
@@ -1875,19 +3622,12 @@ subprocess.Popen([r"{python}", r"{script}"])
                     if os_name == "Windows" and package_type == "Installer":
                         if messagebox.askyesno("Install Python", "Do you want to run the Python installer now?"):
                             subprocess.Popen([save_path])
-                    
-                except Exception as e:
-                    status_label.config(text=f"Error: {str(e)}")
-                    messagebox.showerror("Error", f"Failed to download Python: {str(e)}")
-                    
-                    # Offer to open the download page
-                    if messagebox.askyesno("Open Download Page", "Would you like to open the Python download page in your browser?"):
-                        download_page = f"https://www.python.org/downloads/release/python-{version.replace('.', '')}"
-                        webbrowser.open(download_page)
             
             # Start download in a separate thread to keep UI responsive
-            import threading
-            threading.Thread(target=download_file, daemon=True).start()
+            status_label.config(text=f"Downloading {filename}...")
+            task = self.bus.run_in_thread(f"Download {filename}", download_file)
+            self.bus.subscribe(task, on_download_progress)
+            active_download[0] = task
         
         ttk.Button(button_frame, text="Cancel", command=on_cancel).pack(side=tk.LEFT, padx=5)
         ttk.Button(button_frame, text="Download", command=on_download).pack(side=tk.LEFT, padx=5)
@@ -1959,6 +3699,149 @@ subprocess.Popen([r"{python}", r"{script}"])
         # Close button
         ttk.Button(main_frame, text="Close", command=about_dialog.destroy).pack()
     
+    def show_diagnostics(self):
+        """Show timing of recent operations and export them as a trace"""
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Diagnostics")
+        dialog.geometry("800x680")
+        dialog.transient(self.root)
+        
+        main_frame = ttk.Frame(dialog, padding="10")
+        main_frame.pack(fill=tk.BOTH, expand=True)
+        
+        ttk.Label(main_frame, text="Operation Timings", 
+                 font=("Helvetica", 14, "bold")).pack(anchor=tk.W, pady=(0, 10))
+        
+        # Latency summary per operation
+        summary_frame = ttk.LabelFrame(main_frame, text="Latency by Operation")
+        summary_frame.pack(fill=tk.BOTH, expand=True, pady=5)
+        
+        summary_columns = ("name", "count", "p50", "p95", "max", "histogram")
+        summary_tree = ttk.Treeview(summary_frame, columns=summary_columns, show="headings", height=8)
+        summary_tree.heading("name", text="Operation")
+        summary_tree.heading("count", text="Count")
+        summary_tree.heading("p50", text="p50 (ms)")
+        summary_tree.heading("p95", text="p95 (ms)")
+        summary_tree.heading("max", text="Max (ms)")
+        summary_tree.heading("histogram", text="Histogram (1ms ... 5s+)")
+        summary_tree.column("name", width=180)
+        summary_tree.column("count", width=60)
+        summary_tree.column("p50", width=80)
+        summary_tree.column("p95", width=80)
+        summary_tree.column("max", width=80)
+        summary_tree.column("histogram", width=220)
+        
+        summary_scrollbar = ttk.Scrollbar(summary_frame, orient=tk.VERTICAL, command=summary_tree.yview)
+        summary_tree.configure(yscroll=summary_scrollbar.set)
+        summary_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        summary_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        
+        # Most recent spans
+        recent_frame = ttk.LabelFrame(main_frame, text="Recent Operations")
+        recent_frame.pack(fill=tk.BOTH, expand=True, pady=5)
+        
+        recent_columns = ("time", "name", "duration", "environment", "details")
+        recent_tree = ttk.Treeview(recent_frame, columns=recent_columns, show="headings", height=8)
+        recent_tree.heading("time", text="Time")
+        recent_tree.heading("name", text="Operation")
+        recent_tree.heading("duration", text="Duration (ms)")
+        recent_tree.heading("environment", text="Environment")
+        recent_tree.heading("details", text="Details")
+        recent_tree.column("time", width=80)
+        recent_tree.column("name", width=160)
+        recent_tree.column("duration", width=100)
+        recent_tree.column("environment", width=120)
+        recent_tree.column("details", width=300)
+        
+        recent_scrollbar = ttk.Scrollbar(recent_frame, orient=tk.VERTICAL, command=recent_tree.yview)
+        recent_tree.configure(yscroll=recent_scrollbar.set)
+        recent_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        recent_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        
+        # Installer timings, kept across sessions so backends can be compared
+        installer_frame = ttk.LabelFrame(main_frame, text="Installer Backends")
+        installer_frame.pack(fill=tk.X, pady=5)
+        
+        installer_columns = ("backend", "operation", "count", "median", "environment")
+        installer_tree = ttk.Treeview(installer_frame, columns=installer_columns, show="headings", height=4)
+        installer_tree.heading("backend", text="Backend")
+        installer_tree.heading("operation", text="Operation")
+        installer_tree.heading("count", text="Runs")
+        installer_tree.heading("median", text="Median (s)")
+        installer_tree.heading("environment", text="Last Environment")
+        installer_tree.column("backend", width=100)
+        installer_tree.column("operation", width=100)
+        installer_tree.column("count", width=60)
+        installer_tree.column("median", width=100)
+        installer_tree.column("environment", width=200)
+        installer_tree.pack(fill=tk.X)
+        
+        # Histogram bars, one character per bucket
+        bars = " ▁▂▃▄▅▆▇█"
+        
+        def refresh():
+            for item in summary_tree.get_children():
+                summary_tree.delete(item)
+            for item in recent_tree.get_children():
+                recent_tree.delete(item)
+            installer_tree.delete(*installer_tree.get_children())
+            
+            for backend, operation, count, median, env_name in self.installers.timing_summary():
+                installer_tree.insert("", tk.END, values=(backend, operation, count, f"{median:.2f}", env_name))
+            
+            for entry in tracer.stats():
+                peak = max(entry["histogram"]) or 1
+                sparkline = "".join(bars[round(count * (len(bars) - 1) / peak)] for count in entry["histogram"])
+                summary_tree.insert("", tk.END, values=(
+                    entry["name"],
+                    entry["count"],
+                    f"{entry['p50_ms']:.1f}",
+                    f"{entry['p95_ms']:.1f}",
+                    f"{entry['max_ms']:.1f}",
+                    sparkline
+                ))
+            
+            for span in reversed(tracer.spans()[-200:]):
+                details = span.attrs.get("command") or span.attrs.get("url") or span.attrs.get("source", "")
+                recent_tree.insert("", tk.END, values=(
+                    datetime.datetime.fromtimestamp(span.start).strftime("%H:%M:%S"),
+                    span.name,
+                    f"{span.duration * 1000:.1f}",
+                    span.attrs.get("environment", ""),
+                    details
+                ))
+        
+        def export_trace():
+            path = filedialog.asksaveasfilename(
+                title="Export Chrome Trace",
+                defaultextension=".json",
+                initialfile=f"pyenv_trace_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+                filetypes=[("Trace Event JSON", "*.json"), ("All Files", "*.*")]
+            )
+            if not path:
+                return
+            try:
+                tracer.export_chrome_trace(path)
+                messagebox.showinfo("Success", f"Trace exported to '{path}'.\n\n"
+                                               "Open it in chrome://tracing or https://ui.perfetto.dev")
+            except Exception as e:
+                messagebox.showerror("Error", f"Failed to export trace: {str(e)}")
+        
+        def clear():
+            tracer.clear()
+            refresh()
+        
+        # Buttons
+        button_frame = ttk.Frame(main_frame)
+        button_frame.pack(fill=tk.X, pady=10)
+        
+        ttk.Button(button_frame, text="Refresh", command=refresh).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Export Chrome Trace...", command=export_trace).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Clear", command=clear).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Close", command=dialog.destroy).pack(side=tk.RIGHT, padx=5)
+        
+        refresh()
+    
     def open_url(self, url):
         """Open a URL in the default web browser"""
         import webbrowser
@@ -1968,6 +3851,12 @@ def main():
     root = tk.Tk()
     app = PyEnvManager(root)
     root.mainloop()
+    app.helpers.shutdown()
+    scheduler.shutdown()
+    if app.mirror_server:
+        app.mirror_server.stop()
 
 if __name__ == "__main__":
+    # Integrity checks hash in worker processes, which a frozen build must support
+    multiprocessing.freeze_support()
     main()
@@ -5,7 +5,7 @@ a = Analysis(
     ['pyenv_manager.py'],
     pathex=[],
     binaries=[],
-    datas=[],
+    datas=[('env_helper.py', '.')],
     hiddenimports=[],
     hookspath=[],
     hooksconfig={},
@@ -0,0 +1,64 @@
+import os
+import re
+import json
+import datetime
+
+from http_cache import CachedResource
+from versions import sort_versions
+
+# python.org publishes its releases as JSON, so there is no need to scrape
+# the downloads page
+CATALOG_URL = "https://www.python.org/api/v2/downloads/release/?is_published=true"
+CATALOG_TTL = 6 * 60 * 60  # Revalidate at most every 6 hours
+
+RELEASE_NAME_PATTERN = re.compile(r"^Python\s+(\d+)\.(\d+)\.(\d+)$")
+
+
+def parse_release_list(body):
+    """Turn the python.org release API response into a sorted version list"""
+    releases = json.loads(body.decode("utf-8"))
+    versions = set()
+    for release in releases:
+        if release.get("pre_release") or not release.get("is_published", True):
+            continue
+        match = RELEASE_NAME_PATTERN.match(release.get("name", "").strip())
+        if match and match.group(1) == "3":
+            versions.add(".".join(match.groups()))
+    return sort_versions(versions, reverse=True)
+
+
+class ReleaseCatalog:
+    """Persistent catalog of CPython releases available from python.org"""
+
+    def __init__(self, cache_dir, url=CATALOG_URL, ttl=CATALOG_TTL):
+        self.resource = CachedResource(
+            url,
+            os.path.join(str(cache_dir), "python_releases.json"),
+            ttl,
+            parse_release_list,
+            headers={"Accept": "application/json"},
+        )
+
+    def cached_versions(self):
+        """Return the versions from the last catalog on disk (may be empty)"""
+        entry = self.resource.load()
+        return list(entry["data"]) if entry else []
+
+    def cached_at(self):
+        """Return when the cached catalog was last confirmed, or None"""
+        entry = self.resource.load()
+        if not entry:
+            return None
+        return datetime.datetime.fromtimestamp(entry.get("fetched_at", 0))
+
+    def needs_refresh(self):
+        """Whether the cached catalog is missing or past its TTL"""
+        return not self.resource.is_fresh(self.resource.load())
+
+    def refresh(self, force=False):
+        """Revalidate the catalog and return (versions, status)
+
+        See CachedResource.fetch for the meaning of status.
+        """
+        versions, status = self.resource.fetch(force=force)
+        return list(versions), status
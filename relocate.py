@@ -0,0 +1,190 @@
+"""Move or rename a virtual environment without recreating it
+
+A venv embeds its own absolute path in pyvenv.cfg, the activate scripts and
+the shebang (or, on Windows, the launcher) of every console script. The
+environment is renamed in place when source and destination share a
+filesystem, otherwise copied, and only those files are rewritten. When
+copying, they are rewritten on the way, so every file is read once.
+"""
+import os
+import re
+import sys
+import shutil
+
+from distributions import env_site_packages, read_venv_config
+from progress_bus import OperationCancelled
+from tracing import tracer
+
+SCRIPT_DIRS = ("bin", "Scripts")
+# Larger files in the scripts folder are native programs, not scripts or launchers
+MAX_SCRIPT_SIZE = 1024 * 1024
+# Site-packages files that may hold absolute paths into the environment
+SITE_SUFFIXES = (".pth", ".egg-link")
+
+
+class RelocationError(Exception):
+    pass
+
+
+def is_venv(path):
+    return os.path.isfile(os.path.join(path, "pyvenv.cfg"))
+
+
+def read_prompt(env_path):
+    """The prompt set in pyvenv.cfg, or None when the folder name is used"""
+    prompt = read_venv_config(env_path).get("prompt")
+    return prompt.strip("'\"") if prompt else None
+
+
+class PathRewriter:
+    """Replaces the old environment path with the new one in file contents"""
+
+    def __init__(self, old_path, new_path, rename_prompt):
+        old_paths = {os.path.abspath(old_path), os.path.realpath(old_path)}
+        flags = re.IGNORECASE if sys.platform == "win32" else 0
+        # Only whole paths: the old path must not continue as a longer folder name
+        alternatives = b"|".join(re.escape(os.fsencode(path)) for path in sorted(old_paths, key=len, reverse=True))
+        self.pattern = re.compile(b"(?:" + alternatives + rb")(?=[\\/\"'\s:;]|$)", flags | re.MULTILINE)
+        self.new_path = os.fsencode(os.path.abspath(new_path))
+        self.prompt = None
+        if rename_prompt:
+            old_name = os.fsencode(os.path.basename(os.path.abspath(old_path)))
+            new_name = os.fsencode(os.path.basename(os.path.abspath(new_path)))
+            if old_name != new_name:
+                self.prompt = (b"(" + old_name + b") ", b"(" + new_name + b") ")
+
+    def rewrite(self, data, activate=False):
+        data = self.pattern.sub(lambda match: self.new_path, data)
+        if activate and self.prompt:
+            data = data.replace(*self.prompt)
+        return data
+
+
+def needs_rewrite(rel_path, site_dirs):
+    """Whether a file (relative to the environment) can embed the environment's path"""
+    parts = rel_path.split(os.sep)
+    if len(parts) == 1:
+        return parts[0] == "pyvenv.cfg"
+    if len(parts) == 2 and parts[0] in SCRIPT_DIRS:
+        return True
+    return rel_path.endswith(SITE_SUFFIXES) and os.path.dirname(rel_path) in site_dirs
+
+
+def transfer(source, target, rewriter):
+    """Copy source to target (which may be the same file), rewriting embedded paths
+
+    Returns whether anything changed. Large and binary files other than
+    launchers are left alone.
+    """
+    name = os.path.basename(source)
+    size = os.path.getsize(source)
+    data = None
+    if size <= MAX_SCRIPT_SIZE:
+        with open(source, "rb") as f:
+            data = f.read()
+        activate = name.lower().startswith("activate")
+        is_text = data.startswith(b"#!") or activate or name.endswith((".cfg",) + SITE_SUFFIXES)
+        # Windows console scripts are launchers with the shebang ahead of an appended zip
+        is_launcher = name.lower().endswith(".exe") and b"#!" in data
+        if is_text or is_launcher:
+            rewritten = rewriter.rewrite(data, activate)
+            if rewritten != data:
+                tmp_path = target + ".relocate-tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(rewritten)
+                shutil.copystat(source, tmp_path)
+                os.replace(tmp_path, target)
+                return True
+    if source != target:
+        shutil.copy2(source, target)
+    return False
+
+
+def rewrite_in_place(env_path, rewriter, site_dirs, ignore_errors=False):
+    """Rewrite the files of an environment that can embed its path; returns (files, rewritten)"""
+    files = rewritten = 0
+    candidates = [os.path.join(env_path, "pyvenv.cfg")]
+    for rel_dir in list(SCRIPT_DIRS) + sorted(site_dirs):
+        directory = os.path.join(env_path, rel_dir)
+        if os.path.isdir(directory):
+            candidates.extend(entry.path for entry in os.scandir(directory)
+                              if entry.is_file(follow_symlinks=False)
+                              and needs_rewrite(os.path.join(rel_dir, entry.name), site_dirs))
+    for path in candidates:
+        try:
+            rewritten += transfer(path, path, rewriter)
+            files += 1
+        except OSError:
+            if not ignore_errors:
+                raise
+    return files, rewritten
+
+
+def relocate(old_path, new_path, progress=None, cancelled=None):
+    """Move the environment at old_path to new_path and fix its embedded paths
+
+    progress(done, total, message) is called while copying. Returns a dict
+    with method ("rename" or "copy"), files and rewritten counts.
+    """
+    old_path, new_path = os.path.abspath(old_path), os.path.abspath(new_path)
+    progress = progress or (lambda done, total, message: None)
+    if not is_venv(old_path):
+        raise RelocationError(f"'{old_path}' is not a virtual environment (no pyvenv.cfg)")
+    if os.path.exists(new_path):
+        raise RelocationError(f"'{new_path}' already exists")
+    if new_path.startswith(old_path + os.sep):
+        raise RelocationError("An environment cannot be moved into itself")
+    parent = os.path.dirname(new_path)
+    if not os.path.isdir(parent):
+        raise RelocationError(f"'{parent}' does not exist")
+
+    rewriter = PathRewriter(old_path, new_path, rename_prompt=read_prompt(old_path) is None)
+    site_dirs = {os.path.relpath(site_dir, old_path) for site_dir in env_site_packages(old_path)}
+    result = {"method": "rename", "files": 0, "rewritten": 0}
+
+    with tracer.span("relocate environment", "io", source=old_path, target=new_path) as attrs:
+        if os.stat(old_path).st_dev == os.stat(parent).st_dev:
+            progress(0, None, "Renaming...")
+            os.rename(old_path, new_path)
+            try:
+                result["files"], result["rewritten"] = rewrite_in_place(new_path, rewriter, site_dirs)
+            except Exception:
+                # Leave the environment where it was, as it was
+                os.rename(new_path, old_path)
+                rewrite_in_place(old_path, PathRewriter(new_path, old_path, rewriter.prompt is not None),
+                                 site_dirs, ignore_errors=True)
+                raise
+        else:
+            result["method"] = "copy"
+            total = sum(len(files) for directory, dirs, files in os.walk(old_path))
+            try:
+                for directory, dirs, files in os.walk(old_path):
+                    rel_dir = os.path.relpath(directory, old_path)
+                    target_dir = os.path.normpath(os.path.join(new_path, rel_dir))
+                    os.makedirs(target_dir, exist_ok=True)
+                    shutil.copystat(directory, target_dir)
+                    for name in dirs + files:
+                        source = os.path.join(directory, name)
+                        target = os.path.join(target_dir, name)
+                        if os.path.islink(source):
+                            os.symlink(os.readlink(source), target)
+                            if name in dirs:
+                                dirs.remove(name)  # Do not descend into linked folders
+                        elif name in files:
+                            rel_path = os.path.normpath(os.path.join(rel_dir, name))
+                            if needs_rewrite(rel_path, site_dirs):
+                                result["rewritten"] += transfer(source, target, rewriter)
+                            else:
+                                shutil.copy2(source, target)
+                            result["files"] += 1
+                            if cancelled and cancelled():
+                                raise OperationCancelled()
+                            if result["files"] % 200 == 0:
+                                progress(result["files"], total, f"Copied {result['files']} of {total} files")
+            except BaseException:
+                shutil.rmtree(new_path, ignore_errors=True)
+                raise
+            progress(total, total, "Removing the old copy...")
+            shutil.rmtree(old_path)
+        attrs.update(result)
+    return result
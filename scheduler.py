@@ -0,0 +1,268 @@
+"""App-wide scheduler for the subprocesses the application starts
+
+Every pip, venv and interpreter call waits for one of a fixed number of
+slots, handed out by priority: interactive queries first, then user
+actions, then background work. Jobs can be cancelled or time out, which
+kills the whole process tree, and background jobs can run at a lower CPU
+and I/O priority.
+"""
+import os
+import sys
+import time
+import heapq
+import signal
+import platform
+import itertools
+import threading
+import subprocess
+from contextlib import contextmanager
+
+from progress_bus import OperationCancelled
+from tracing import tracer, describe_command
+
+PRIORITY_INTERACTIVE = 0  # The user is waiting on the answer, e.g. listing packages
+PRIORITY_NORMAL = 1  # Actions the user started, e.g. installs
+PRIORITY_BACKGROUND = 2  # Checks and maintenance, e.g. outdated checks and precompiling
+PRIORITY_NAMES = {PRIORITY_INTERACTIVE: "interactive", PRIORITY_NORMAL: "normal", PRIORITY_BACKGROUND: "background"}
+
+# How often waiting jobs and running processes check for cancellation
+POLL_INTERVAL = 0.2
+# Grace period between asking a process tree to stop and killing it
+TERMINATE_GRACE = 3.0
+BACKGROUND_NICENESS = 10
+
+# ioprio_set(2) syscall numbers, used to put background jobs in the idle I/O class
+IOPRIO_SYSCALLS = {"x86_64": 251, "i386": 289, "i686": 289, "aarch64": 30, "armv7l": 314, "ppc64le": 273}
+IOPRIO_WHO_PROCESS = 1
+IOPRIO_CLASS_IDLE = 3
+IOPRIO_CLASS_SHIFT = 13
+
+
+def default_concurrency():
+    return os.cpu_count() or 2
+
+
+def set_io_priority_idle(pid):
+    """Put a process in the idle I/O scheduling class (Linux only)"""
+    number = IOPRIO_SYSCALLS.get(platform.machine())
+    if not sys.platform.startswith("linux") or number is None:
+        return False
+    try:
+        import ctypes
+        libc = ctypes.CDLL(None, use_errno=True)
+        return libc.syscall(number, IOPRIO_WHO_PROCESS, pid, IOPRIO_CLASS_IDLE << IOPRIO_CLASS_SHIFT) == 0
+    except (OSError, AttributeError):
+        return False
+
+
+def kill_tree(process):
+    """Stop a process started by the scheduler together with everything it started"""
+    if process.poll() is not None:
+        return
+    if sys.platform == "win32":
+        subprocess.run(["taskkill", "/T", "/F", "/PID", str(process.pid)],
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        return
+    # Jobs run in their own session, so the process group is the whole tree
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+        process.wait(TERMINATE_GRACE)
+    except subprocess.TimeoutExpired:
+        os.killpg(process.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+class ProcessScheduler:
+    """Runs subprocesses within a concurrency limit, highest priority first"""
+
+    def __init__(self, max_concurrent=0, lower_background_priority=True):
+        self.max_concurrent = max_concurrent or default_concurrency()
+        self.lower_background_priority = lower_background_priority
+        self._queue = []
+        self._tickets = itertools.count()
+        self._running = 0
+        self._processes = set()
+        self._condition = threading.Condition()
+
+    def configure(self, max_concurrent=None, lower_background_priority=None):
+        with self._condition:
+            if max_concurrent is not None:
+                self.max_concurrent = max_concurrent or default_concurrency()
+            if lower_background_priority is not None:
+                self.lower_background_priority = lower_background_priority
+            self._condition.notify_all()
+
+    def stats(self):
+        """(running, queued) job counts"""
+        with self._condition:
+            return self._running, len(self._queue)
+
+    @contextmanager
+    def slot(self, priority=PRIORITY_NORMAL, cancelled=None):
+        """Wait for a free slot; jobs of equal priority are served in order"""
+        ticket = (priority, next(self._tickets))
+        with self._condition:
+            heapq.heappush(self._queue, ticket)
+            while self._running >= self.max_concurrent or self._queue[0] != ticket:
+                if cancelled and cancelled():
+                    self._queue.remove(ticket)
+                    heapq.heapify(self._queue)
+                    self._condition.notify_all()
+                    raise OperationCancelled()
+                self._condition.wait(POLL_INTERVAL)
+            heapq.heappop(self._queue)
+            self._running += 1
+            self._condition.notify_all()
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._running -= 1
+                self._condition.notify_all()
+
+    def _spawn(self, cmd, priority, kwargs):
+        background = priority == PRIORITY_BACKGROUND and self.lower_background_priority
+        if sys.platform == "win32":
+            flags = kwargs.pop("creationflags", 0) | subprocess.CREATE_NEW_PROCESS_GROUP
+            if background:
+                flags |= subprocess.BELOW_NORMAL_PRIORITY_CLASS
+            process = subprocess.Popen(cmd, creationflags=flags, **kwargs)
+        else:
+            process = subprocess.Popen(cmd, start_new_session=True, **kwargs)
+            if background:
+                try:
+                    os.setpriority(os.PRIO_PROCESS, process.pid, BACKGROUND_NICENESS)
+                except (OSError, AttributeError):
+                    pass
+                set_io_priority_idle(process.pid)
+        with self._condition:
+            self._processes.add(process)
+        return process
+
+    def _watch(self, process, cancelled, timeout):
+        """Kill process when cancelled or past its timeout; returns the outcome dict"""
+        outcome = {"reason": None}
+        done = threading.Event()
+        deadline = None if timeout is None else time.perf_counter() + timeout
+
+        def watch():
+            while not done.wait(POLL_INTERVAL):
+                if cancelled and cancelled():
+                    outcome["reason"] = "cancelled"
+                elif deadline is not None and time.perf_counter() > deadline:
+                    outcome["reason"] = "timeout"
+                else:
+                    continue
+                kill_tree(process)
+                return
+
+        if cancelled or timeout is not None:
+            threading.Thread(target=watch, daemon=True).start()
+        outcome["done"] = done
+        return outcome
+
+    def _finish(self, process, outcome):
+        outcome["done"].set()
+        with self._condition:
+            self._processes.discard(process)
+
+    def run(self, cmd, priority=PRIORITY_NORMAL, cancelled=None, timeout=None, env_name=None,
+            check=False, input=None, capture_output=False, **kwargs):
+        """Like subprocess.run, but scheduled
+
+        Raises OperationCancelled if cancelled() becomes true and
+        subprocess.TimeoutExpired after timeout seconds; both kill the
+        process tree. The result's elapsed attribute is how long the
+        process ran, not counting the wait for a slot.
+        """
+        if capture_output:
+            kwargs["stdout"] = kwargs["stderr"] = subprocess.PIPE
+        if input is not None:
+            kwargs["stdin"] = subprocess.PIPE
+        with tracer.span(describe_command(cmd), "subprocess", command=subprocess.list2cmdline(cmd),
+                         environment=env_name or "", priority=PRIORITY_NAMES[priority]) as attrs:
+            queued_at = time.perf_counter()
+            with self.slot(priority, cancelled):
+                attrs["queued_ms"] = round((time.perf_counter() - queued_at) * 1000, 1)
+                started = time.perf_counter()
+                process = self._spawn(cmd, priority, kwargs)
+                outcome = self._watch(process, cancelled, timeout)
+                try:
+                    stdout, stderr = process.communicate(input)
+                finally:
+                    self._finish(process, outcome)
+                elapsed = time.perf_counter() - started
+            attrs["returncode"] = process.returncode
+
+        if outcome["reason"] == "cancelled":
+            raise OperationCancelled()
+        if outcome["reason"] == "timeout":
+            raise subprocess.TimeoutExpired(cmd, timeout, stdout, stderr)
+        if check and process.returncode:
+            raise subprocess.CalledProcessError(process.returncode, cmd, stdout, stderr)
+        result = subprocess.CompletedProcess(cmd, process.returncode, stdout, stderr)
+        result.elapsed = elapsed
+        return result
+
+    def stream(self, cmd, on_line, priority=PRIORITY_NORMAL, cancelled=None, timeout=None, env_name=None, **kwargs):
+        """Run cmd passing each line of its combined output to on_line; returns the exit code
+
+        Cancellation and timeouts behave as for run().
+        """
+        kwargs.update(stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True, bufsize=1)
+        with tracer.span(describe_command(cmd), "subprocess", command=subprocess.list2cmdline(cmd),
+                         environment=env_name or "", priority=PRIORITY_NAMES[priority]) as attrs:
+            queued_at = time.perf_counter()
+            with self.slot(priority, cancelled):
+                attrs["queued_ms"] = round((time.perf_counter() - queued_at) * 1000, 1)
+                process = self._spawn(cmd, priority, kwargs)
+                outcome = self._watch(process, cancelled, timeout)
+                try:
+                    for line in process.stdout:
+                        on_line(line)
+                    process.wait()
+                finally:
+                    self._finish(process, outcome)
+            attrs["returncode"] = process.returncode
+
+        if outcome["reason"] == "cancelled":
+            raise OperationCancelled()
+        if outcome["reason"] == "timeout":
+            raise subprocess.TimeoutExpired(cmd, timeout)
+        return process.returncode
+
+    def shutdown(self):
+        """Kill every running job, e.g. when the application exits"""
+        with self._condition:
+            processes = list(self._processes)
+        for process in processes:
+            kill_tree(process)
+
+
+# Shared by the whole application
+scheduler = ProcessScheduler()
+
+
+def run(cmd, **kwargs):
+    """Run cmd on the shared scheduler; see ProcessScheduler.run"""
+    return scheduler.run(cmd, **kwargs)
+
+
+def stream(cmd, on_line, **kwargs):
+    """Stream cmd's output on the shared scheduler; see ProcessScheduler.stream"""
+    return scheduler.stream(cmd, on_line, **kwargs)
+
+
+def slot(priority=PRIORITY_NORMAL, cancelled=None):
+    """Hold a slot of the shared scheduler, for work that talks to an existing process"""
+    return scheduler.slot(priority, cancelled)
+
+
+def configure(**kwargs):
+    """Change the shared scheduler's limits; see ProcessScheduler.configure"""
+    scheduler.configure(**kwargs)
+
+
+def shutdown():
+    scheduler.shutdown()
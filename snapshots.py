@@ -0,0 +1,166 @@
+import os
+import csv
+import json
+import hashlib
+import datetime
+import threading
+
+from distributions import find_distributions, env_site_packages, normalize_name
+from http_cache import write_json_atomic
+from tracing import tracer
+
+SNAPSHOT_FORMAT = 2
+# Format 1 hashed the whole RECORD, so its fingerprints cannot be compared with current ones
+READABLE_SNAPSHOT_FORMATS = (1, SNAPSHOT_FORMAT)
+INVENTORY_FORMAT = 2
+# Written per environment at install time rather than shipped in the wheel
+UNSHARED_INFO_FILES = {"RECORD", "INSTALLER", "REQUESTED", "direct_url.json"}
+SNAPSHOT_EXTENSION = ".pyenv-snapshot.json"
+
+
+def record_fingerprint(dist):
+    """Short hash of the paths and hashes in a distribution's RECORD
+
+    Only files inside site-packages count: console scripts (listed as
+    ../../../bin/...) embed the environment's own interpreter path, and
+    the files pip writes at install time differ between environments.
+    """
+    try:
+        with open(os.path.join(dist.path, "RECORD"), "r", encoding="utf-8", newline="") as f:
+            rows = list(csv.reader(f))
+    except (OSError, UnicodeDecodeError, csv.Error):
+        return ""
+    info_dir = os.path.basename(dist.path)
+    entries = []
+    for row in rows:
+        if len(row) < 2 or not row[1]:
+            continue
+        path = row[0].replace("\\", "/")
+        parts = path.split("/")
+        if path.startswith(("../", "/")) or "__pycache__" in parts:
+            continue
+        if parts[0] == info_dir and parts[-1] in UNSHARED_INFO_FILES:
+            continue
+        entries.append(f"{path},{row[1]}")
+    return hashlib.sha256("\n".join(sorted(entries)).encode("utf-8")).hexdigest()[:16]
+
+
+def scan_inventory(env_path):
+    """Inventory rows [name, version, installer, record hash] read from site-packages"""
+    rows = {}
+    for dist in find_distributions(env_path):
+        key = dist.normalized_name
+        if key in rows:
+            continue  # Shadowed by an earlier site-packages entry
+        installer = (dist.read_text("INSTALLER") or "").strip()
+        rows[key] = [dist.name, dist.version, installer, record_fingerprint(dist)]
+    return [rows[key] for key in sorted(rows)]
+
+
+def site_packages_stamp(env_path):
+    """Changes whenever a distribution is added, removed or replaced"""
+    stamp = []
+    for site_dir in env_site_packages(env_path):
+        try:
+            stamp.append([site_dir, os.stat(site_dir).st_mtime_ns])
+        except OSError:
+            pass
+    return stamp
+
+
+class InventoryCache:
+    """Per-environment inventory, rescanned only when site-packages changes"""
+
+    def __init__(self, cache_dir):
+        self.cache_dir = os.path.join(str(cache_dir), "inventory")
+        self._memory = {}
+        self._lock = threading.Lock()
+
+    def cache_path(self, env_path):
+        key = hashlib.sha1(os.path.abspath(env_path).encode("utf-8")).hexdigest()[:16]
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def last_known(self, env_path):
+        """The inventory rows saved for env_path, without checking they are current; None if there are none"""
+        path = self.cache_path(env_path)
+        with self._lock:
+            entry = self._memory.get(path)
+        if entry is None:
+            try:
+                with open(path, "r") as f:
+                    entry = json.load(f)
+            except (OSError, ValueError):
+                return None
+        return entry["packages"]
+
+    def get(self, env_path):
+        """Inventory rows for env_path, from cache when site-packages is unchanged"""
+        stamp = site_packages_stamp(env_path)
+        path = self.cache_path(env_path)
+        with self._lock:
+            entry = self._memory.get(path)
+        if entry is None:
+            try:
+                with open(path, "r") as f:
+                    entry = json.load(f)
+            except (OSError, ValueError):
+                entry = None
+        if entry and entry["stamp"] == stamp and entry.get("format") == INVENTORY_FORMAT:
+            return entry["packages"]
+
+        with tracer.span("scan inventory", "io", environment=env_path) as attrs:
+            packages = scan_inventory(env_path)
+            attrs["packages"] = len(packages)
+        entry = {"format": INVENTORY_FORMAT, "stamp": stamp, "packages": packages}
+        with self._lock:
+            self._memory[path] = entry
+        try:
+            write_json_atomic(path, entry)
+        except OSError as e:
+            print(f"Could not save inventory cache: {str(e)}")
+        return packages
+
+
+def make_snapshot(name, python_version, packages):
+    return {
+        "format": SNAPSHOT_FORMAT,
+        "name": name,
+        "python_version": python_version,
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "packages": packages,
+    }
+
+
+def save_snapshot(path, snapshot):
+    with open(path, "w") as f:
+        json.dump(snapshot, f, separators=(",", ":"))
+
+
+def load_snapshot(path):
+    with open(path, "r") as f:
+        snapshot = json.load(f)
+    if snapshot.get("format") not in READABLE_SNAPSHOT_FORMATS or "packages" not in snapshot:
+        raise ValueError(f"'{path}' is not a PyEnv snapshot")
+    if snapshot["format"] != SNAPSHOT_FORMAT:
+        snapshot["packages"] = [row[:3] + [""] for row in snapshot["packages"]]
+    return snapshot
+
+
+def diff_inventories(left, right):
+    """Compare two lists of inventory rows
+
+    Returns (added, removed, changed): added and removed are rows only in
+    right or left, changed is a list of (left row, right row) pairs. Rows
+    are hashed as tuples, so only the symmetric difference is examined. An
+    empty record hash is unknown and matches any other.
+    """
+    left_set = set(map(tuple, left))
+    right_set = set(map(tuple, right))
+    only_left = {normalize_name(row[0]): row for row in left_set - right_set}
+    only_right = {normalize_name(row[0]): row for row in right_set - left_set}
+
+    removed = [only_left[key] for key in sorted(only_left.keys() - only_right.keys())]
+    added = [only_right[key] for key in sorted(only_right.keys() - only_left.keys())]
+    changed = [(only_left[key], only_right[key]) for key in sorted(only_left.keys() & only_right.keys())
+               if only_left[key][:3] != only_right[key][:3] or (only_left[key][3] and only_right[key][3])]
+    return added, removed, changed
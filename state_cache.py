@@ -0,0 +1,152 @@
+"""Last known state of every environment, shown as soon as the window opens
+
+Health, interpreter version, package count and size of each environment are
+saved after every check. At startup the list is drawn from this snapshot,
+marked as stale, while the environments are checked again in the
+background and their rows updated one by one.
+"""
+import os
+import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from distributions import env_python, read_venv_config
+from http_cache import write_json_atomic
+from progress_bus import OperationCancelled
+from tracing import tracer
+
+STATE_FILE = "environments_state.json"
+STATE_FORMAT = 1
+CHECK_WORKERS = 4
+
+HEALTH_OK = "ok"
+HEALTH_MISSING = "missing"  # The folder is gone
+HEALTH_BROKEN = "broken"  # The folder is there but its interpreter is not
+
+
+def directory_size(path):
+    """Total size in bytes of the files under path, without following symlinks"""
+    total = 0
+    stack = [path]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        elif entry.is_file(follow_symlinks=False):
+                            total += entry.stat(follow_symlinks=False).st_size
+                    except OSError:
+                        pass
+        except OSError:
+            pass
+    return total
+
+
+def format_size(size):
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+
+def check_environment(env, inventory_cache):
+    """Current state of an environment, as stored in the snapshot"""
+    path = env["path"]
+    state = {"health": HEALTH_OK, "python_version": env.get("python_version"), "packages": None,
+             "size": None, "checked_at": time.time()}
+    if not os.path.isdir(path):
+        state["health"] = HEALTH_MISSING
+        return state
+    if not os.path.exists(env_python(path)):
+        state["health"] = HEALTH_BROKEN
+    version = read_venv_config(path).get("version")
+    if version:
+        state["python_version"] = f"Python {version}"  # As `python --version` prints it
+    try:
+        state["packages"] = len(inventory_cache.get(path))
+    except Exception as e:
+        print(f"Could not read the packages of {path}: {str(e)}")
+    state["size"] = directory_size(path)
+    return state
+
+
+class StateCache:
+    """Snapshot of every environment's last known state, kept on disk"""
+
+    def __init__(self, cache_dir):
+        self.path = os.path.join(str(cache_dir), STATE_FILE)
+        self.fresh = set()  # Paths checked since the application started
+        self._invalidated = {}  # Path -> when it last changed
+        self._lock = threading.Lock()
+        self._states = {}
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+            if data.get("format") == STATE_FORMAT:
+                self._states = data["environments"]
+        except (OSError, ValueError, KeyError):
+            pass
+
+    def get(self, path):
+        """Last known state of the environment at path, or None"""
+        with self._lock:
+            return self._states.get(path)
+
+    def is_stale(self, path):
+        return path not in self.fresh
+
+    def invalidate(self, path):
+        """Have path checked again, e.g. after packages were installed in it"""
+        with self._lock:
+            self.fresh.discard(path)
+            self._invalidated[path] = time.time()
+
+    def update(self, path, state):
+        with self._lock:
+            self._states[path] = state
+            # A check that started before the last change may have missed it
+            if state["checked_at"] > self._invalidated.get(path, 0):
+                self.fresh.add(path)
+
+    def rename(self, old_path, new_path):
+        """Keep an environment's last state after it moved; it is checked again at its new path"""
+        with self._lock:
+            if old_path in self._states:
+                self._states[new_path] = self._states.pop(old_path)
+            self.fresh.discard(old_path)
+        self.save()
+
+    def save(self, paths=None):
+        """Write the snapshot, keeping only the given paths if set"""
+        with self._lock:
+            states = {path: dict(state) for path, state in self._states.items() if paths is None or path in paths}
+            self._states = states
+        try:
+            write_json_atomic(self.path, {"format": STATE_FORMAT, "environments": states})
+        except OSError as e:
+            print(f"Could not save environment state: {str(e)}")
+
+    def revalidate(self, environments, inventory_cache, on_state=None, cancelled=None, keep=None):
+        """Check environments again, calling on_state(path, state) as each one finishes
+
+        The snapshot is saved afterwards with the states of the paths in keep
+        (all when None); the others belong to environments no longer listed.
+        """
+        with tracer.span("revalidate environments", "app", environments=len(environments)):
+            with ThreadPoolExecutor(max_workers=CHECK_WORKERS) as pool:
+                futures = {pool.submit(check_environment, env, inventory_cache): env for env in environments}
+                for future in as_completed(futures):
+                    if cancelled and cancelled():
+                        for pending in futures:
+                            pending.cancel()
+                        raise OperationCancelled()
+                    path = futures[future]["path"]
+                    state = future.result()
+                    self.update(path, state)
+                    if on_state:
+                        on_state(path, state)
+        self.save(keep)
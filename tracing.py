@@ -0,0 +1,162 @@
+import os
+import json
+import time
+import threading
+import subprocess
+import collections
+from contextlib import contextmanager
+
+# Number of spans kept in memory; older spans are dropped
+DEFAULT_CAPACITY = 5000
+
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is open-ended
+HISTOGRAM_BOUNDS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000]
+
+
+class Span:
+    """A timed operation"""
+
+    __slots__ = ("name", "category", "start", "duration", "thread_id", "attrs")
+
+    def __init__(self, name, category, start, duration, thread_id, attrs):
+        self.name = name
+        self.category = category
+        self.start = start  # Wall clock seconds
+        self.duration = duration  # Seconds
+        self.thread_id = thread_id
+        self.attrs = attrs
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = min(int(fraction * len(sorted_values)), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def histogram(durations_ms):
+    """Count durations into HISTOGRAM_BOUNDS_MS buckets"""
+    counts = [0] * (len(HISTOGRAM_BOUNDS_MS) + 1)
+    for value in durations_ms:
+        for index, bound in enumerate(HISTOGRAM_BOUNDS_MS):
+            if value < bound:
+                counts[index] += 1
+                break
+        else:
+            counts[-1] += 1
+    return counts
+
+
+def describe_command(cmd):
+    """Short operation name for a command line, e.g. 'pip list' or 'python -m venv'"""
+    if isinstance(cmd, str):
+        cmd = cmd.split()
+    if not cmd:
+        return "subprocess"
+    exe = os.path.splitext(os.path.basename(cmd[0]))[0]
+    args = list(cmd[1:])
+    if len(args) >= 2 and args[0] == "-m":
+        return f"{exe} -m {args[1]}"
+    if args and os.path.sep not in args[0] and len(args[0]) < 24:
+        return f"{exe} {args[0]}"
+    return exe
+
+
+class Tracer:
+    """Keeps recent spans in a ring buffer and summarises them"""
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self._spans = collections.deque(maxlen=capacity)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name, category="app", **attrs):
+        """Time the enclosed block; the yielded dict can receive more attributes"""
+        wall_start = time.time()
+        start = time.perf_counter()
+        try:
+            yield attrs
+        except BaseException as e:
+            attrs.setdefault("error", type(e).__name__)
+            raise
+        finally:
+            self.record(name, category, wall_start, time.perf_counter() - start, attrs)
+
+    def record(self, name, category, start, duration, attrs=None):
+        span = Span(name, category, start, duration, threading.get_ident(), dict(attrs or {}))
+        with self._lock:
+            self._spans.append(span)
+
+    def spans(self):
+        """Return a copy of the recorded spans, oldest first"""
+        with self._lock:
+            return list(self._spans)
+
+    def clear(self):
+        with self._lock:
+            self._spans.clear()
+
+    def stats(self):
+        """Per-operation latency summary, slowest total time first
+
+        Each entry has name, category, count, total_ms, p50_ms, p95_ms,
+        max_ms and histogram (counts per HISTOGRAM_BOUNDS_MS bucket).
+        """
+        groups = collections.defaultdict(list)
+        categories = {}
+        for span in self.spans():
+            groups[span.name].append(span.duration * 1000)
+            categories[span.name] = span.category
+
+        summary = []
+        for name, durations in groups.items():
+            durations.sort()
+            summary.append({
+                "name": name,
+                "category": categories[name],
+                "count": len(durations),
+                "total_ms": sum(durations),
+                "p50_ms": percentile(durations, 0.5),
+                "p95_ms": percentile(durations, 0.95),
+                "max_ms": durations[-1],
+                "histogram": histogram(durations),
+            })
+        summary.sort(key=lambda entry: entry["total_ms"], reverse=True)
+        return summary
+
+    def chrome_trace(self):
+        """Return the spans as a Chrome trace-event document"""
+        pid = os.getpid()
+        events = []
+        for span in self.spans():
+            events.append({
+                "name": span.name,
+                "cat": span.category,
+                "ph": "X",
+                "ts": int(span.start * 1000000),
+                "dur": int(span.duration * 1000000),
+                "pid": pid,
+                "tid": span.thread_id,
+                "args": {key: str(value) for key, value in span.attrs.items()},
+            })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def export_chrome_trace(self, path):
+        """Write the spans to path in Chrome trace-event JSON format"""
+        with open(path, "w") as f:
+            json.dump(self.chrome_trace(), f)
+
+
+# Application-wide tracer
+tracer = Tracer()
+
+
+def run(cmd, env_name=None, **kwargs):
+    """subprocess.run wrapped in a span named after the command"""
+    with tracer.span(describe_command(cmd), "subprocess",
+                     command=subprocess.list2cmdline(cmd) if not isinstance(cmd, str) else cmd,
+                     environment=env_name or "") as attrs:
+        result = subprocess.run(cmd, **kwargs)
+        attrs["returncode"] = result.returncode
+        return result
@@ -0,0 +1,203 @@
+import os
+import json
+import time
+import email.utils
+import threading
+import tempfile
+import urllib.error
+import urllib.request
+
+from http_cache import CachedResource, USER_AGENT
+from delta_update import MANIFEST_NAME, fetch_manifest, manifest_from_zip
+from tracing import tracer
+from versions import is_newer
+
+# Never poll more often than this, whatever the configured interval
+MIN_CHECK_INTERVAL = 15 * 60
+# Back-off used when GitHub rate limits us without saying for how long
+DEFAULT_RATE_LIMIT_BACKOFF = 60 * 60
+
+
+def is_newer_version(latest, current):
+    """Whether release version latest is newer than current, e.g. 1.1.0 over 1.1.0rc1"""
+    return is_newer(latest, current)
+
+
+class RateLimited(Exception):
+    """The release API asked us to stop polling until retry_at"""
+
+    def __init__(self, retry_at):
+        super().__init__(f"Rate limited until {time.ctime(retry_at)}")
+        self.retry_at = retry_at
+
+
+def rate_limit_reset(headers, now=None):
+    """Work out when polling may resume from rate limit response headers"""
+    now = now or time.time()
+    retry_after = headers.get("Retry-After")
+    if retry_after:
+        try:
+            return now + int(retry_after)
+        except ValueError:
+            parsed = email.utils.parsedate_to_datetime(retry_after)
+            if parsed:
+                return parsed.timestamp()
+    reset = headers.get("X-RateLimit-Reset")
+    if reset:
+        try:
+            return float(reset)
+        except ValueError:
+            pass
+    return now + DEFAULT_RATE_LIMIT_BACKOFF
+
+
+class UpdateChecker:
+    """Polls the release API and pre-stages updates while the app is idle
+
+    Release metadata is cached with its ETag, so polls that find nothing new
+    are answered with 304 Not Modified and do not count against GitHub's
+    rate limit. When a newer release is found its files are downloaded and
+    verified into the DeltaUpdater staging area, so applying it later is
+    just a swap.
+    """
+
+    def __init__(self, api_url, current_version, cache_dir, updater,
+                 interval=24 * 60 * 60, on_update_ready=None):
+        self.api_url = api_url
+        self.current_version = current_version
+        self.updater = updater
+        self.interval = max(interval, MIN_CHECK_INTERVAL)
+        self.on_update_ready = on_update_ready
+        self.resource = CachedResource(
+            api_url,
+            os.path.join(str(cache_dir), "latest_release.json"),
+            self.interval,
+            lambda body: json.loads(body.decode("utf-8")),
+            headers={"Accept": "application/vnd.github.v3+json"},
+        )
+        self.retry_at = 0
+        self.ready_version = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def fetch_latest(self, force=False):
+        """Return (release data, status) for the latest release
+
+        Raises RateLimited instead of contacting the API while a rate limit
+        back-off is in effect.
+        """
+        if time.time() < self.retry_at:
+            raise RateLimited(self.retry_at)
+        try:
+            data, status = self.resource.fetch(force=force)
+        except urllib.error.HTTPError as e:
+            if e.code in (403, 429):
+                self.retry_at = rate_limit_reset(e.headers or {})
+                raise RateLimited(self.retry_at)
+            raise
+
+        # Stop before the quota runs out rather than after
+        if self.resource.last_headers.get("X-RateLimit-Remaining") == "0":
+            self.retry_at = rate_limit_reset(self.resource.last_headers)
+        return data, status
+
+    def stage(self, release, progress=None, cancelled=None):
+        """Download and verify a release into the staging area
+
+        Returns (plan, manifest); the plan is empty if nothing changed.
+        """
+        version = release["tag_name"].lstrip("v")
+        staged = self.updater.staged_update(version)
+        if staged:
+            return staged
+
+        assets = {asset["name"]: asset for asset in release.get("assets", [])}
+        if MANIFEST_NAME in assets:
+            manifest = fetch_manifest(assets[MANIFEST_NAME]["browser_download_url"])
+            manifest["version"] = version
+            plan = self.updater.plan(manifest)
+            if not plan.is_empty:
+                base_url = manifest.get("base_url") or self.source_base_url(release)
+                self.updater.download(plan, manifest, base_url, progress=progress, cancelled=cancelled)
+            return plan, manifest
+
+        zip_assets = [asset for name, asset in assets.items() if name.endswith(".zip")]
+        if not zip_assets:
+            raise ValueError("Release has neither a manifest nor a zip asset")
+
+        fd, zip_path = tempfile.mkstemp(suffix=".zip")
+        os.close(fd)
+        try:
+            req = urllib.request.Request(zip_assets[0]["browser_download_url"],
+                                         headers={"User-Agent": USER_AGENT})
+            with tracer.span("http download", "http", url=req.full_url), \
+                    urllib.request.urlopen(req, timeout=60) as response, open(zip_path, "wb") as f:
+                while True:
+                    if cancelled and cancelled():
+                        raise InterruptedError("Update download cancelled")
+                    chunk = response.read(64 * 1024)
+                    if not chunk:
+                        break
+                    f.write(chunk)
+            manifest = manifest_from_zip(zip_path, version)
+            plan = self.updater.plan(manifest)
+            if not plan.is_empty:
+                self.updater.stage_from_zip(plan, manifest, zip_path)
+            return plan, manifest
+        finally:
+            os.remove(zip_path)
+
+    def source_base_url(self, release):
+        """Where per-file downloads live for releases without a base_url"""
+        repo_url = self.api_url.split("/releases/")[0]
+        repo = repo_url.split("/repos/", 1)[-1]
+        return f"https://raw.githubusercontent.com/{repo}/{release['tag_name']}/"
+
+    def check_once(self, force=False):
+        """Check for a newer release and stage it; return its version or None"""
+        with self._lock:
+            release, _ = self.fetch_latest(force=force)
+            if "tag_name" not in release:
+                return None
+            version = release["tag_name"].lstrip("v")
+            if not is_newer_version(version, self.current_version):
+                return None
+
+            plan, _ = self.stage(release, cancelled=self._stop.is_set)
+            if plan.is_empty:
+                return None
+
+            self.ready_version = version
+            if self.on_update_ready:
+                self.on_update_ready(version, release)
+            return version
+
+    def start(self):
+        """Start polling in a background thread"""
+        if self._thread and self._thread.is_alive() and not self._stop.is_set():
+            return
+        # Each thread has its own event, so a stopped one still winding down exits
+        # while its replacement keeps running
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(self._stop,), daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background thread at its next wake-up"""
+        self._stop.set()
+
+    def _run(self, stop):
+        while not stop.is_set():
+            try:
+                self.check_once()
+            except RateLimited:
+                pass
+            except Exception as e:
+                print(f"Background update check failed: {str(e)}")
+
+            # Sleep until the cached release metadata expires or the rate limit lifts
+            entry = self.resource.load()
+            next_check = (entry.get("fetched_at", 0) if entry else 0) + self.interval
+            next_check = max(next_check, self.retry_at, time.time() + MIN_CHECK_INTERVAL)
+            stop.wait(next_check - time.time())
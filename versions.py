@@ -0,0 +1,330 @@
+"""PEP 440 version parsing, comparison and specifiers
+
+Parsed versions and specifier sets are memoized, so sorting or filtering
+the same release lists again (they come from caches) costs little more
+than the dict lookups. Strings that are not valid PEP 440 versions sort
+before every valid version instead of raising.
+"""
+import re
+from functools import lru_cache
+
+PARSE_CACHE_SIZE = 1 << 16
+
+VERSION_PATTERN = re.compile(
+    r"""^\s*v?
+    (?:(?P<epoch>[0-9]+)!)?
+    (?P<release>[0-9]+(?:\.[0-9]+)*)
+    (?:[-_.]?(?P<pre_l>a|b|c|rc|alpha|beta|pre|preview)[-_.]?(?P<pre_n>[0-9]+)?)?
+    (?:-(?P<post_n1>[0-9]+)|[-_.]?(?P<post_l>post|rev|r)[-_.]?(?P<post_n2>[0-9]+)?)?
+    (?:[-_.]?(?P<dev_l>dev)[-_.]?(?P<dev_n>[0-9]+)?)?
+    (?:\+(?P<local>[a-z0-9]+(?:[-_.][a-z0-9]+)*))?
+    \s*$""",
+    re.VERBOSE | re.IGNORECASE,
+)
+
+PRE_PHASES = {"a": 0, "alpha": 0, "b": 1, "beta": 1, "c": 2, "rc": 2, "pre": 2, "preview": 2}
+PRE_LABELS = ("a", "b", "rc")
+
+SPECIFIER_PATTERN = re.compile(r"^\s*(~=|===|==|!=|<=|>=|<|>)\s*([^\s,;]+)\s*$")
+
+
+class InvalidVersion(ValueError):
+    """A string that is not a PEP 440 version"""
+
+
+class InvalidSpecifier(ValueError):
+    """A string that is not a PEP 440 version specifier"""
+
+
+class Version:
+    """A parsed PEP 440 version; compares and hashes by its normalized value"""
+
+    __slots__ = ("epoch", "release", "pre", "post", "dev", "local", "key")
+
+    def __init__(self, epoch, release, pre, post, dev, local):
+        self.epoch = epoch
+        self.release = release
+        self.pre = pre  # (phase, number) with phase 0, 1, 2 for a, b, rc
+        self.post = post
+        self.dev = dev
+        self.local = local  # Tuple of ints and lowercase strings
+        self.key = self._make_key()
+
+    def _make_key(self):
+        release = self.release
+        while len(release) > 1 and release[-1] == 0:
+            release = release[:-1]
+        if self.pre is not None:
+            pre = self.pre
+        elif self.post is None and self.dev is not None:
+            pre = (-1, 0)  # 1.0.dev1 comes before 1.0a1
+        else:
+            pre = (3, 0)  # Finals and post-releases come after pre-releases
+        post = -1 if self.post is None else self.post
+        dev = float("inf") if self.dev is None else self.dev
+        # Local labels sort after the public version; numeric parts after strings
+        local = tuple((1, part, "") if isinstance(part, int) else (0, 0, part) for part in self.local)
+        return (self.epoch, release, pre, post, dev, local)
+
+    @property
+    def is_prerelease(self):
+        return self.pre is not None or self.dev is not None
+
+    @property
+    def is_postrelease(self):
+        return self.post is not None
+
+    @property
+    def public(self):
+        """The version without its local label"""
+        if not self.local:
+            return self
+        return Version(self.epoch, self.release, self.pre, self.post, self.dev, ())
+
+    @property
+    def base_version(self):
+        """Epoch and release only, e.g. 1.0 for 1.0rc1.post2"""
+        return Version(self.epoch, self.release, None, None, None, ())
+
+    def __str__(self):
+        text = f"{self.epoch}!" if self.epoch else ""
+        text += ".".join(str(part) for part in self.release)
+        if self.pre is not None:
+            text += f"{PRE_LABELS[self.pre[0]]}{self.pre[1]}"
+        if self.post is not None:
+            text += f".post{self.post}"
+        if self.dev is not None:
+            text += f".dev{self.dev}"
+        if self.local:
+            text += "+" + ".".join(str(part) for part in self.local)
+        return text
+
+    def __repr__(self):
+        return f"<Version('{self}')>"
+
+    def __hash__(self):
+        return hash(self.key)
+
+    def __eq__(self, other):
+        return isinstance(other, Version) and self.key == other.key
+
+    def __lt__(self, other):
+        return self.key < other.key
+
+    def __le__(self, other):
+        return self.key <= other.key
+
+    def __gt__(self, other):
+        return self.key > other.key
+
+    def __ge__(self, other):
+        return self.key >= other.key
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def parse(text):
+    """Parse a version string; raises InvalidVersion"""
+    match = VERSION_PATTERN.match(text or "")
+    if not match:
+        raise InvalidVersion(f"Invalid version: '{text}'")
+    pre = None
+    if match.group("pre_l"):
+        pre = (PRE_PHASES[match.group("pre_l").lower()], int(match.group("pre_n") or 0))
+    post = None
+    if match.group("post_n1"):
+        post = int(match.group("post_n1"))
+    elif match.group("post_l"):
+        post = int(match.group("post_n2") or 0)
+    dev = None
+    if match.group("dev_l"):
+        dev = int(match.group("dev_n") or 0)
+    local = ()
+    if match.group("local"):
+        local = tuple(int(part) if part.isdigit() else part.lower()
+                      for part in re.split(r"[-_.]", match.group("local")))
+    return Version(
+        int(match.group("epoch") or 0),
+        tuple(int(part) for part in match.group("release").split(".")),
+        pre, post, dev, local
+    )
+
+
+def try_parse(text):
+    """Parsed version, or None if text is not a valid version"""
+    try:
+        return parse(text)
+    except InvalidVersion:
+        return None
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def sort_key(text):
+    """Sort key for version strings; invalid ones sort first, by their text"""
+    version = try_parse(text)
+    return (1, version.key) if version else (0, text or "")
+
+
+def normalize(text):
+    """Normalized form of a version string, or the string itself if invalid"""
+    version = try_parse(text)
+    return str(version) if version else text
+
+
+def is_prerelease(text):
+    version = try_parse(text)
+    return bool(version and version.is_prerelease)
+
+
+def is_newer(candidate, current):
+    """Whether version string candidate is newer than current; False if either is invalid"""
+    candidate, current = try_parse(candidate), try_parse(current)
+    return bool(candidate and current and candidate > current)
+
+
+def sort_versions(versions, reverse=False):
+    return sorted(versions, key=sort_key, reverse=reverse)
+
+
+def latest(versions, prereleases=False):
+    """Newest version in versions, preferring finals unless prereleases is set
+
+    Pre-releases are only chosen when there is no final release at all.
+    """
+    best = best_pre = None
+    for text in versions:
+        version = try_parse(text)
+        if version is None:
+            continue
+        if version.is_prerelease and not prereleases:
+            if best_pre is None or version > best_pre[0]:
+                best_pre = (version, text)
+        elif best is None or version > best[0]:
+            best = (version, text)
+    chosen = best or best_pre
+    return chosen[1] if chosen else None
+
+
+class Specifier:
+    """One clause of a specifier set, such as >=1.0 or ==2.*"""
+
+    def __init__(self, text):
+        match = SPECIFIER_PATTERN.match(text)
+        if not match:
+            raise InvalidSpecifier(f"Invalid specifier: '{text}'")
+        self.operator, self.version_text = match.groups()
+        self.wildcard = self.operator in ("==", "!=") and self.version_text.endswith(".*")
+        if self.operator == "===":
+            self.version = try_parse(self.version_text)
+            return
+        try:
+            self.version = parse(self.version_text[:-2] if self.wildcard else self.version_text)
+        except InvalidVersion:
+            raise InvalidSpecifier(f"Invalid specifier: '{text}'")
+        if self.operator == "~=":
+            if len(self.version.release) < 2:
+                raise InvalidSpecifier(f"Invalid specifier: '{text}'")
+            # ~=1.4.5 means >=1.4.5 and ==1.4.*
+            self.prefix = Specifier(f"=={Version(self.version.epoch, self.version.release[:-1], None, None, None, ())}.*")
+
+    def __str__(self):
+        return f"{self.operator}{self.version_text}"
+
+    @property
+    def allows_prereleases(self):
+        """Whether the clause names a pre-release, which lets pre-releases match"""
+        return (self.version is not None and self.operator in ("==", "===", "~=", "<=", ">=", "<", ">")
+                and self.version.is_prerelease)
+
+    def _prefix_match(self, version):
+        prefix = self.version
+        if version.epoch != prefix.epoch:
+            return False
+        length = len(prefix.release)
+        release = version.release[:length] + (0,) * (length - len(version.release))
+        if release != prefix.release:
+            return False
+        if prefix.pre is not None or prefix.post is not None or prefix.dev is not None:
+            return (version.pre, version.post, version.dev) == (prefix.pre, prefix.post, prefix.dev)
+        return True
+
+    def contains(self, version, text=None):
+        """Whether a parsed version satisfies the clause, ignoring pre-release rules
+
+        text is the version as written, which === compares literally.
+        """
+        operator, spec = self.operator, self.version
+        if operator == "===":
+            return (text if text is not None else str(version)).strip().lower() == self.version_text.lower()
+        if operator in ("==", "!="):
+            if self.wildcard:
+                result = self._prefix_match(version.public)
+            else:
+                result = (version if spec.local else version.public).key == spec.key
+            return result if operator == "==" else not result
+        public = version.public
+        if operator == "~=":
+            return public >= spec and self.prefix._prefix_match(public)
+        if operator == ">=":
+            return public >= spec
+        if operator == "<=":
+            return public <= spec
+        if operator == "<":
+            # <3.0 excludes 3.0rc1 unless the bound is itself a pre-release
+            if not public < spec:
+                return False
+            return spec.is_prerelease or not public.is_prerelease or public.base_version != spec
+        if operator == ">":
+            # >1.0 excludes 1.0.post1 unless the bound is itself a post-release
+            if not public > spec:
+                return False
+            if not spec.is_postrelease and public.is_postrelease:
+                return Version(public.epoch, public.release, public.pre, None, None, ()) != spec
+            return True
+        return False
+
+
+class SpecifierSet:
+    """Comma-separated PEP 440 specifiers, e.g. ">=1.0,!=1.3.*,<2" """
+
+    def __init__(self, text=""):
+        self.text = text.strip()
+        self.specifiers = [Specifier(part) for part in self.text.split(",") if part.strip()]
+
+    def __str__(self):
+        return ",".join(str(specifier) for specifier in self.specifiers)
+
+    def contains(self, text, prereleases=None):
+        """Whether version string text satisfies every clause
+
+        Pre-releases only match when prereleases is true or a clause names a
+        pre-release. Invalid versions never match.
+        """
+        version = try_parse(text)
+        if version is None:
+            return False
+        if prereleases is None:
+            prereleases = any(specifier.allows_prereleases for specifier in self.specifiers)
+        if version.is_prerelease and not prereleases:
+            return False
+        return all(specifier.contains(version, text) for specifier in self.specifiers)
+
+    def __contains__(self, text):
+        return self.contains(text)
+
+    def filter(self, versions, prereleases=None):
+        """Versions that satisfy the set, in their original order
+
+        As with pip, pre-releases are used when nothing else matches.
+        """
+        if prereleases is None and not any(specifier.allows_prereleases for specifier in self.specifiers):
+            finals = [text for text in versions if self.contains(text, prereleases=False)]
+            if finals:
+                return finals
+            return [text for text in versions if self.contains(text, prereleases=True)]
+        return [text for text in versions if self.contains(text, prereleases)]
+
+
+@lru_cache(maxsize=4096)
+def parse_specifiers(text):
+    """Parse a specifier set; raises InvalidSpecifier"""
+    return SpecifierSet(text)
@@ -0,0 +1,658 @@
+"""Install a complete set of local wheels without pip
+
+When every wheel an install needs is already on disk (a wheelhouse, the
+offline mirror or a staging folder), pip's resolver, index lookups and
+startup are pure overhead, and pip unpacks the wheels one after another.
+Here the whole set is checked up front (tags, duplicates, dependencies and
+files owned by other installed packages) and then the wheels are unpacked
+concurrently. Each one gets the RECORD, INSTALLER and console-script
+launchers pip would write.
+"""
+import io
+import os
+import re
+import csv
+import sys
+import base64
+import shutil
+import hashlib
+import tempfile
+import zipfile
+import platform
+import threading
+from email.parser import HeaderParser
+from concurrent.futures import ThreadPoolExecutor
+
+from distributions import (env_python, env_scripts_dir, env_site_packages, find_distributions,
+                           normalize_name, project_from_info_dir, read_venv_config)
+from progress_bus import OperationCancelled
+from tracing import tracer
+from versions import parse_specifiers, InvalidSpecifier
+
+INSTALLER_NAME = "pyenv-manager"
+WORKERS = min(8, (os.cpu_count() or 2) * 2)
+CHUNK_SIZE = 1024 * 1024
+
+WHEEL_FILENAME = re.compile(
+    r"^(?P<name>[^-]+)-(?P<version>[^-]+)(?:-(?P<build>\d[^-]*))?-(?P<python>[^-]+)-(?P<abi>[^-]+)-(?P<platform>[^-]+)\.whl$",
+    re.IGNORECASE
+)
+REQUIREMENT = re.compile(r"^\s*([A-Za-z0-9][A-Za-z0-9._-]*)\s*(?:\[[^\]]*\])?\s*\(?([^;()@]*)\)?\s*(@[^;]*)?(?:;(.*))?$")
+ENTRY_POINT = re.compile(r"^(?P<module>[\w.]+)\s*(?::\s*(?P<attrs>[\w.]+))?\s*(?:\[.*\])?\s*$")
+# Signatures over the wheel's RECORD no longer match the installed one
+SKIPPED_INFO_FILES = {"RECORD", "RECORD.jws", "RECORD.p7s", "INSTALLER", "REQUESTED"}
+
+POSIX_SCRIPT = """{shebang}
+# -*- coding: utf-8 -*-
+import re
+import sys
+from {module} import {import_name}
+if __name__ == "__main__":
+    sys.argv[0] = re.sub(r"(-script\\.pyw|\\.exe)?$", "", sys.argv[0])
+    sys.exit({call}())
+"""
+WINDOWS_LAUNCHERS = {("console", "ARM64"): "t64-arm.exe", ("gui", "ARM64"): "w64-arm.exe",
+                     ("console", None): "t64.exe", ("gui", None): "w64.exe"}
+
+
+class WheelInstallError(Exception):
+    pass
+
+
+def record_hash(digest):
+    return "sha256=" + base64.urlsafe_b64encode(digest).rstrip(b"=").decode("ascii")
+
+
+def python_version(env_path):
+    """(major, minor) of an environment's interpreter, from pyvenv.cfg or the site-packages path"""
+    config = read_venv_config(env_path)
+    text = config.get("version_info") or config.get("version") or ""
+    match = re.match(r"(\d+)\.(\d+)", text)
+    if not match:
+        for site_dir in env_site_packages(env_path):
+            match = re.search(r"python(\d+)\.(\d+)", site_dir)
+            if match:
+                break
+    return (int(match.group(1)), int(match.group(2))) if match else None
+
+
+# Tags and markers
+
+def platform_matches(tag):
+    """Whether a wheel platform tag can run on this machine"""
+    if tag == "any":
+        return True
+    machine = platform.machine().lower()
+    machines = {"amd64": ("x86_64", "amd64"), "x86_64": ("x86_64", "amd64"), "arm64": ("arm64", "aarch64"),
+                "aarch64": ("aarch64", "arm64")}.get(machine, (machine,))
+    if sys.platform == "win32":
+        return tag == {"amd64": "win_amd64", "arm64": "win_arm64"}.get(machine, "win32")
+    if sys.platform == "darwin":
+        return tag.startswith("macosx_") and (tag.endswith(("_universal2", "_universal")) or tag.endswith(machines))
+    if sys.platform.startswith("linux"):
+        return tag.startswith(("linux_", "manylinux", "musllinux")) and tag.endswith(machines)
+    return False
+
+
+def tags_compatible(python_tags, abi_tags, platform_tags, version):
+    """Whether any combination of a wheel's tags suits CPython at version on this machine
+
+    This accepts what pip would for the common cases: pure wheels, cpXY
+    wheels for the environment's version, and abi3 wheels built for an
+    older CPython 3.
+    """
+    if not any(platform_matches(tag) for tag in platform_tags):
+        return False
+    if version is None:
+        return True
+    major, minor = version
+    for python_tag in python_tags:
+        for abi_tag in abi_tags:
+            if abi_tag == "none" and python_tag in (f"py{major}", f"py{major}{minor}", f"cp{major}{minor}"):
+                return True
+            if abi_tag.startswith(f"cp{major}{minor}") and python_tag == f"cp{major}{minor}":
+                return True
+            match = re.match(r"cp(\d)(\d+)$", python_tag)
+            if abi_tag == "abi3" and match and int(match.group(1)) == major and int(match.group(2)) <= minor:
+                return True
+    return False
+
+
+def marker_environment(version, full_version=None):
+    """PEP 508 marker variables for an environment with the given (major, minor) version"""
+    return {
+        "python_version": f"{version[0]}.{version[1]}" if version else f"{sys.version_info[0]}.{sys.version_info[1]}",
+        "python_full_version": full_version or (f"{version[0]}.{version[1]}.0" if version else platform.python_version()),
+        "os_name": os.name,
+        "sys_platform": sys.platform,
+        "platform_system": platform.system(),
+        "platform_machine": platform.machine(),
+        "platform_release": platform.release(),
+        "platform_version": platform.version(),
+        "platform_python_implementation": platform.python_implementation(),
+        "implementation_name": sys.implementation.name,
+        "extra": "",
+    }
+
+
+MARKER_TOKEN = re.compile(r"\s*(?:(?P<paren>[()])|(?P<op>===|==|!=|<=|>=|~=|<|>|not\s+in\b|in\b)"
+                          r"|(?P<string>'[^']*'|\"[^\"]*\")|(?P<word>[A-Za-z_][A-Za-z0-9_.]*))")
+
+
+def evaluate_marker(text, environment):
+    """Evaluate a PEP 508 environment marker; raises ValueError if it cannot be parsed"""
+    tokens = []
+    position = 0
+    text = text.strip()
+    while position < len(text):
+        match = MARKER_TOKEN.match(text, position)
+        if not match or match.end() == position:
+            raise ValueError(f"Invalid marker: {text}")
+        kind = match.lastgroup
+        tokens.append((kind, re.sub(r"\s+", " ", match.group(kind))))
+        position = match.end()
+    tokens.append((None, None))
+    index = [0]
+
+    def take():
+        token = tokens[index[0]]
+        index[0] += 1
+        return token
+
+    def peek():
+        return tokens[index[0]]
+
+    def value():
+        kind, token = take()
+        if kind == "string":
+            return token[1:-1]
+        if kind == "word" and token in environment:
+            return environment[token]
+        raise ValueError(f"Invalid marker: {text}")
+
+    def comparison():
+        if peek() == ("paren", "("):
+            take()
+            result = disjunction()
+            if take() != ("paren", ")"):
+                raise ValueError(f"Invalid marker: {text}")
+            return result
+        left = value()
+        kind, op = take()
+        if kind != "op":
+            raise ValueError(f"Invalid marker: {text}")
+        right = value()
+        if op == "in":
+            return left in right
+        if op == "not in":
+            return left not in right
+        try:
+            return parse_specifiers(op + right).contains(left, prereleases=True)
+        except InvalidSpecifier:
+            if op in ("==", "==="):
+                return left == right
+            if op == "!=":
+                return left != right
+            raise ValueError(f"Invalid marker: {text}")
+
+    def conjunction():
+        result = comparison()
+        while peek() == ("word", "and"):
+            take()
+            result = comparison() and result
+        return result
+
+    def disjunction():
+        result = conjunction()
+        while peek() == ("word", "or"):
+            take()
+            result = conjunction() or result
+        return result
+
+    result = disjunction()
+    if peek() != (None, None):
+        raise ValueError(f"Invalid marker: {text}")
+    return result
+
+
+# Wheels
+
+class Wheel:
+    """A wheel file's tags, metadata and members, read without unpacking it"""
+
+    def __init__(self, path):
+        self.path = os.path.abspath(path)
+        match = WHEEL_FILENAME.match(os.path.basename(path))
+        if not match:
+            raise WheelInstallError(f"'{os.path.basename(path)}' is not a wheel file name")
+        self.python_tags = match.group("python").split(".")
+        self.abi_tags = match.group("abi").split(".")
+        self.platform_tags = match.group("platform").split(".")
+        try:
+            with zipfile.ZipFile(self.path) as archive:
+                self.members = [info for info in archive.infolist() if not info.is_dir()]
+                self.info_dir = self._find_info_dir(match.group("name"))
+                metadata = archive.read(f"{self.info_dir}/METADATA").decode("utf-8", errors="replace")
+                wheel = archive.read(f"{self.info_dir}/WHEEL").decode("utf-8", errors="replace")
+                self.entry_points = self._read_entry_points(archive)
+                self.record = self._read_record(archive)
+        except (OSError, KeyError, zipfile.BadZipFile) as e:
+            raise WheelInstallError(f"Could not read '{os.path.basename(path)}': {str(e)}")
+        headers = HeaderParser().parsestr(metadata.split("\n\n", 1)[0])
+        self.name = headers.get("Name") or match.group("name")
+        self.version = headers.get("Version") or match.group("version")
+        self.requires = headers.get_all("Requires-Dist") or []
+        self.root_is_purelib = HeaderParser().parsestr(wheel).get("Root-Is-Purelib", "true").strip().lower() == "true"
+        self.data_dir = self.info_dir[:-len(".dist-info")] + ".data"
+        self.size = sum(info.file_size for info in self.members)
+
+    @property
+    def normalized_name(self):
+        return normalize_name(self.name)
+
+    def _find_info_dir(self, filename_name):
+        candidates = {info.filename.split("/", 1)[0] for info in self.members
+                      if info.filename.count("/") == 1 and info.filename.endswith("/WHEEL")}
+        for candidate in candidates:
+            if project_from_info_dir(candidate) == normalize_name(filename_name):
+                return candidate
+        raise WheelInstallError(f"'{os.path.basename(self.path)}' has no .dist-info directory for its project")
+
+    def _read_entry_points(self, archive):
+        """{"console": [(name, value)], "gui": [...]} from entry_points.txt"""
+        scripts = {"console": [], "gui": []}
+        try:
+            text = archive.read(f"{self.info_dir}/entry_points.txt").decode("utf-8")
+        except KeyError:
+            return scripts
+        section = None
+        for line in text.splitlines():
+            line = line.strip()
+            if not line or line.startswith(("#", ";")):
+                continue
+            if line.startswith("["):
+                section = {"[console_scripts]": "console", "[gui_scripts]": "gui"}.get(line.replace(" ", ""))
+            elif section:
+                name, _, value = line.partition("=")
+                scripts[section].append((name.strip(), value.strip()))
+        return scripts
+
+    def _read_record(self, archive):
+        """{member: digest} from the wheel's RECORD, for the members that have one"""
+        try:
+            text = archive.read(f"{self.info_dir}/RECORD").decode("utf-8")
+        except KeyError:
+            return {}
+        return {row[0]: row[1] for row in csv.reader(io.StringIO(text)) if len(row) >= 2 and row[1]}
+
+    def destinations(self, scheme):
+        """(member, destination path) for every file the wheel installs"""
+        root = scheme["purelib" if self.root_is_purelib else "platlib"]
+        result = []
+        for info in self.members:
+            name = info.filename
+            parts = name.split("/")
+            if name.startswith("/") or ".." in parts or ":" in parts[0]:
+                raise WheelInstallError(f"'{os.path.basename(self.path)}' contains an unsafe path: {name}")
+            if parts[0] == self.info_dir and parts[-1] in SKIPPED_INFO_FILES and len(parts) == 2:
+                continue
+            if parts[0] == self.data_dir:
+                if len(parts) < 3 or parts[1] not in scheme:
+                    raise WheelInstallError(f"'{os.path.basename(self.path)}' has an unknown data folder: {name}")
+                result.append((info, os.path.join(scheme[parts[1]], *parts[2:])))
+            else:
+                result.append((info, os.path.join(root, *parts)))
+        return result
+
+
+def parse_requirement(text):
+    """(normalized name, specifier text, marker or None) of a Requires-Dist value"""
+    match = REQUIREMENT.match(text)
+    if not match:
+        return None
+    return normalize_name(match.group(1)), match.group(2).strip(), (match.group(4) or "").strip() or None
+
+
+# Installing
+
+class WheelInstaller:
+    """Installs a resolved set of wheels into one virtual environment"""
+
+    def __init__(self, env_path, log=None, cancelled=None, workers=WORKERS):
+        self.env_path = os.path.abspath(env_path)
+        self.log = log or (lambda line: None)
+        self.cancelled = cancelled or (lambda: False)
+        self.workers = workers
+        site_dirs = env_site_packages(self.env_path)
+        if not site_dirs:
+            raise WheelInstallError(f"'{self.env_path}' has no site-packages directory")
+        self.site_dir = site_dirs[0]
+        self.version = python_version(self.env_path)
+        self.python = env_python(self.env_path)
+        self.scripts_dir = env_scripts_dir(self.env_path)
+        version = f"python{self.version[0]}.{self.version[1]}" if self.version else "python"
+        self.scheme = {
+            "purelib": self.site_dir,
+            "platlib": self.site_dir,
+            "scripts": self.scripts_dir,
+            "data": self.env_path,
+            "headers": os.path.join(self.env_path, "include", "site", version),
+        }
+        self._lock = threading.Lock()
+
+    def check(self, wheels):
+        """Check the set before anything is written
+
+        Returns {normalized name: installed Distribution} for the packages the
+        set replaces. Raises WheelInstallError listing every problem found.
+        """
+        problems = []
+        by_name = {}
+        for wheel in wheels:
+            if wheel.normalized_name in by_name:
+                problems.append(f"{wheel.name} is in the set twice ({by_name[wheel.normalized_name].version} "
+                                f"and {wheel.version})")
+            by_name[wheel.normalized_name] = wheel
+            if not tags_compatible(wheel.python_tags, wheel.abi_tags, wheel.platform_tags, self.version):
+                problems.append(f"{os.path.basename(wheel.path)} is not compatible with this environment")
+
+        installed = {}
+        for dist in find_distributions(self.env_path):
+            installed.setdefault(dist.normalized_name, dist)
+        replaced = {name: dist for name, dist in installed.items() if name in by_name}
+
+        # Every requirement must be met by the set or by what stays installed
+        available = {name: dist.version for name, dist in installed.items()}
+        available.update((name, wheel.version) for name, wheel in by_name.items())
+        environment = marker_environment(self.version, read_venv_config(self.env_path).get("version"))
+        for wheel in wheels:
+            for requirement in wheel.requires:
+                parsed = parse_requirement(requirement)
+                if parsed is None:
+                    continue
+                name, specifier, marker = parsed
+                try:
+                    if marker and not evaluate_marker(marker, environment):
+                        continue
+                except ValueError:
+                    self.log(f"Skipping requirement with an unsupported marker: {requirement}")
+                    continue
+                if name not in available:
+                    problems.append(f"{wheel.name} requires {requirement.split(';')[0].strip()}, "
+                                    f"which is neither in the set nor installed")
+                    continue
+                try:
+                    if specifier and not parse_specifiers(specifier).contains(available[name], prereleases=True):
+                        problems.append(f"{wheel.name} requires {name}{specifier}, but {available[name]} "
+                                        f"would be installed")
+                except InvalidSpecifier:
+                    self.log(f"Skipping requirement with an invalid version: {requirement}")
+
+        # No two wheels, and no wheel and a package that stays, may own the same file
+        owners = {}
+        for name, dist in installed.items():
+            if name in replaced:
+                continue
+            for path in dist.owned_files() or []:
+                owners[os.path.normcase(path)] = dist.name
+        for wheel in wheels:
+            for info, destination in wheel.destinations(self.scheme):
+                key = os.path.normcase(os.path.normpath(destination))
+                owner = owners.get(key)
+                if owner is not None and owner != wheel.name:
+                    problems.append(f"{wheel.name} and {owner} both install {os.path.relpath(destination, self.env_path)}")
+                owners[key] = wheel.name
+
+        if problems:
+            raise WheelInstallError("Cannot install the wheel set:\n" + "\n".join(f"- {problem}" for problem in problems[:50]))
+        return replaced
+
+    def install(self, paths, requested=None):
+        """Install the wheels at paths; returns the number installed
+
+        requested holds the normalized names to mark as installed on purpose
+        (REQUESTED); by default, the wheels no other wheel in the set
+        requires. Packages that were requested before stay requested. If any
+        wheel fails, the whole set is rolled back and the replaced versions
+        are restored.
+        """
+        with tracer.span("install wheel set", "io", environment=os.path.basename(self.env_path),
+                         wheels=len(paths)) as attrs:
+            wheels = [Wheel(path) for path in paths]
+            replaced = self.check(wheels)
+            if requested is None:
+                required = {parsed[0] for wheel in wheels for parsed in map(parse_requirement, wheel.requires) if parsed}
+                requested = {wheel.normalized_name for wheel in wheels} - required
+            requested = set(requested) | {name for name, dist in replaced.items() if dist.requested}
+            attrs["bytes"] = sum(wheel.size for wheel in wheels)
+            launchers = self._windows_launchers() if sys.platform == "win32" else None
+
+            # Like pip, move the versions being replaced aside first, so they can be put back
+            stash_dir = tempfile.mkdtemp(prefix=".wheel-stash-", dir=self.env_path)
+            stashed = []  # (original path, stashed path)
+            written = {wheel.normalized_name: [] for wheel in wheels}  # name -> [(path, digest, size)]
+            errors = []
+            try:
+                for dist in replaced.values():
+                    self._stash(dist, stash_dir, stashed)
+                self.log(f"Installing {len(wheels)} wheel(s) with {self.workers} workers...")
+                # Largest first, so one big wheel does not finish last on its own
+                wheels.sort(key=lambda wheel: wheel.size, reverse=True)
+                with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                    futures = [(wheel, pool.submit(self._install_one, wheel, replaced.get(wheel.normalized_name),
+                                                   wheel.normalized_name in requested, launchers,
+                                                   written[wheel.normalized_name]))
+                               for wheel in wheels]
+                    for wheel, future in futures:
+                        try:
+                            future.result()
+                        except OperationCancelled:
+                            errors.append(None)
+                        except Exception as e:
+                            errors.append(f"{wheel.name}: {str(e)}")
+            except BaseException:
+                self._roll_back(written, stashed)
+                raise
+            finally:
+                if errors:
+                    self._roll_back(written, stashed)
+                shutil.rmtree(stash_dir, ignore_errors=True)
+            if None in errors:
+                raise OperationCancelled()
+            if errors:
+                raise WheelInstallError("Some wheels failed to install, so none were:\n" + "\n".join(errors))
+            self._remove_stale_bytecode(path for path, _ in stashed)
+            self._remove_empty_dirs(path for path, _ in stashed)
+        return len(wheels)
+
+    def _install_one(self, wheel, previous, requested, launchers, written):
+        """Unpack one wheel, adding every file written to written as (path, digest, size)"""
+        if self.cancelled():
+            raise OperationCancelled()
+        with zipfile.ZipFile(wheel.path) as archive:
+            for info, destination in wheel.destinations(self.scheme):
+                if self.cancelled():
+                    raise OperationCancelled()
+                try:
+                    digest, size = self._extract(archive, info, destination, wheel)
+                except BaseException:
+                    written.append((destination, "", 0))  # Possibly written in part
+                    raise
+                written.append((destination, digest, size))
+        for destination, content, executable in self._scripts(wheel, launchers):
+            written.append(self._write(destination, content, executable))
+        info_dir = os.path.join(self.site_dir, wheel.info_dir)
+        written.append(self._write(os.path.join(info_dir, "INSTALLER"), f"{INSTALLER_NAME}\n".encode()))
+        if requested:
+            written.append(self._write(os.path.join(info_dir, "REQUESTED"), b""))
+        record_path = os.path.join(info_dir, "RECORD")
+        self._write_record(record_path, written)
+        written.append((record_path, "", 0))
+        action = f"Replaced {previous.name} {previous.version} with" if previous is not None else "Installed"
+        self.log(f"{action} {wheel.name} {wheel.version}")
+
+    def _extract(self, archive, info, destination, wheel):
+        """Unpack one member, checking it against the wheel's RECORD; returns (digest, size)"""
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        digest = hashlib.sha256()
+        size = 0
+        is_script = info.filename.startswith(f"{wheel.data_dir}/scripts/")
+        with archive.open(info) as source, open(destination, "wb") as target:
+            first = True
+            while True:
+                chunk = source.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                if first and is_script and chunk.startswith(b"#!python"):
+                    # Scripts from .data/scripts point at the installing interpreter
+                    line_end = chunk.find(b"\n")
+                    chunk = self._shebang("pythonw" in chunk[:line_end].decode("latin-1")).encode() + \
+                        (chunk[line_end:] if line_end >= 0 else b"\n")
+                first = False
+                size += len(chunk)
+                target.write(chunk)
+        expected = wheel.record.get(info.filename)
+        if expected and expected.startswith("sha256=") and record_hash(digest.digest()) != expected:
+            raise WheelInstallError(f"{info.filename} does not match the wheel's RECORD")
+        mode = (info.external_attr >> 16) & 0o777
+        if is_script or mode & 0o111:
+            os.chmod(destination, 0o755)
+        if is_script:
+            # The shebang may have been rewritten; RECORD lists what is on disk
+            return self._file_hash(destination), os.path.getsize(destination)
+        return record_hash(digest.digest()), size
+
+    def _file_hash(self, path):
+        with open(path, "rb") as f:
+            return record_hash(hashlib.sha256(f.read()).digest())
+
+    def _write(self, path, content, executable=False):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(content)
+        if executable:
+            os.chmod(path, 0o755)
+        return path, record_hash(hashlib.sha256(content).digest()), len(content)
+
+    def _write_record(self, path, written):
+        rows = []
+        for file_path, digest, size in written:
+            rows.append([os.path.relpath(file_path, self.site_dir).replace(os.sep, "/"), digest, size])
+        rows.append([os.path.relpath(path, self.site_dir).replace(os.sep, "/"), "", ""])
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            csv.writer(f, lineterminator="\n").writerows(rows)
+
+    def _stash(self, dist, stash_dir, stashed):
+        """Move an installed distribution's files into stash_dir, adding (original, stashed) pairs to stashed"""
+        files = dist.owned_files()
+        if files is None:
+            raise WheelInstallError(f"{dist.name} {dist.version} cannot be replaced: it has no RECORD")
+        # Files the RECORD does not list, e.g. written by the package itself, go with the folder
+        for path in files + [dist.path]:
+            if not os.path.lexists(path):
+                continue
+            target = os.path.join(stash_dir, str(len(stashed)))
+            os.replace(path, target)
+            stashed.append((path, target))
+
+    def _roll_back(self, written, stashed):
+        """Remove every file written so far and put the stashed files back"""
+        new_paths = [path for paths in written.values() for path, digest, size in paths]
+        for path in new_paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self._remove_empty_dirs(new_paths)
+        for original, target in reversed(stashed):
+            try:
+                os.makedirs(os.path.dirname(original), exist_ok=True)
+                os.replace(target, original)
+            except OSError as e:
+                self.log(f"Could not restore {original}: {str(e)}")
+        stashed.clear()
+
+    def _remove_stale_bytecode(self, paths):
+        """Remove the cached bytecode of replaced .py files, as pip does"""
+        for path in paths:
+            cache = os.path.join(os.path.dirname(path), "__pycache__")
+            if not path.endswith(".py") or not os.path.isdir(cache):
+                continue
+            stem = os.path.splitext(os.path.basename(path))[0] + "."
+            for name in os.listdir(cache):
+                if name.startswith(stem):
+                    try:
+                        os.remove(os.path.join(cache, name))
+                    except OSError:
+                        pass
+
+    def _remove_empty_dirs(self, paths):
+        """Remove the folders of paths that were left empty, deepest first"""
+        for directory in sorted({os.path.dirname(path) for path in paths}, key=len, reverse=True):
+            while directory.startswith(self.site_dir + os.sep) or directory.startswith(self.scripts_dir + os.sep):
+                try:
+                    os.rmdir(directory)
+                except OSError:
+                    break
+                directory = os.path.dirname(directory)
+
+    # Console scripts
+
+    def _shebang(self, gui=False):
+        python = self.python
+        if gui and sys.platform == "win32":
+            python = os.path.join(os.path.dirname(python), "pythonw.exe")
+        if sys.platform == "win32":
+            return f'#!"{python}"' if " " in python else f"#!{python}"
+        if " " in python or len(python) > 127:
+            # Long or spaced interpreter paths do not work in a shebang line
+            return f"#!/bin/sh\n'''exec' \"{python}\" \"$0\" \"$@\"\n' '''"
+        return f"#!{python}"
+
+    def _windows_launchers(self):
+        """{kind: launcher bytes} from the environment's own pip, which ships distlib's launchers"""
+        machine = "ARM64" if platform.machine().upper() == "ARM64" else None
+        launchers = {}
+        for kind in ("console", "gui"):
+            path = os.path.join(self.site_dir, "pip", "_vendor", "distlib", WINDOWS_LAUNCHERS[(kind, machine)])
+            try:
+                with open(path, "rb") as f:
+                    launchers[kind] = f.read()
+            except OSError:
+                pass
+        return launchers
+
+    def _scripts(self, wheel, launchers):
+        """(path, content, executable) of the console-script launchers a wheel declares"""
+        for kind, entries in wheel.entry_points.items():
+            for name, value in entries:
+                match = ENTRY_POINT.match(value)
+                if not match or not match.group("attrs"):
+                    raise WheelInstallError(f"{wheel.name} has an invalid entry point: {name} = {value}")
+                attrs = match.group("attrs")
+                body = POSIX_SCRIPT.format(shebang=self._shebang(kind == "gui"), module=match.group("module"),
+                                           import_name=attrs.split(".")[0], call=attrs)
+                if launchers is None:
+                    yield os.path.join(self.scripts_dir, name), body.encode("utf-8"), True
+                    continue
+                if kind not in launchers:
+                    raise WheelInstallError(f"{wheel.name} has scripts, but this environment's pip "
+                                            f"has no launcher to build them with")
+                # A Windows launcher runs the zip appended to it with the interpreter in its shebang
+                shebang, script = body.split("\n", 1)
+                archive = io.BytesIO()
+                with zipfile.ZipFile(archive, "w") as zf:
+                    zf.writestr("__main__.py", script.encode("utf-8"))
+                content = launchers[kind] + shebang.encode("utf-8") + b"\r\n" + archive.getvalue()
+                yield os.path.join(self.scripts_dir, name + ".exe"), content, False
+
+
+def install_wheels(env_path, paths, log=None, cancelled=None, requested=None):
+    """Install a resolved set of local wheels into a virtual environment; returns the number installed"""
+    return WheelInstaller(env_path, log, cancelled).install(paths, requested)
+
+
+def wheels_in(directory):
+    """The .whl files directly inside a folder"""
+    return sorted(os.path.join(directory, name) for name in os.listdir(directory) if name.lower().endswith(".whl"))